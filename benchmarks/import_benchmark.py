@@ -0,0 +1,136 @@
+"""
+Import time and memory of the plugin packages and operator modules.
+
+Each target is imported in a fresh Python process that has already imported
+Airflow and ``BaseOperator``, which is what the scheduler's DAG processor and
+a task process have loaded before they touch the plugins. The median import
+time and resident memory added over ``--repeat`` runs are reported, together
+with the heavy third-party modules (pandas, boto3, ...) the import pulled in.
+
+``--before`` measures a second plugins folder, e.g. an older revision
+exported with ``git archive``, with the same targets for a before/after
+table (see benchmarks/README.md).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_FOLDER)
+
+TARGETS = (
+    "docebo_plugin",
+    "powerbi_plugin",
+    "sns_plugin",
+    "docebo_plugin.docebo_config",
+    "docebo_plugin.operators.docebo_dataload_operator",
+    "docebo_plugin.operators.s3_file_archival_operator",
+    "docebo_plugin.operators.snowflake_load_operator",
+    "powerbi_plugin.operators.powerbi_dataset_refresh_operator",
+    "powerbi_plugin.operators.powerbi_batch_refresh_operator",
+    "sns_plugin.operators.failure_handler_operator",
+)
+HEAVY_MODULES = ("pandas", "pyarrow", "boto3", "botocore", "requests", "msal", "aiohttp", "multiprocessing")
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def measure(target, plugins_folder):
+    """Child process: import ``target`` once and return its cost."""
+    import importlib
+
+    import airflow  # noqa: F401
+    from airflow.models.baseoperator import BaseOperator  # noqa: F401
+
+    sys.path.insert(0, plugins_folder)
+    already_loaded = {name for name in HEAVY_MODULES if name in sys.modules}
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    importlib.import_module(target)
+    return {
+        "ms": (time.perf_counter() - started) * 1000,
+        "rss_mb": current_rss_mb() - rss_before,
+        "heavy": sorted(name for name in HEAVY_MODULES if name in sys.modules and name not in already_loaded),
+    }
+
+
+def run_target(target, plugins_folder, repeat):
+    samples = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", target, "--plugins-folder", plugins_folder],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.decode("utf-8", "replace").strip().splitlines()[-1:]
+            return {"error": " ".join(error)}
+        samples.append(json.loads(completed.stdout.decode("utf-8").strip().splitlines()[-1]))
+    return {
+        "ms": round(statistics.median(sample["ms"] for sample in samples), 1),
+        "rss_mb": round(statistics.median(sample["rss_mb"] for sample in samples), 1),
+        "heavy": samples[-1]["heavy"],
+    }
+
+
+def run_all(plugins_folder, targets, repeat):
+    return {target: run_target(target, plugins_folder, repeat) for target in targets}
+
+
+def format_result(result):
+    if "error" in result:
+        return f"{'error':>22}"
+    return f"{result['ms']:8.1f} ms {result['rss_mb']:7.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure plugin import time and memory.")
+    parser.add_argument("--plugins-folder", default=os.path.join(REPO_ROOT, "plugins"))
+    parser.add_argument("--target", action="append", help="Module to import; may be repeated. Defaults to all.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--before", help="Plugins folder measured as the 'before' column.")
+    parser.add_argument("--json", help="Write the measurements to this file.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.plugins_folder)))
+        return 0
+
+    targets = args.target or TARGETS
+    results = {"after": run_all(args.plugins_folder, targets, args.repeat)}
+    if args.before:
+        results["before"] = run_all(os.path.abspath(args.before), targets, args.repeat)
+
+    width = max(len(target) for target in targets)
+    header = f"{'module':{width}}  {'after':>22}"
+    if "before" in results:
+        header = f"{'module':{width}}  {'before':>22}  {'after':>22}"
+    print(header)
+    for target in targets:
+        after = results["after"][target]
+        line = f"{target:{width}}  "
+        if "before" in results:
+            line += format_result(results["before"][target]) + "  "
+        line += format_result(after)
+        if after.get("heavy"):
+            line += f"  loads {', '.join(after['heavy'])}"
+        elif after.get("error"):
+            line += f"  {after['error']}"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
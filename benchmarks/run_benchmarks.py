@@ -0,0 +1,218 @@
+"""
+Offline benchmarks for the plugin operators.
+
+Every scenario runs in a fresh Python process against the stub servers in
+``stubs.py``, so nothing leaves the machine and peak RSS is measured per
+scenario. Results are compared against ``baseline.json``; a scenario whose
+throughput drops, or whose peak RSS or API call count grows, by more than
+``--tolerance`` is reported as a regression and the run exits with status 1.
+A scenario without a baseline fails the run too, so a missing ``baseline.json``
+cannot pass as "no regressions"; record one with ``--update-baseline``.
+
+Run it inside the local runner image, where Airflow and the plugin
+requirements are installed::
+
+    ./mwaa-local-env benchmark
+    python3 benchmarks/run_benchmarks.py --scenario docebo_user_streamed --update-baseline
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_FILE = os.path.join(BENCHMARKS_FOLDER, "baseline.json")
+
+# Larger is better for these metrics, smaller is better for the others.
+HIGHER_IS_BETTER = ("rows_per_second",)
+COMPARED_METRICS = ("rows_per_second", "peak_rss_mb", "api_calls")
+
+
+def plugins_folder():
+    folder = os.environ.get("AIRFLOW__CORE__PLUGINS_FOLDER")
+    if folder and os.path.isdir(folder):
+        return folder
+    return os.path.join(os.path.dirname(BENCHMARKS_FOLDER), "plugins")
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def docebo_operator_class(s3_client):
+    from docebo_plugin.operators.docebo_dataload_operator import DoceboDataLoadOperator
+
+    class BenchmarkDoceboDataLoadOperator(DoceboDataLoadOperator):
+        def get_s3_client(self):
+            return s3_client
+
+    return BenchmarkDoceboDataLoadOperator
+
+
+def run_docebo(api_name, pages=50, page_size=200, latency=0.02, error_rate=0.01, **operator_kwargs):
+    from stubs import DoceboStub, InMemoryS3Client
+
+    with DoceboStub(pages=pages, report_pages=pages, report_page_rows=page_size,
+                    latency=latency, error_rate=error_rate) as stub:
+        endpoints = {
+            "user": "/manage/v1/user",
+            "courses": "/course/v1/courses",
+            "enrollments": "/course/v1/courses/enrollments",
+            "reports": "",
+        }
+        s3_client = InMemoryS3Client()
+        operator = docebo_operator_class(s3_client)(
+            task_id=f"benchmark_{api_name}",
+            client_id="benchmark",
+            client_secret="benchmark",
+            grant_type="password",
+            scope="api",
+            username="benchmark",
+            password="benchmark",
+            token_url=f"{stub.url}/oauth2/token",
+            api_endpoint=f"{stub.url}{endpoints[api_name]}",
+            s3_bucket="benchmark-bucket",
+            s3_secret_access_key="benchmark",
+            s3_access_key_id="benchmark",
+            s3_region="us-east-1",
+            destination_folder="landing",
+            api_name=api_name,
+            base_url=stub.url,
+            max_retries=10,
+            **operator_kwargs,
+        )
+        started = time.monotonic()
+        operator.execute({})
+        seconds = time.monotonic() - started
+        return {
+            "seconds": seconds,
+            "rows": stub.rows_served,
+            "api_calls": stub.api_calls,
+            "bytes_uploaded": s3_client.bytes_stored,
+        }
+
+
+def run_powerbi_batch(datasets=20, refresh_duration=2.0, capacity=5, latency=0.01, error_rate=0.0):
+    from stubs import PowerBIStub, StaticTokenProvider
+
+    with PowerBIStub(refresh_duration=refresh_duration, capacity=capacity,
+                     latency=latency, error_rate=error_rate) as stub:
+        # powerbi_api reads its host when it is first imported.
+        os.environ["POWERBI_API_URL"] = f"{stub.url}/v1.0/myorg"
+        from powerbi_plugin.operators.powerbi_batch_refresh_operator import PowerBIBatchDatasetRefreshOperator
+
+        class BenchmarkPowerBIBatchDatasetRefreshOperator(PowerBIBatchDatasetRefreshOperator):
+            def get_token_provider(self):
+                return StaticTokenProvider()
+
+        operator = BenchmarkPowerBIBatchDatasetRefreshOperator(
+            task_id="benchmark_powerbi_batch",
+            client_id="benchmark",
+            client_secret="benchmark",
+            tenant_name="benchmark",
+            datasets=[("workspace", f"dataset{index}") for index in range(datasets)],
+            max_concurrent_refreshes=capacity,
+            timeout_seconds=600,
+            check_interval_seconds=5,
+            min_check_interval_seconds=0.5,
+        )
+        started = time.monotonic()
+        operator.execute({})
+        seconds = time.monotonic() - started
+        return {"seconds": seconds, "rows": datasets, "api_calls": stub.api_calls}
+
+
+SCENARIOS = {
+    "docebo_user_buffered": lambda: run_docebo("user", output_format="csv"),
+    "docebo_user_streamed": lambda: run_docebo("user", output_format="csv", stream_to_s3=True),
+    "docebo_courses_parquet": lambda: run_docebo("courses", output_format="parquet"),
+    "docebo_reports": lambda: run_docebo("reports", pages=20, page_size=1000, report_parallel_pages=4),
+    "powerbi_batch": run_powerbi_batch,
+}
+
+
+def run_scenario(name):
+    """Run one scenario in this process and return its measurements."""
+    sys.path[:0] = [plugins_folder(), BENCHMARKS_FOLDER]
+    result = SCENARIOS[name]()
+    result["rows_per_second"] = result["rows"] / result["seconds"] if result["seconds"] > 0 else 0
+    result["peak_rss_mb"] = peak_rss_mb()
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def run_isolated(name):
+    """Run ``name`` in a child process so its peak RSS is not shared with other scenarios."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-scenario", name],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(completed.stdout.decode("utf-8").strip().splitlines()[-1])
+
+
+def compare(name, result, baseline, tolerance):
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+    regressions = []
+    for metric in COMPARED_METRICS:
+        expected = baseline.get(metric)
+        actual = result.get(metric)
+        if not expected or actual is None:
+            continue
+        change = (actual - expected) / expected
+        if metric in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{name}: {metric} {actual} vs baseline {expected} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run; may be repeated. Defaults to all of them.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression before the run fails (default 0.2).")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store the results of this run as the new baseline.")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_scenario:
+        print(json.dumps(run_scenario(args.run_scenario)))
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name in args.scenario or sorted(SCENARIOS):
+        results[name] = run_isolated(name)
+        print(f"{name}: {json.dumps(results[name], sort_keys=True)}")
+        if name in baseline:
+            regressions.extend(compare(name, results[name], baseline[name], args.tolerance))
+        elif not args.update_baseline:
+            regressions.append(f"{name}: no baseline recorded in {args.baseline}, run with --update-baseline")
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    for regression in regressions:
+        print(f"FAILED {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Local stand-ins for the services the plugin operators talk to.
+
+* ``DoceboStub``: OAuth token endpoint, paginated list APIs
+  (``has_more_data``) and the analytics report export (``nextToken`` chain),
+  with configurable page count, latency and error rate.
+* ``PowerBIStub``: refreshes endpoint driving a refresh state machine per
+  dataset, with a seeded refresh history and a capacity limit.
+* ``InMemoryS3Client``: the subset of the boto3 S3 client the operators use.
+
+The HTTP stubs run on ``ThreadingHTTPServer`` in a background thread of the
+benchmark process and count every request they serve.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        status, body, headers = self.server.stub.handle(method, url.path, query)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+class StubServer:
+    """Base class: serves ``handle(method, path, query)`` on a free local port."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def api_calls(self):
+        return sum(self.calls.values())
+
+    def count(self, label):
+        with self._lock:
+            self.calls[label] += 1
+
+    def inject_error(self):
+        """Sleep ``latency`` and, with probability ``error_rate``, return a throttling response."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            return 429, {"message": "Too Many Requests"}, {"Retry-After": "0"}
+        return None
+
+    def handle(self, method, path, query):
+        raise NotImplementedError
+
+
+class DoceboStub(StubServer):
+    """
+    Docebo tenant serving ``pages`` pages per list API and ``report_pages``
+    pages of report rows. The report export answers 400 (not ready) for its
+    first ``not_ready_polls`` polls.
+    """
+
+    LIST_PATHS = {
+        "/manage/v1/user": "user",
+        "/course/v1/courses": "courses",
+        "/course/v1/courses/enrollments": "enrollments",
+    }
+
+    def __init__(self, pages=50, report_pages=10, report_page_rows=1000, not_ready_polls=0,
+                 report_name="User_Awards_API", **kwargs):
+        super().__init__(**kwargs)
+        self.pages = pages
+        self.report_pages = report_pages
+        self.report_page_rows = report_page_rows
+        self.not_ready_polls = not_ready_polls
+        self.report_name = report_name
+        self.rows_served = 0
+        self._polls = 0
+
+    def item(self, api_name, index):
+        item = {
+            "user_id": index,
+            "username": f"learner{index}",
+            "first_name": f"First{index}",
+            "last_name": f"Last{index}",
+            "email": f"learner{index}@example.com",
+            "last_update": "2024-01-01 00:00:00",
+            "avatar": "",
+            "actions": [],
+        }
+        if api_name == "courses":
+            item.update({"id": index, "code": f"C{index}", "title": f"Course {index}", "type": "elearning"})
+        elif api_name == "enrollments":
+            item.update({"course_id": index % 97, "course_name": f"Course {index % 97}",
+                         "enrollment_date_last_updated": "2024-01-01 00:00:00"})
+        return item
+
+    def list_page(self, api_name, query):
+        page = int(query.get("page", 1))
+        page_size = int(query.get("page_size", 200))
+        items = []
+        if page <= self.pages:
+            start = (page - 1) * page_size
+            items = [self.item(api_name, start + offset) for offset in range(page_size)]
+        with self._lock:
+            self.rows_served += len(items)
+        return {"data": {"items": items, "has_more_data": page < self.pages}}
+
+    def report_page(self, query):
+        page = int(query.get("page", 1))
+        rows = []
+        if page <= self.report_pages:
+            start = (page - 1) * self.report_page_rows
+            rows = [
+                {"username": f"learner{index}", "employee_id": str(index), "full_name": f"Learner {index}"}
+                for index in range(start, start + self.report_page_rows)
+            ]
+        with self._lock:
+            self.rows_served += len(rows)
+        return {"data": rows, "nextToken": f"token{page + 1}" if page < self.report_pages else None}
+
+    def handle(self, method, path, query):
+        if path == "/oauth2/token":
+            self.count("token")
+            return 200, {"access_token": "stub-token", "expires_in": 3600}, None
+        if path in self.LIST_PATHS:
+            self.count(self.LIST_PATHS[path])
+            return self.inject_error() or (200, self.list_page(self.LIST_PATHS[path], query), None)
+        if path == "/analytics/v1/reports":
+            self.count("reports")
+            return 200, {"data": [{"name": self.report_name, "idReport": "report-1"}]}, None
+        if path.endswith("/export/csv"):
+            self.count("reports/export")
+            return 200, {"data": {"executionId": "export-1"}}, None
+        if path.endswith("/results"):
+            self.count("reports/export/results")
+            with self._lock:
+                self._polls += 1
+                not_ready = self._polls <= self.not_ready_polls
+            if not_ready:
+                return 400, {"message": "Export not ready"}, None
+            return self.inject_error() or (200, self.report_page(query), None)
+        return 404, {"message": f"Unknown path {path}"}, None
+
+
+class PowerBIStub(StubServer):
+    """
+    Power BI refreshes endpoint. A triggered refresh reports ``Unknown`` until
+    ``refresh_duration`` (plus up to ``duration_jitter``) seconds have passed
+    and then ``Completed``. Every dataset starts with ``history_size``
+    completed refreshes of about ``refresh_duration`` seconds, and at most
+    ``capacity`` refreshes run at once; more are rejected with 429.
+    """
+
+    def __init__(self, refresh_duration=2.0, duration_jitter=0.5, history_size=5, capacity=None, **kwargs):
+        super().__init__(**kwargs)
+        self.refresh_duration = refresh_duration
+        self.duration_jitter = duration_jitter
+        self.history_size = history_size
+        self.capacity = capacity
+        self.refreshes = {}
+
+    def _timestamp(self, epoch):
+        return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    def _history(self, dataset):
+        if dataset not in self.refreshes:
+            now = time.time()
+            self.refreshes[dataset] = [
+                {"start": now - 3600 * (index + 1), "duration": self.refresh_duration}
+                for index in range(self.history_size)
+            ]
+        return self.refreshes[dataset]
+
+    def _running(self, now):
+        return sum(
+            1 for history in self.refreshes.values()
+            for refresh in history if refresh["start"] + refresh["duration"] > now
+        )
+
+    def _as_json(self, refresh, now):
+        done = refresh["start"] + refresh["duration"] <= now
+        item = {
+            "requestId": str(uuid.uuid5(uuid.NAMESPACE_OID, str(refresh["start"]))),
+            "id": int(refresh["start"] * 1000),
+            "refreshType": "ViaApi",
+            "startTime": self._timestamp(refresh["start"]),
+            "status": "Completed" if done else "Unknown",
+        }
+        if done:
+            item["endTime"] = self._timestamp(refresh["start"] + refresh["duration"])
+        return item
+
+    def handle(self, method, path, query):
+        parts = path.strip("/").split("/")
+        if len(parts) != 7 or parts[2] != "groups" or parts[4] != "datasets" or parts[6] != "refreshes":
+            return 404, {"message": f"Unknown path {path}"}, None
+        dataset = (parts[3], parts[5])
+        self.count(f"refreshes.{method}")
+        error = self.inject_error()
+        if error:
+            return error
+        now = time.time()
+        with self._lock:
+            history = self._history(dataset)
+            if method == "POST":
+                if self.capacity is not None and self._running(now) >= self.capacity:
+                    return 429, {"message": "Capacity limit reached"}, None
+                duration = self.refresh_duration + self._random.uniform(0, self.duration_jitter)
+                history.append({"start": now, "duration": duration})
+                return 202, None, None
+            top = int(query.get("$top", 1))
+            latest = sorted(history, key=lambda refresh: refresh["start"], reverse=True)[:top]
+            return 200, {"value": [self._as_json(refresh, now) for refresh in latest]}, None
+
+
+class InMemoryS3Client:
+    """The part of the boto3 S3 client used by the Docebo operators, keeping objects in memory."""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = Counter()
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_stored(self):
+        return sum(len(body) for body in self.objects.values())
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        body = Body if isinstance(Body, bytes) else Body.encode("utf-8")
+        with self._lock:
+            self.calls["put_object"] += 1
+            self.objects[(Bucket, Key)] = body
+        return {"ETag": f'"{uuid.uuid4().hex}"'}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.calls["create_multipart_upload"] += 1
+            self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        etag = f'"{uuid.uuid4().hex}"'
+        with self._lock:
+            self.calls["upload_part"] += 1
+            self._uploads[UploadId][PartNumber] = (etag, bytes(Body))
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        with self._lock:
+            self.calls["complete_multipart_upload"] += 1
+            parts = self._uploads.pop(UploadId)
+            body = b"".join(parts[part["PartNumber"]][1] for part in MultipartUpload["Parts"])
+            self.objects[(Bucket, Key)] = body
+        return {"ETag": f'"{uuid.uuid4().hex}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        with self._lock:
+            self.calls["abort_multipart_upload"] += 1
+            self._uploads.pop(UploadId, None)
+        return {}
+
+
+class StaticTokenProvider:
+    """Stands in for ``PowerBITokenProvider`` so the benchmark never talks to Azure AD."""
+
+    def get_token(self):
+        return "stub-token"
+
+    def invalidate(self):
+        pass
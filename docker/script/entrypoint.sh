@@ -1,12 +1,19 @@
 #!/usr/bin/env bash
 
-TRY_LOOP="20"
+# Seconds a port probe keeps retrying before giving up
+: "${PORT_WAIT_TIMEOUT:="100"}"
+# Per-phase durations of the local-runner boot, one "<phase> <seconds> <exit status>" line each
+: "${BOOT_TIMINGS_FILE:="/tmp/boot-timings"}"
 
 # Global defaults
 : "${AIRFLOW_HOME:="/usr/local/airflow"}"
 : "${AIRFLOW__CORE__FERNET_KEY:=${FERNET_KEY:=$(cat /usr/local/etc/airflow_fernet_key)}}"
 : "${AIRFLOW__CORE__EXECUTOR:=${EXECUTOR:-Sequential}Executor}"
 : "${REQUIREMENTS_FILE:="requirements/requirements.txt"}"
+# Wheels built for requirements.txt, reused across containers (see the requirements-cache volume)
+: "${REQUIREMENTS_CACHE_DIR:="$AIRFLOW_HOME/.cache/requirements"}"
+# Install only from the wheel cache and the packaged WHL files in plugins/, never from the index
+: "${REQUIREMENTS_OFFLINE:="False"}"
 
 # Load DAGs examples (default: Yes)
 if [[ -z "$AIRFLOW__CORE__LOAD_EXAMPLES" && "${LOAD_EX:=n}" == n ]]; then
@@ -19,6 +26,50 @@ export \
   AIRFLOW__CORE__FERNET_KEY \
   AIRFLOW__CORE__LOAD_EXAMPLES \
 
+# Constraint files referenced by a requirements file (-c / --constraint lines), one per line
+requirements_constraints() {
+  sed -n -E 's/^[[:space:]]*(-c|--constraint)[[:space:]=]+"?([^"[:space:]]+)"?.*/\2/p' "$1"
+}
+
+# Hash of everything that decides what a requirements install produces: the file, its
+# constraints, the Python version and the packaged WHL files in plugins/
+requirements_hash() {
+  local requirements="$1" constraint
+  {
+    cat "$requirements"
+    for constraint in $(requirements_constraints "$requirements"); do
+      case "$constraint" in
+        http://*|https://*) echo "$constraint" ;;
+        /*) cat "$constraint" 2>/dev/null ;;
+        *) cat "$(dirname "$requirements")/$constraint" 2>/dev/null ;;
+      esac
+    done
+    python3 --version
+    ls "$AIRFLOW_HOME/plugins" 2>/dev/null | grep -E '\.(whl|tar\.gz)$'
+  } | sha256sum | cut -d ' ' -f1
+}
+
+# Copy of a requirements file whose constraints point at local files, downloading constraint URLs
+# into the cache once, so installs from the cache never need the network
+localize_requirements() {
+  local requirements="$1" target="$2" constraint cached
+  cp "$requirements" "$target"
+  for constraint in $(requirements_constraints "$requirements"); do
+    case "$constraint" in
+      http://*|https://*)
+        cached="$REQUIREMENTS_CACHE_DIR/constraints/$(echo -n "$constraint" | sha256sum | cut -d ' ' -f1).txt"
+        if [[ ! -s "$cached" ]]; then
+          mkdir -p "$REQUIREMENTS_CACHE_DIR/constraints"
+          curl -fsSL "$constraint" -o "$cached.tmp" && mv "$cached.tmp" "$cached" || return 1
+        fi
+        ;;
+      /*) continue ;;
+      *) cached="$(cd "$(dirname "$requirements")" && pwd)/$constraint" ;;
+    esac
+    sed -i "s|$constraint|$cached|" "$target"
+  done
+}
+
 # Install custom python package if requirements.txt is present
 install_requirements() {
     # Install custom python package if requirements.txt is present
@@ -30,8 +81,42 @@ install_requirements() {
               echo "WARNING: Constraints should be specified for requirements.txt. Please see https://docs.aws.amazon.com/mwaa/latest/userguide/working-dags-dependencies.html#working-dags-dependencies-test-create"
           fi
       fi    
-        echo "Installing requirements.txt"
-        pip3 install --user -r "$AIRFLOW_HOME/$REQUIREMENTS_FILE"
+        local requirements="$AIRFLOW_HOME/$REQUIREMENTS_FILE"
+        local hash installed_marker wheels localized
+        hash=$(requirements_hash "$requirements")
+        # Lives in the container, so a restarted container skips the install entirely
+        installed_marker="$AIRFLOW_HOME/.local/.requirements.sha256"
+        if [[ "$(cat "$installed_marker" 2>/dev/null)" == "$hash" ]]; then
+          echo "requirements.txt unchanged (${hash:0:12}), already installed"
+          return 0
+        fi
+
+        wheels="$REQUIREMENTS_CACHE_DIR/wheels"
+        localized="$REQUIREMENTS_CACHE_DIR/requirements-$hash.txt"
+        mkdir -p "$wheels"
+        if ! localize_requirements "$requirements" "$localized"; then
+          echo "Could not cache the constraints of requirements.txt, installing from the index"
+          pip3 install --user -r "$requirements"
+          return
+        fi
+
+        if [[ ! -e "$REQUIREMENTS_CACHE_DIR/$hash.complete" && "$REQUIREMENTS_OFFLINE" != "True" ]]; then
+          echo "Building wheels for requirements.txt (${hash:0:12}) into $wheels"
+          pip3 wheel --wheel-dir "$wheels" --find-links "$wheels" --find-links "$AIRFLOW_HOME/plugins" -r "$localized" \
+            && touch "$REQUIREMENTS_CACHE_DIR/$hash.complete"
+        fi
+
+        echo "Installing requirements.txt from the wheel cache"
+        if pip3 install --user --no-index --find-links "$wheels" --find-links "$AIRFLOW_HOME/plugins" -r "$localized"; then
+          mkdir -p "$(dirname "$installed_marker")"
+          echo "$hash" > "$installed_marker"
+        elif [[ "$REQUIREMENTS_OFFLINE" == "True" ]]; then
+          echo "ERROR: requirements.txt is not fully available in $wheels or plugins/ and REQUIREMENTS_OFFLINE=True"
+          return 1
+        else
+          echo "Wheel cache incomplete, installing requirements.txt from the index"
+          pip3 install --user -r "$requirements" && echo "$hash" > "$installed_marker"
+        fi
     fi
 }
 
@@ -48,20 +133,45 @@ package_requirements() {
     fi
 }
 
+# Probe a port with exponential backoff (0.1s doubling up to 2s) until it accepts connections
 wait_for_port() {
-  local name="$1" host="$2" port="$3"
-  local j=0
-  while ! nc -z "$host" "$port" >/dev/null 2>&1 < /dev/null; do
-    j=$((j+1))
-    if [ $j -ge $TRY_LOOP ]; then
-      echo >&2 "$(date) - $host:$port still not reachable, giving up"
-      exit 1
+  local name="$1" host="$2" port="$3" timeout="${4:-$PORT_WAIT_TIMEOUT}"
+  local delay="0.1" attempt=0 deadline=$((SECONDS + timeout))
+  while ! nc -z -w 1 "$host" "$port" >/dev/null 2>&1 < /dev/null; do
+    attempt=$((attempt+1))
+    if [ $SECONDS -ge $deadline ]; then
+      echo >&2 "$(date) - $host:$port still not reachable after ${timeout}s, giving up"
+      return 1
+    fi
+    if [ $((attempt % 5)) -eq 1 ]; then
+      echo "$(date) - waiting for $name... attempt $attempt"
     fi
-    echo "$(date) - waiting for $name... $j/$TRY_LOOP"
-    sleep 5
+    sleep "$delay"
+    delay=$(awk -v delay="$delay" 'BEGIN { delay *= 2; print (delay > 2 ? 2 : delay) }')
   done
 }
 
+seconds_since() {
+  awk -v started="$1" -v now="$EPOCHREALTIME" 'BEGIN { printf "%.2f", now - started }'
+}
+
+# Run "$@" as boot phase $1 and record how long it took in $BOOT_TIMINGS_FILE
+run_phase() {
+  local name="$1" started="$EPOCHREALTIME" status seconds
+  shift
+  "$@"
+  status=$?
+  seconds=$(seconds_since "$started")
+  echo "$name $seconds $status" >> "$BOOT_TIMINGS_FILE"
+  echo "$(date) - boot phase $name finished in ${seconds}s"
+  return $status
+}
+
+print_boot_timings() {
+  echo "Boot finished in $(seconds_since "$BOOT_STARTED")s:"
+  awk '{ printf "  %-22s %8ss%s\n", $1, $2, ($3 == 0 ? "" : "  (exit " $3 ")") }' "$BOOT_TIMINGS_FILE"
+}
+
 execute_startup_script() {
   # Execute customer provided shell script
   if [[ -e "$AIRFLOW_HOME/startup/startup.sh" ]]; then
@@ -75,6 +185,32 @@ execute_startup_script() {
   fi
 }
 
+wait_for_database() {
+  if [ -n "$POSTGRES_HOST" ]; then
+    wait_for_port "Postgres" "$POSTGRES_HOST" "$POSTGRES_PORT"
+  fi
+}
+
+# Skip "airflow db init" when the schema is already at the installed Airflow version
+prepare_database() {
+  wait_for_database || return 1
+  if airflow db check-migrations --migration-wait-timeout 0 >/dev/null 2>&1; then
+    echo "Database schema is up to date, skipping airflow db init"
+  else
+    airflow db init
+  fi
+}
+
+# Runs alongside the webserver boot, which syncs the same FAB roles, so a conflicting first attempt is retried
+create_admin_user() {
+  local attempt
+  for attempt in 1 2 3; do
+    airflow users create -r Admin -u admin -e admin@example.com -f admin -l user -p $DEFAULT_PASSWORD && return 0
+    sleep 2
+  done
+  return 1
+}
+
 # Other executors than SequentialExecutor drive the need for an SQL database, here PostgreSQL is used
 if [ "$AIRFLOW__CORE__EXECUTOR" != "SequentialExecutor" ]; then
   # Check if the user has provided explicit Airflow configuration concerning the database
@@ -96,50 +232,42 @@ if [ "$AIRFLOW__CORE__EXECUTOR" != "SequentialExecutor" ]; then
     POSTGRES_PORT=$(echo -n "$POSTGRES_ENDPOINT" | cut -d ':' -f2)
   fi
 
-  wait_for_port "Postgres" "$POSTGRES_HOST" "$POSTGRES_PORT"
+  # local-runner waits for the database while it installs requirements
+  if [ "$1" != "local-runner" ]; then
+    wait_for_database || exit 1
+  fi
 fi
 
 
 case "$1" in
   local-runner)
-    # if S3_PLUGINS_PATH
-    if [ -n "$S3_PLUGINS_PATH" ]; then
-      echo "Downloading $S3_PLUGINS_PATH"
-      mkdir -p $AIRFLOW_HOME/plugins
-      cd $AIRFLOW_HOME/plugins
-      aws s3 cp $S3_PLUGINS_PATH plugins.zip
-      unzip -o plugins.zip 
-      rm plugins.zip
-    fi
-    # if S3_DAGS_PATH
-    if [ -n "$S3_DAGS_PATH" ]; then
-      echo "Syncing $S3_DAGS_PATH"   
-      mkdir -p $AIRFLOW_HOME/dags
-      cd $AIRFLOW_HOME/dags
-      aws s3 sync --exact-timestamp --delete $S3_DAGS_PATH .
-    fi    
-    # if S3_REQUIREMENTS_PATH
-    if [ -n "$S3_REQUIREMENTS_PATH" ]; then
-      echo "Downloading $S3_REQUIREMENTS_PATH"
-      mkdir -p $AIRFLOW_HOME/requirements
-      aws s3 cp $S3_REQUIREMENTS_PATH $AIRFLOW_HOME/$REQUIREMENTS_FILE
+    BOOT_STARTED="$EPOCHREALTIME"
+    : > "$BOOT_TIMINGS_FILE"
+    # if S3_PLUGINS_PATH, S3_DAGS_PATH or S3_REQUIREMENTS_PATH: fetch them concurrently, skipping what is unchanged
+    if [ -n "$S3_PLUGINS_PATH$S3_DAGS_PATH$S3_REQUIREMENTS_PATH" ]; then
+      run_phase s3_sync python3 /s3_sync.py
     fi
 
+    # Sources stored_env itself when a startup script ran
+    run_phase startup_script execute_startup_script
 
-    execute_startup_script
-    source stored_env
-    export AIRFLOW_HOME="/usr/local/airflow"
-    export AIRFLOW__CORE__LOAD_EXAMPLES="False"
+    # Installing requirements and waiting for / migrating the database do not depend on each other
+    run_phase install_requirements install_requirements &
+    install_pid=$!
+    if ! run_phase database prepare_database; then
+      echo >&2 "$(date) - database is not available, giving up"
+      exit 1
+    fi
+    wait $install_pid || echo "WARNING: installing requirements.txt failed, see the output above"
 
-    install_requirements
-    airflow db init
     if [ "$AIRFLOW__CORE__EXECUTOR" = "LocalExecutor" ] || [ "$AIRFLOW__CORE__EXECUTOR" = "SequentialExecutor" ]; then
       # With the "Local" and "Sequential" executors it should all run in one container.
       airflow scheduler &
       airflow triggerer &
-      sleep 2
     fi
-    airflow users create -r Admin -u admin -e admin@example.com -f admin -l user -p $DEFAULT_PASSWORD
+    # The admin user is only needed once the UI is up, so create it while the webserver boots
+    run_phase users_create create_admin_user &
+    (run_phase webserver wait_for_port "Webserver" localhost 8080 300 && print_boot_timings) &
     exec airflow webserver
     ;;
   resetdb)
@@ -150,24 +278,24 @@ case "$1" in
   test-requirements)
     # if S3_REQUIREMENTS_PATH
     if [ -n "$S3_REQUIREMENTS_PATH" ]; then
-      echo "Downloading $S3_REQUIREMENTS_PATH"
-      mkdir -p $AIRFLOW_HOME/requirements
-      aws s3 cp $S3_REQUIREMENTS_PATH $AIRFLOW_HOME/$REQUIREMENTS_FILE
-    fi      
+      python3 /s3_sync.py requirements
+    fi
     install_requirements
     ;;
   package-requirements)
     # if S3_REQUIREMENTS_PATH
     if [ -n "$S3_REQUIREMENTS_PATH" ]; then
-      echo "Downloading $S3_REQUIREMENTS_PATH"
-      mkdir -p $AIRFLOW_HOME/requirements
-      aws s3 cp $S3_REQUIREMENTS_PATH $AIRFLOW_HOME/$REQUIREMENTS_FILE
-    fi      
+      python3 /s3_sync.py requirements
+    fi
     package_requirements
     ;;
   test-startup-script)
     execute_startup_script
     ;;
+  profile-parse)
+    shift
+    exec python3 /parse_profiler.py "$@"
+    ;;
   *)
     # The command is something like bash, not an airflow subcommand. Just run it in the right environment.
     exec "$@"
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Profile what it costs to parse every DAG file and plugin module.
+
+Each file is loaded in a fresh Python process that has already imported
+Airflow, like a DAG file processor does: DAG files through
+``DagBag.process_file``, plugin modules by importing them from the plugins
+folder. For every file it records the wall time, the resident memory it
+added, the SQL statements it sent to the metadata DB and the import-time tree
+(``python -X importtime``) of the modules it pulled in.
+
+Budgets (``--max-seconds``, ``--max-memory-mb``, ``--max-queries``, or the
+``PARSE_BUDGET_*`` environment variables) are checked per file; the command
+exits with status 1 when any file exceeds one, printing the heaviest imports
+of the offending files. ``dagbag_import_timeout`` (30s in airflow.cfg) is
+where MWAA kills a parse, so keep the time budget well below it.
+
+Usage: parse_profiler.py [--dags-folder DIR] [--plugins-folder DIR] [--tree] [--json FILE]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+AIRFLOW_HOME = os.environ.get("AIRFLOW_HOME", "/usr/local/airflow")
+START_MARKER = "parse-profiler: start"
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_file(kind, path, plugins_folder, trace_memory):
+    """Child process: load ``path`` once and return its measurements."""
+    # Everything a DAG file processor has loaded before it parses a file is excluded from the measurement.
+    import airflow  # noqa: F401
+    from airflow.models.dagbag import DagBag
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if plugins_folder not in sys.path:
+        sys.path.append(plugins_folder)
+    queries = []
+    event.listen(Engine, "before_cursor_execute", lambda conn, cursor, statement, *args: queries.append(statement))
+    dagbag = DagBag(dag_folder=path, include_examples=False, collect_dags=False) if kind == "dag" else None
+    if trace_memory:
+        import tracemalloc
+
+        tracemalloc.start()
+
+    # Written straight to fd 2 so it lands in order with the interpreter's importtime lines.
+    os.write(2, f"{START_MARKER}\n".encode())
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    errors = []
+    dags = []
+    try:
+        if kind == "dag":
+            dags = [dag.dag_id for dag in dagbag.process_file(path, only_if_updated=False)]
+            errors = [str(error) for error in dagbag.import_errors.values()]
+        else:
+            import importlib
+
+            importlib.import_module(module_name(path, plugins_folder))
+    except BaseException as error:
+        errors.append(repr(error))
+    result = {
+        "seconds": time.perf_counter() - started,
+        "memory_mb": current_rss_mb() - rss_before,
+        "queries": len(queries),
+        "statements": [statement.split("\n")[0][:120] for statement in queries[:5]],
+        "dags": dags,
+        "errors": errors,
+    }
+    if trace_memory:
+        result["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    return result
+
+
+def module_name(path, plugins_folder):
+    relative = os.path.splitext(os.path.relpath(path, plugins_folder))[0]
+    parts = relative.split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def dag_files(dags_folder):
+    from airflow.utils.file import list_py_file_paths
+
+    return list_py_file_paths(dags_folder, include_examples=False)
+
+
+def plugin_files(plugins_folder):
+    """Python files under the plugins folder, honouring .airflowignore like the plugins manager."""
+    from airflow.utils.file import find_path_from_directory
+
+    files = []
+    for path in find_path_from_directory(plugins_folder, ".airflowignore"):
+        if path.endswith(".py") and module_name(path, plugins_folder):
+            files.append(path)
+    return sorted(files)
+
+
+class ImportNode:
+    def __init__(self, name, self_us, cumulative_us, level):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.level = level
+        self.children = []
+
+    def to_dict(self, depth):
+        node = {"module": self.name, "cumulative_ms": round(self.cumulative_us / 1000, 1)}
+        if depth > 0 and self.children:
+            heaviest = sorted(self.children, key=lambda child: child.cumulative_us, reverse=True)
+            node["children"] = [child.to_dict(depth - 1) for child in heaviest[:5]]
+        return node
+
+
+def parse_import_tree(stderr):
+    """Top-level ``ImportNode``s of the imports logged after the start marker, heaviest first."""
+    lines = stderr.split(START_MARKER, 1)[-1].splitlines()
+    stack = []
+    for line in lines:
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        node = ImportNode(name, int(self_us), int(cumulative_us), len(indent) // 2)
+        # importtime logs a module after everything it imported, one level deeper.
+        while stack and stack[-1].level > node.level:
+            child = stack.pop()
+            if child.level == node.level + 1:
+                node.children.insert(0, child)
+        stack.append(node)
+    return sorted(stack, key=lambda node: node.cumulative_us, reverse=True)
+
+
+def profile(kind, path, plugins_folder, trace_memory, timeout):
+    """Parent process: run one child and merge its measurements with its import tree."""
+    command = [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", kind, path,
+               "--plugins-folder", plugins_folder]
+    if trace_memory:
+        command.append("--tracemalloc")
+    record = {"kind": kind, "file": path}
+    try:
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        record.update(seconds=timeout, memory_mb=0, queries=0, errors=[f"timed out after {timeout}s"], imports=[])
+        return record
+    stdout = completed.stdout.decode("utf-8", "replace").strip().splitlines()
+    stderr = completed.stderr.decode("utf-8", "replace")
+    try:
+        record.update(json.loads(stdout[-1]))
+    except (IndexError, ValueError):
+        tail = [line for line in stderr.splitlines() if not line.startswith("import time:")][-5:]
+        record.update(seconds=0, memory_mb=0, queries=0, errors=[f"profiler child failed: {' '.join(tail)}"])
+    record["imports"] = parse_import_tree(stderr)
+    return record
+
+
+def check_budgets(record, budgets):
+    violations = []
+    if record["errors"]:
+        violations.append(f"failed to load: {record['errors'][0][:200]}")
+    if record["seconds"] > budgets["seconds"]:
+        violations.append(f"{record['seconds']:.2f}s > {budgets['seconds']}s")
+    if record["memory_mb"] > budgets["memory_mb"]:
+        violations.append(f"{record['memory_mb']:.0f} MB > {budgets['memory_mb']} MB")
+    if record["queries"] > budgets["queries"]:
+        violations.append(f"{record['queries']} DB queries > {budgets['queries']}: {record.get('statements')}")
+    return violations
+
+
+def print_tree(nodes, limit=5, depth=2, indent="      "):
+    for node in nodes[:limit]:
+        print(f"{indent}{node.cumulative_us / 1000:9.1f} ms  {node.name}")
+        if depth > 1:
+            children = sorted(node.children, key=lambda child: child.cumulative_us, reverse=True)
+            print_tree(children, limit=3, depth=depth - 1, indent=indent + "  ")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile DAG and plugin parse cost against budgets.")
+    parser.add_argument("--dags-folder", default=os.environ.get("AIRFLOW__CORE__DAGS_FOLDER", os.path.join(AIRFLOW_HOME, "dags")))
+    parser.add_argument("--plugins-folder", default=os.environ.get("AIRFLOW__CORE__PLUGINS_FOLDER", os.path.join(AIRFLOW_HOME, "plugins")))
+    parser.add_argument("--max-seconds", type=float, default=float(os.environ.get("PARSE_BUDGET_SECONDS", 5)),
+                        help="Per-file parse time budget (default 5s).")
+    parser.add_argument("--max-memory-mb", type=float, default=float(os.environ.get("PARSE_BUDGET_MEMORY_MB", 200)),
+                        help="Per-file resident memory budget (default 200 MB).")
+    parser.add_argument("--max-queries", type=int, default=int(os.environ.get("PARSE_BUDGET_QUERIES", 0)),
+                        help="Per-file metadata DB query budget (default 0).")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Also record the peak of Python allocations; slows imports down, so times are inflated.")
+    parser.add_argument("--tree", action="store_true", help="Print the heaviest imports of every file, not only failing ones.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds before a file's child process is killed.")
+    parser.add_argument("--json", help="Write all measurements to this file.")
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        kind, path = args.child
+        print(json.dumps(load_file(kind, path, args.plugins_folder, args.tracemalloc)))
+        return 0
+
+    targets = [("plugin", path) for path in plugin_files(args.plugins_folder)]
+    targets += [("dag", path) for path in dag_files(args.dags_folder)]
+    budgets = {"seconds": args.max_seconds, "memory_mb": args.max_memory_mb, "queries": args.max_queries}
+    print(f"Profiling {len(targets)} files with budgets {budgets}")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        records = list(executor.map(
+            lambda target: profile(target[0], target[1], args.plugins_folder, args.tracemalloc, args.timeout), targets
+        ))
+
+    failed = 0
+    for record in sorted(records, key=lambda record: record["seconds"], reverse=True):
+        violations = check_budgets(record, budgets)
+        failed += bool(violations)
+        status = "FAIL" if violations else "ok"
+        relative = os.path.relpath(record["file"], AIRFLOW_HOME)
+        print(f"{status:4} {record['seconds']:7.2f}s {record['memory_mb']:7.1f} MB {record['queries']:4} queries  {relative}")
+        for violation in violations:
+            print(f"      {violation}")
+        if violations or args.tree:
+            print_tree(record["imports"])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                [dict(record, imports=[node.to_dict(2) for node in record["imports"][:10]]) for record in records],
+                f, indent=2,
+            )
+    print(f"{failed} of {len(records)} files over budget" if failed else f"All {len(records)} files within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
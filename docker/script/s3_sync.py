@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Fetch DAGs, plugins and requirements from S3 at container start.
+
+Replaces the sequential ``aws s3 cp`` / ``aws s3 sync`` calls of the
+``local-runner`` entrypoint. The three stages run concurrently and only move
+what changed since the last run, tracked in a manifest of S3 ETags:
+
+* plugins: ``S3_PLUGINS_PATH`` (a plugins.zip) is skipped when its ETag is
+  unchanged; otherwise only the members whose CRC or size changed are
+  extracted, and members dropped from the archive are removed again.
+* dags: ``S3_DAGS_PATH`` is mirrored like ``aws s3 sync --delete``, objects
+  downloading in parallel when their ETag changed.
+* requirements: ``S3_REQUIREMENTS_PATH`` is downloaded when its ETag changed.
+
+Bytes transferred and elapsed time are reported per stage. Point
+``--endpoint-url`` (or ``S3_ENDPOINT_URL``) at a local S3 stand-in such as
+``moto_server`` or MinIO to try it without AWS.
+
+Usage: s3_sync.py [plugins] [dags] [requirements]   (default: every stage whose path is set)
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import boto3
+from botocore.config import Config
+
+AIRFLOW_HOME = os.environ.get("AIRFLOW_HOME", "/usr/local/airflow")
+DEFAULT_MANIFEST_FILE = os.path.join(AIRFLOW_HOME, ".cache", "s3_sync", "manifest.json")
+STAGES = ("plugins", "dags", "requirements")
+
+
+def split_s3_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme != "s3" or not parsed.netloc:
+        raise ValueError(f"Expected an s3://bucket/key URL, got {url!r}")
+    return parsed.netloc, parsed.path.lstrip("/")
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def download(s3, bucket, key, destination, last_modified=None):
+    """Download one object atomically. Returns the number of bytes written."""
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    temporary = f"{destination}.s3sync"
+    s3.download_file(bucket, key, temporary)
+    os.replace(temporary, destination)
+    if last_modified is not None:
+        timestamp = last_modified.timestamp()
+        os.utime(destination, (timestamp, timestamp))
+    return os.path.getsize(destination)
+
+
+class StageResult:
+    def __init__(self, stage, source):
+        self.stage = stage
+        self.source = source
+        self.bytes = 0
+        self.files = 0
+        self.deleted = 0
+        self.skipped = False
+        self.error = None
+        self.seconds = 0.0
+
+    def describe(self):
+        if self.error:
+            return f"{self.stage}: FAILED after {self.seconds:.2f}s: {self.error}"
+        if self.skipped:
+            return f"{self.stage}: {self.source} unchanged, skipped in {self.seconds:.2f}s"
+        return (
+            f"{self.stage}: {self.files} files, {self.bytes / 1024 / 1024:.1f} MB"
+            f"{f', {self.deleted} deleted' if self.deleted else ''} from {self.source} in {self.seconds:.2f}s"
+        )
+
+
+class S3Sync:
+    """
+    Runs the sync stages against one S3 client and a shared ETag manifest.
+
+    :param airflow_home: Folder holding ``dags/``, ``plugins/`` and the requirements file.
+    :type airflow_home: str
+    :param max_workers: Number of DAG objects downloaded concurrently.
+    :type max_workers: int
+    :param s3_client: S3 client to use instead of a boto3 one built for ``endpoint_url``.
+    """
+
+    def __init__(self, airflow_home=AIRFLOW_HOME, requirements_file="requirements/requirements.txt",
+                 manifest_path=DEFAULT_MANIFEST_FILE, endpoint_url=None, max_workers=16, s3_client=None):
+        self.airflow_home = airflow_home
+        self.requirements_file = requirements_file
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+        self.max_workers = max_workers
+        # .env.localrunner sets S3_ENDPOINT_URL="" when no stand-in is used; boto3 rejects an empty endpoint.
+        self.s3 = s3_client or boto3.client(
+            "s3", endpoint_url=endpoint_url or None, config=Config(max_pool_connections=max_workers + 4)
+        )
+
+    def sync_plugins(self, url, result):
+        bucket, key = split_s3_url(url)
+        plugins_folder = os.path.join(self.airflow_home, "plugins")
+        previous = self.manifest.get("plugins", {})
+        etag = self.s3.head_object(Bucket=bucket, Key=key)["ETag"]
+        members = previous.get("members", {})
+        if (
+            previous.get("source") == url
+            and previous.get("etag") == etag
+            and all(os.path.exists(os.path.join(plugins_folder, name)) for name in members)
+        ):
+            result.skipped = True
+            return
+
+        with tempfile.TemporaryDirectory() as scratch:
+            archive = os.path.join(scratch, "plugins.zip")
+            result.bytes = download(self.s3, bucket, key, archive)
+            current = {}
+            with zipfile.ZipFile(archive) as zip_file:
+                for info in zip_file.infolist():
+                    if info.is_dir():
+                        continue
+                    current[info.filename] = [info.CRC, info.file_size]
+                    target = os.path.join(plugins_folder, info.filename)
+                    unchanged = members.get(info.filename) == current[info.filename] and os.path.exists(target)
+                    if unchanged and os.path.getsize(target) == info.file_size:
+                        continue
+                    zip_file.extract(info, plugins_folder)
+                    result.files += 1
+
+        # Only members this tool extracted earlier are removed; files mounted into plugins/ are left alone.
+        for name in set(members) - set(current):
+            try:
+                os.remove(os.path.join(plugins_folder, name))
+                result.deleted += 1
+            except FileNotFoundError:
+                pass
+        self.manifest["plugins"] = {"source": url, "etag": etag, "members": current}
+
+    def sync_dags(self, url, result):
+        bucket, prefix = split_s3_url(url)
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        dags_folder = os.path.join(self.airflow_home, "dags")
+        previous = self.manifest.get("dags", {})
+        known = previous.get("objects", {}) if previous.get("source") == url else {}
+
+        remote = {}
+        for page in self.s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                relative = item["Key"][len(prefix):]
+                if relative and not relative.endswith("/"):
+                    remote[relative] = item
+
+        def changed(relative):
+            local = os.path.join(dags_folder, relative)
+            item = remote[relative]
+            return (
+                known.get(relative) != item["ETag"]
+                or not os.path.exists(local)
+                or os.path.getsize(local) != item["Size"]
+            )
+
+        to_download = [relative for relative in remote if changed(relative)]
+
+        def fetch(relative):
+            item = remote[relative]
+            return download(self.s3, bucket, item["Key"], os.path.join(dags_folder, relative), item["LastModified"])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            result.bytes = sum(executor.map(fetch, to_download))
+        result.files = len(to_download)
+
+        # Mirror deletions like "aws s3 sync --delete".
+        for root, _, files in os.walk(dags_folder):
+            for name in files:
+                local = os.path.join(root, name)
+                if os.path.relpath(local, dags_folder) not in remote:
+                    os.remove(local)
+                    result.deleted += 1
+        result.skipped = not to_download and not result.deleted
+        self.manifest["dags"] = {"source": url, "objects": {relative: item["ETag"] for relative, item in remote.items()}}
+
+    def sync_requirements(self, url, result):
+        bucket, key = split_s3_url(url)
+        destination = os.path.join(self.airflow_home, self.requirements_file)
+        previous = self.manifest.get("requirements", {})
+        etag = self.s3.head_object(Bucket=bucket, Key=key)["ETag"]
+        if previous.get("source") == url and previous.get("etag") == etag and os.path.exists(destination):
+            result.skipped = True
+            return
+        result.bytes = download(self.s3, bucket, key, destination)
+        result.files = 1
+        self.manifest["requirements"] = {"source": url, "etag": etag}
+
+    def run_stage(self, stage, url):
+        result = StageResult(stage, url)
+        started = time.monotonic()
+        try:
+            getattr(self, f"sync_{stage}")(url, result)
+        except Exception as error:
+            result.error = repr(error)
+        result.seconds = time.monotonic() - started
+        print(result.describe(), flush=True)
+        return result
+
+    def run(self, sources):
+        """Run every ``{stage: s3_url}`` concurrently, then save the manifest."""
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(sources) or 1) as executor:
+            results = list(executor.map(lambda stage: self.run_stage(stage, sources[stage]), sources))
+        save_manifest(self.manifest_path, self.manifest)
+        total = sum(result.bytes for result in results)
+        print(f"s3 sync: {total / 1024 / 1024:.1f} MB in {time.monotonic() - started:.2f}s", flush=True)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch DAGs, plugins and requirements from S3.")
+    # No choices= here: with nargs="*" argparse rejects an empty list against them on Python 3.11.
+    parser.add_argument("stages", nargs="*", help=f"Stages to run, any of {', '.join(STAGES)} (default: all configured).")
+    parser.add_argument("--plugins", default=os.environ.get("S3_PLUGINS_PATH"))
+    parser.add_argument("--dags", default=os.environ.get("S3_DAGS_PATH"))
+    parser.add_argument("--requirements", default=os.environ.get("S3_REQUIREMENTS_PATH"))
+    parser.add_argument("--requirements-file", default=os.environ.get("REQUIREMENTS_FILE", "requirements/requirements.txt"))
+    parser.add_argument("--airflow-home", default=AIRFLOW_HOME)
+    parser.add_argument("--manifest", default=None, help=f"ETag manifest (default: {DEFAULT_MANIFEST_FILE}).")
+    parser.add_argument("--endpoint-url", default=os.environ.get("S3_ENDPOINT_URL") or None)
+    parser.add_argument("--max-workers", type=int, default=16)
+    args = parser.parse_args(argv)
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(STAGES)}")
+
+    sources = {
+        stage: getattr(args, stage)
+        for stage in (args.stages or STAGES)
+        if getattr(args, stage)
+    }
+    if not sources:
+        print("s3 sync: no S3 paths configured, nothing to do")
+        return 0
+
+    sync = S3Sync(
+        airflow_home=args.airflow_home,
+        requirements_file=args.requirements_file,
+        manifest_path=args.manifest or os.path.join(args.airflow_home, ".cache", "s3_sync", "manifest.json"),
+        endpoint_url=args.endpoint_url,
+        max_workers=args.max_workers,
+    )
+    results = sync.run(sources)
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
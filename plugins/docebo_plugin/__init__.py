@@ -1,12 +1,18 @@
 from airflow.plugins_manager import AirflowPlugin
-from docebo_plugin.operators.docebo_dataload_operator import DoceboDataLoadOperator
-from docebo_plugin import docebo_config
+from shared.lazy_imports import lazy_attributes
+
+__getattr__ = lazy_attributes(__name__, {
+    "DoceboDataLoadOperator": "docebo_plugin.operators.docebo_dataload_operator",
+    "S3FileArchivalOperator": "docebo_plugin.operators.s3_file_archival_operator",
+    "DoceboSnowflakeLoadOperator": "docebo_plugin.operators.snowflake_load_operator",
+    "docebo_config": "docebo_plugin.docebo_config",
+})
 
 
 class DoceboPlugin(AirflowPlugin):
     name = 'docebo_plugin'
     hooks = []
-    operators = [DoceboDataLoadOperator]
+    operators = []
     executors = []
     macros = []
     admin_views = []
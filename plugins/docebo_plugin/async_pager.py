@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from docebo_plugin.docebo_session import LatencyStats, RetryPolicy
+
+
+class DoceboAsyncPager:
+    """
+    Sliding-window paging engine for the Docebo list APIs (user, courses, enrollments).
+
+    Up to ``max_in_flight`` page requests are kept outstanding at any time. As
+    soon as one of them completes the next page number is issued, so a single
+    slow page never holds up the rest the way a fixed wave of requests does.
+    Once any response reports ``has_more_data=False`` no further pages are
+    issued; requests that are already in flight are drained so lower pages are
+    never lost.
+
+    ``on_page(page, items)`` is called for every completed page, in completion
+    order, one page at a time on a worker thread, so transforming and
+    uploading a page does not stall the event loop that keeps the requests
+    moving. At most ``max_in_flight`` completed pages wait for ``on_page``
+    before paging pauses, and an exception raised by ``on_page`` stops the run.
+
+    :param endpoint: Docebo list endpoint URL.
+    :param headers: Request headers, including the bearer token.
+    :param max_in_flight: Size of the in-flight request window.
+    :type max_in_flight: int
+    :param page_size: Number of items requested per page.
+    :type page_size: int
+    :param params: Extra query parameters sent with every page request, e.g. an ``updated_from`` filter.
+    :type params: dict
+    :param retry_policy: Backoff policy for retryable failures, defaults to ``RetryPolicy()``.
+    :param stats: ``LatencyStats`` that every request is timed into.
+    :param rate_limiter: Optional ``FileTokenBucket`` a token is taken from before every request.
+    :param concurrency: Optional ``AimdConcurrency``; when set the window adapts between its
+        bounds instead of staying at ``max_in_flight``, which becomes the hard ceiling.
+    :param label: Name requests are recorded under in ``stats``, defaults to ``endpoint``.
+    """
+
+    def __init__(
+        self,
+        endpoint,
+        headers,
+        max_in_flight=8,
+        page_size=200,
+        params=None,
+        retry_policy=None,
+        stats=None,
+        rate_limiter=None,
+        concurrency=None,
+        log=None,
+        label=None,
+    ):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+        self.endpoint = endpoint
+        self.headers = headers
+        self.max_in_flight = max_in_flight
+        self.page_size = page_size
+        self.params = params or {}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.stats = stats or LatencyStats()
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.log = log
+        self.label = label or endpoint
+        self.api_call_count = 0
+
+    def run(self, on_page, start_page=1):
+        """Fetch every page starting at ``start_page`` and return the number of pages requested."""
+        return asyncio.run(self._run(on_page, start_page))
+
+    def window(self):
+        if self.concurrency is None:
+            return self.max_in_flight
+        return min(self.max_in_flight, self.concurrency.limit)
+
+    async def fetch_page(self, session, page):
+        params = dict(self.params, page_size=self.page_size, page=page)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            retry_after = None
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+                started = time.monotonic()
+            try:
+                async with session.get(self.endpoint, params=params) as response:
+                    self.api_call_count += 1
+                    if response.status == 200:
+                        body = await response.read()
+                        latency = time.monotonic() - started
+                        payload = json.loads(body)
+                        self.stats.record(self.label, latency)
+                        self.stats.record_download(len(body))
+                        if self.concurrency is not None:
+                            self.concurrency.on_success(latency)
+                        break
+                    if self.concurrency is not None and response.status in self.retry_policy.retry_statuses:
+                        self.concurrency.on_throttle()
+                    if response.status not in self.retry_policy.retry_statuses or attempt >= self.retry_policy.max_retries:
+                        if self.log:
+                            self.log.error(f"Failed to retrieve data for page {page}: {response.status}")
+                        response.raise_for_status()
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if self.concurrency is not None:
+                    self.concurrency.on_throttle()
+                if attempt >= self.retry_policy.max_retries:
+                    raise
+            self.stats.record(self.label, time.monotonic() - started)
+            self.stats.record_retry(self.label)
+            wait = self.retry_policy.delay(attempt, retry_after)
+            if self.log:
+                self.log.warning(f"Page {page} request failed, retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            attempt += 1
+        data = payload["data"]
+        return page, data["items"], data.get("has_more_data", False)
+
+    async def _run(self, on_page, start_page):
+        loop = asyncio.get_running_loop()
+        # A single worker keeps on_page calls ordered and never concurrent with each other.
+        worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="docebo-pages")
+        handled = deque()
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
+            next_page = start_page
+            has_more_data = True
+            in_flight = set()
+            try:
+                while has_more_data or in_flight:
+                    while has_more_data and len(in_flight) < self.window():
+                        in_flight.add(asyncio.ensure_future(self.fetch_page(session, next_page)))
+                        next_page += 1
+
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        page, items, more_data = task.result()
+                        if not more_data:
+                            has_more_data = False
+                        handled.append(loop.run_in_executor(worker, on_page, page, items))
+                    while handled and (handled[0].done() or len(handled) > self.max_in_flight):
+                        await handled.popleft()
+                while handled:
+                    await handled.popleft()
+            finally:
+                for task in in_flight:
+                    task.cancel()
+                if in_flight:
+                    await asyncio.gather(*in_flight, return_exceptions=True)
+                if handled:
+                    await asyncio.gather(*handled, return_exceptions=True)
+                worker.shutdown()
+        return next_page - start_page
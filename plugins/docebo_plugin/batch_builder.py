@@ -0,0 +1,37 @@
+import pandas as pd
+
+
+class RecordBatchBuilder:
+    """
+    Accumulates per-page DataFrames and concatenates them once at the end.
+
+    Calling ``pd.concat`` on every page copies all rows collected so far, which
+    makes the total cost quadratic in the number of pages. The builder keeps
+    the NumPy-backed page frames as separate batches and only materializes the
+    combined frame in ``build``, so each row is copied exactly once. The
+    result is the same frame that incremental ``pd.concat(..., ignore_index=True)``
+    calls would have produced.
+    """
+
+    def __init__(self):
+        self._batches = []
+        self.row_count = 0
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def batch_count(self):
+        return len(self._batches)
+
+    def append(self, df):
+        self._batches.append(df)
+        self.row_count += len(df)
+
+    def build(self):
+        """Return the combined frame and release the collected batches."""
+        if not self._batches:
+            return pd.DataFrame()
+        combined_df = pd.concat(self._batches, ignore_index=True, copy=False)
+        self._batches = []
+        return combined_df
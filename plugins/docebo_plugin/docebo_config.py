@@ -1,20 +1,33 @@
-from airflow import DAG
-from airflow.models import Variable
+import os
+from docebo_plugin.output_formats import output_file_name, snowflake_file_format
+from shared.variables import CachedVariables
 
 ENV_LANDING_DB= 'LANDING_DB'
 ENV_DOCEBO_S3_INTEGRATION = 'DOCEBO_S3_INTEGRATION'
 
 
 #1) AWS Cred and respective S3 details
-aws_access_key_id = Variable.get("s3_access_key_id")
-aws_secret_access_key = Variable.get("s3_secret_access_key")
+# Settings stored as Airflow Variables (module attribute -> Variable key). They are resolved
+# on first access through __getattr__ below, all in one batch, so importing this module
+# (plugin load, DAG parsing) never queries the metadata DB.
+variable_attributes = {
+    "aws_access_key_id": "s3_access_key_id",
+    "aws_secret_access_key": "s3_secret_access_key",
+    "source_folder_path": "docebo_landing_path",
+    "destination_base_folder_path": "docebo_archive_path",
+    "client_id": "docebo_api_client_id",
+    "client_secret": "docebo_api_client_secret",
+    "username": "docebo_username",
+    "password": "docebo_password",
+    "s3_secret_access_key": "s3_secret_access_key",
+    "s3_access_key_id": "s3_access_key_id",
+    "s3_file_path": "docebo_landing_path",
+}
+variables = CachedVariables(variable_attributes.values(), ttl=300)
+
 region_name = 'us-east-1'
 bucket_name = 'ot-datateam-docebo-intg'
 s3_stage='LANDING_FILES'
-source_folder_path = Variable.get("docebo_landing_path")
-destination_base_folder_path = Variable.get("docebo_archive_path")
-client_id = Variable.get("docebo_api_client_id")
-client_secret = Variable.get("docebo_api_client_secret")
 grant_type = "password"
 report_name="User_Awards_API"
 scope = "api"
@@ -22,27 +35,28 @@ user_api_name="user"
 course_api_name="courses"
 enrollment_api_name="enrollments"
 report_api_name="reports"
-username = Variable.get("docebo_username")
-password = Variable.get("docebo_password")
-token_url = "https://onetrustlearning.docebosaas.com/oauth2/token"
+# Docebo tenant; set DOCEBO_BASE_URL to point the operators at another host, e.g. the benchmarks/ stub server
+base_url = os.environ.get("DOCEBO_BASE_URL", "https://onetrustlearning.docebosaas.com").rstrip("/")
+token_url = f"{base_url}/oauth2/token"
 s3_bucket = "ot-datateam-docebo-intg"
-s3_secret_access_key = Variable.get("s3_secret_access_key")
-s3_access_key_id = Variable.get("s3_access_key_id")
-s3_file_path = Variable.get("docebo_landing_path")
 s3_region = "us-east-1"
 end_points = [
-        "https://onetrustlearning.docebosaas.com",
-        "https://onetrustlearning.docebosaas.com/manage/v1/user",
-        "https://onetrustlearning.docebosaas.com/course/v1/courses",
-        "https://onetrustlearning.docebosaas.com/course/v1/courses/enrollments"
+        base_url,
+        f"{base_url}/manage/v1/user",
+        f"{base_url}/course/v1/courses",
+        f"{base_url}/course/v1/courses/enrollments"
     ]
 
 
 
 #2) file format Configuration
-s3_file_config_report = ''' FILE_FORMAT = (type = 'csv' SKIP_HEADER = 1 FIELD_DELIMITER = ',' error_on_column_count_mismatch=false field_optionally_enclosed_by = '"' ) FORCE = TRUE ON_ERROR = 'continue' '''
+# output_format of DoceboDataLoadOperator: json, json.gz, csv, csv.gz, parquet (snappy) or parquet.zstd
+output_format = "json"
+report_output_format = "csv"
+
+s3_file_config_report = snowflake_file_format(report_output_format)
 
-s3_file_config = ''' FILE_FORMAT = (type = 'json' ) FORCE = TRUE ON_ERROR = 'continue' MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE '''
+s3_file_config = snowflake_file_format(output_format)
 
 #
 
@@ -185,75 +199,168 @@ certification_columns = '''
 
 
 
-s3_unload_list_dict = [
-                        {
-                            "s3_stage": s3_stage,
-                            "s3_file_path": s3_file_path,
-                            "s3_file_name": f"{user_api_name}.json",
-                            "db_name": ENV_LANDING_DB,
-                            "schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "table_name": "USERS",
-                            "s3_db_name": ENV_LANDING_DB,
-                            "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "s3_stage": s3_stage,
-                            "columns": users_fields_columns,
-                            "s3_file_config": s3_file_config,
-                        },
-                        {
-                            "s3_stage": s3_stage,
-                            "s3_file_path": s3_file_path,
-                            "s3_file_name": f"{course_api_name}.json",
-                            "db_name": ENV_LANDING_DB,
-                            "schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "table_name": "Courses",
-                            "s3_db_name": ENV_LANDING_DB,
-                            "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "s3_stage": s3_stage,
-                            "columns": courses_columns,
-                            "s3_file_config": s3_file_config,
-                        },
-                        {
-                            "s3_stage": s3_stage,
-                            "s3_file_path": s3_file_path,
-                            "s3_file_name": f"{report_api_name}.csv",
-                            "db_name": ENV_LANDING_DB,
-                            "schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "table_name": "USERS_CERTIFICATION",
-                            "s3_db_name": ENV_LANDING_DB,
-                            "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "s3_stage": s3_stage,
-                            "columns": certification_columns,
-                            "s3_file_config": s3_file_config_report,
-                        },
-                        {
-                            "s3_stage": s3_stage,
-                            "s3_file_path": s3_file_path,
-                            "s3_file_name": f"{enrollment_api_name}.json",
-                            "db_name": ENV_LANDING_DB,
-                            "schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "table_name": "enrollments",
-                            "s3_db_name": ENV_LANDING_DB,
-                            "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
-                            "s3_stage": s3_stage,
-                            "columns": enrollments_fields_columns,
-                            "s3_file_config": s3_file_config,
-                        }
-                    ]
+def build_s3_unload_list_dict():
+    s3_file_path = variables.get("docebo_landing_path")
+    return [
+                            {
+                                "s3_stage": s3_stage,
+                                "s3_file_path": s3_file_path,
+                                "s3_file_name": output_file_name(user_api_name, output_format),
+                                "db_name": ENV_LANDING_DB,
+                                "schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "table_name": "USERS",
+                                "s3_db_name": ENV_LANDING_DB,
+                                "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "s3_stage": s3_stage,
+                                "columns": users_fields_columns,
+                                "s3_file_config": s3_file_config,
+                            },
+                            {
+                                "s3_stage": s3_stage,
+                                "s3_file_path": s3_file_path,
+                                "s3_file_name": output_file_name(course_api_name, output_format),
+                                "db_name": ENV_LANDING_DB,
+                                "schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "table_name": "Courses",
+                                "s3_db_name": ENV_LANDING_DB,
+                                "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "s3_stage": s3_stage,
+                                "columns": courses_columns,
+                                "s3_file_config": s3_file_config,
+                            },
+                            {
+                                "s3_stage": s3_stage,
+                                "s3_file_path": s3_file_path,
+                                "s3_file_name": output_file_name(report_api_name, report_output_format),
+                                "db_name": ENV_LANDING_DB,
+                                "schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "table_name": "USERS_CERTIFICATION",
+                                "s3_db_name": ENV_LANDING_DB,
+                                "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "s3_stage": s3_stage,
+                                "columns": certification_columns,
+                                "s3_file_config": s3_file_config_report,
+                            },
+                            {
+                                "s3_stage": s3_stage,
+                                "s3_file_path": s3_file_path,
+                                "s3_file_name": output_file_name(enrollment_api_name, output_format),
+                                "db_name": ENV_LANDING_DB,
+                                "schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "table_name": "enrollments",
+                                "s3_db_name": ENV_LANDING_DB,
+                                "s3_schema_name": ENV_DOCEBO_S3_INTEGRATION,
+                                "s3_stage": s3_stage,
+                                "columns": enrollments_fields_columns,
+                                "s3_file_config": s3_file_config,
+                            }
+                        ]
+
+#column schema per api_name, used to type parquet output
+table_columns = {
+    user_api_name: users_fields_columns,
+    course_api_name: courses_columns,
+    enrollment_api_name: enrollments_fields_columns,
+    report_api_name: certification_columns,
+}
+
+#row filters, projection and casts applied by DoceboDataLoadOperator before writing (transforms.TransformStage):
+#   filters: keep rows matching every filter ({"column": ..., "not_contains" | "contains" | "in" | "not_in": ...})
+#   project: write only the table_columns of the api, in table order, minus drop_columns
+#   cast_types: declared column types cast from the API's JSON values
+#reports are written as exported
+transform_config = {
+    user_api_name: {
+        "filters": [{"column": "username", "not_contains": "onetrust"}],
+        "project": True,
+        "drop_columns": ["avatar", "actions"],
+        "cast_types": ["INTEGER", "FLOAT", "BOOLEAN"],
+    },
+    course_api_name: {
+        "project": True,
+        "drop_columns": ["actions"],
+        "cast_types": ["INTEGER", "FLOAT", "BOOLEAN"],
+    },
+    enrollment_api_name: {
+        "filters": [{"column": "username", "not_contains": "onetrust"}],
+        "project": True,
+        "cast_types": ["INTEGER", "FLOAT", "BOOLEAN"],
+    },
+}
+
+#3) Incremental extraction: watermark column per api_name, the Docebo request filter that
+#   takes the watermark, and the keys used to MERGE the delta files into the landing tables
+incremental_config = {
+    user_api_name: {
+        "watermark_column": "last_update",
+        "filter_param": "updated_from",
+        "merge_keys": ["user_id"],
+    },
+    course_api_name: {
+        "watermark_column": "last_update",
+        "filter_param": "updated_from",
+        "merge_keys": ["id"],
+    },
+    enrollment_api_name: {
+        "watermark_column": "enrollment_date_last_updated",
+        "filter_param": "updated_from",
+        "merge_keys": ["user_id", "course_id"],
+    },
+}
+
+#delta files written by DoceboDataLoadOperator(incremental=True), one per DAG run so a run
+#whose MERGE failed keeps its own file. Left as a template for operators that render it.
+delta_run_id = "{{ ts_nodash }}"
+
+def delta_file_stem(api_name, run_id=delta_run_id):
+    return f"{api_name}_delta_{run_id}"
+
+def build_s3_unload_delta_list_dict(s3_unload_list_dict, run_id=delta_run_id):
+    s3_unload_delta_list_dict = []
+    for details in s3_unload_list_dict:
+        api_name, extension = details["s3_file_name"].split(".", 1)
+        if api_name in incremental_config:
+            delta_details = dict(details)
+            delta_details["s3_file_name"] = f"{delta_file_stem(api_name, run_id)}.{extension}"
+            delta_details["merge_keys"] = incremental_config[api_name]["merge_keys"]
+            delta_details["watermark_column"] = incremental_config[api_name]["watermark_column"]
+            s3_unload_delta_list_dict.append(delta_details)
+    return s3_unload_delta_list_dict
 
 #files to move
-files_to_move = []
-for details in s3_unload_list_dict:
-    files_to_move.append(details["s3_file_name"])
+def build_files_to_move():
+    s3_unload_list_dict = build_s3_unload_list_dict()
+    files_to_move = []
+    for details in s3_unload_list_dict + build_s3_unload_delta_list_dict(s3_unload_list_dict):
+        files_to_move.append(details["s3_file_name"])
+    return files_to_move
 
 
 #ii) file_archival kwargs
-fa_op_kwargs = {
-    'aws_access_key_id': aws_access_key_id,
-    'aws_secret_access_key': aws_secret_access_key,
-    'region_name': region_name,
-    'bucket_name': bucket_name,
-    'source_folder_path': source_folder_path,
-    'destination_base_folder_path': destination_base_folder_path,
-    'files_to_move': files_to_move,
-    'delete_flag': 'Y'
-    }
+def build_fa_op_kwargs():
+    return {
+        'aws_access_key_id': variables.get("s3_access_key_id"),
+        'aws_secret_access_key': variables.get("s3_secret_access_key"),
+        'region_name': region_name,
+        'bucket_name': bucket_name,
+        'source_folder_path': variables.get("docebo_landing_path"),
+        'destination_base_folder_path': variables.get("docebo_archive_path"),
+        'files_to_move': build_files_to_move(),
+        'delete_flag': 'Y'
+        }
+
+
+derived_attributes = {
+    "s3_unload_list_dict": build_s3_unload_list_dict,
+    "s3_unload_delta_list_dict": lambda: build_s3_unload_delta_list_dict(build_s3_unload_list_dict()),
+    "files_to_move": build_files_to_move,
+    "fa_op_kwargs": build_fa_op_kwargs,
+}
+
+
+def __getattr__(name):
+    if name in variable_attributes:
+        return variables.get(variable_attributes[name])
+    if name in derived_attributes:
+        return derived_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
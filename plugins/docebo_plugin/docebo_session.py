@@ -0,0 +1,191 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter that honors ``Retry-After``.
+
+    :param max_retries: Number of retries after the first attempt.
+    :type max_retries: int
+    :param backoff_base: Backoff for the first retry, in seconds.
+    :type backoff_base: float
+    :param backoff_max: Upper bound for a single backoff, in seconds.
+    :type backoff_max: float
+    :param retry_statuses: HTTP status codes that are retried.
+    :type retry_statuses: tuple
+    """
+
+    def __init__(self, max_retries=5, backoff_base=1.0, backoff_max=60.0, retry_statuses=RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = tuple(retry_statuses)
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number ``attempt`` (0-based)."""
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Parse a ``Retry-After`` header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class LatencyStats:
+    """
+    Thread-safe per-endpoint request latency, retry and download counters.
+
+    :param metrics: Optional ``shared.instrumentation.OperatorMetrics`` every
+        sample is also emitted to.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._retries = {}
+
+    def record(self, label, seconds):
+        with self._lock:
+            self._latencies.setdefault(label, []).append(seconds)
+        if self.metrics is not None:
+            self.metrics.request(label, seconds)
+
+    def record_retry(self, label):
+        with self._lock:
+            self._retries[label] = self._retries.get(label, 0) + 1
+        if self.metrics is not None:
+            self.metrics.retry(label)
+
+    def record_download(self, nbytes):
+        with self._lock:
+            self.bytes_downloaded += nbytes
+        if self.metrics is not None:
+            self.metrics.bytes_downloaded(nbytes)
+
+    def summary(self):
+        """Return ``{label: {count, retries, mean, p50, p95, max}}`` with latencies in seconds."""
+        with self._lock:
+            latencies = {label: sorted(values) for label, values in self._latencies.items()}
+            retries = dict(self._retries)
+        summary = {}
+        for label, values in latencies.items():
+            count = len(values)
+            summary[label] = {
+                "count": count,
+                "retries": retries.get(label, 0),
+                "mean": sum(values) / count,
+                "p50": values[int(0.50 * (count - 1))],
+                "p95": values[int(0.95 * (count - 1))],
+                "max": values[-1],
+            }
+        return summary
+
+
+class DoceboSession:
+    """
+    Pooled keep-alive HTTP session for the Docebo APIs.
+
+    Connections are reused across every call made during a task run, the
+    pool is sized to the fetch concurrency, responses are requested gzip'd,
+    and retryable failures are retried according to ``retry_policy``. Every
+    attempt is timed into ``stats``.
+
+    :param pool_size: Maximum number of pooled connections per host.
+    :type pool_size: int
+    :param retry_policy: Backoff policy, defaults to ``RetryPolicy()``.
+    :param timeout: Per-request timeout in seconds.
+    :param rate_limiter: Optional ``FileTokenBucket`` a token is taken from before every attempt.
+    :param metrics: Optional ``OperatorMetrics`` request latency, retries and bytes are emitted to.
+    """
+
+    def __init__(self, pool_size=8, retry_policy=None, timeout=60, rate_limiter=None, log=None, metrics=None):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.log = log
+        self.stats = LatencyStats(metrics)
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.session.close()
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, label=None, retry_statuses=None, max_retries=None, **kwargs):
+        """
+        Send a request, retrying connection errors and ``retry_statuses`` responses.
+
+        The last response is returned as-is once retries are exhausted so the
+        caller decides how to surface the error.
+        """
+        label = label or url
+        retry_statuses = self.retry_policy.retry_statuses if retry_statuses is None else tuple(retry_statuses)
+        max_retries = self.retry_policy.max_retries if max_retries is None else max_retries
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self.stats.record(label, time.monotonic() - started)
+                if attempt >= max_retries:
+                    raise
+                wait = self.retry_policy.delay(attempt)
+                if self.log:
+                    self.log.warning(f"{method} {label} failed with {error!r}, retrying in {wait:.1f}s")
+            else:
+                self.stats.record(label, time.monotonic() - started)
+                if response.status_code not in retry_statuses or attempt >= max_retries:
+                    self.stats.record_download(len(response.content))
+                    return response
+                wait = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+                if self.log:
+                    self.log.warning(f"{method} {label} returned {response.status_code}, retrying in {wait:.1f}s")
+                response.close()
+            self.stats.record_retry(label)
+            attempt += 1
+            time.sleep(wait)
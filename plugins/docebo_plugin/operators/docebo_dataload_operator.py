@@ -1,16 +1,18 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from airflow.models import BaseOperator
+from airflow.models import BaseOperator, Variable
 from airflow.utils.decorators import apply_defaults
-import requests
-import pandas as pd
-import boto3
+from contextlib import nullcontext
 import io
-import time
-from datetime import datetime
 import os
-import multiprocessing
-import threading
-from shared.config import docebo_config
+import time
+from docebo_plugin import docebo_config
+from docebo_plugin.s3_multipart import S3MultipartWriter, MB
+from docebo_plugin.report_fetcher import DoceboReportFetcher
+from docebo_plugin.rate_limiter import AimdConcurrency, FileTokenBucket, DEFAULT_RATE_LIMIT_FILE
+from docebo_plugin.output_formats import FrameEncoder, encode_frame, get_output_format, output_file_name
+from docebo_plugin.schema import parse_columns
+from shared.instrumentation import OperatorMetrics
+
+# pandas, boto3, requests and aiohttp are imported in the methods that use them, so parsing DAGs stays cheap.
 
 class DoceboDataLoadOperator(BaseOperator):
     @apply_defaults
@@ -30,6 +32,22 @@ class DoceboDataLoadOperator(BaseOperator):
         s3_region,
         destination_folder,
         api_name,
+        stream_to_s3=False,
+        s3_part_size_mb=8,
+        max_in_flight=8,
+        max_retries=5,
+        rate_limit_per_second=None,
+        rate_limit_burst=None,
+        rate_limit_file=DEFAULT_RATE_LIMIT_FILE,
+        adaptive_concurrency=False,
+        incremental=False,
+        watermark_variable=None,
+        watermark_lookback_minutes=60,
+        output_format=None,
+        report_parallel_pages=1,
+        report_ready_timeout=1800,
+        base_url=None,
+        s3_endpoint_url=None,
         *args,
         **kwargs,
     ):
@@ -48,6 +66,27 @@ class DoceboDataLoadOperator(BaseOperator):
         self.region_name = s3_region
         self.api_name = api_name
         self.destination_folder = destination_folder
+        self.stream_to_s3 = stream_to_s3
+        self.s3_part_size_mb = s3_part_size_mb
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.rate_limit_per_second = rate_limit_per_second
+        self.rate_limit_burst = rate_limit_burst
+        self.rate_limit_file = rate_limit_file
+        self.adaptive_concurrency = adaptive_concurrency
+        self.incremental = incremental
+        self.watermark_variable = watermark_variable or f"docebo_{api_name}_watermark"
+        self.watermark_lookback_minutes = watermark_lookback_minutes
+        if output_format is None:
+            output_format = docebo_config.report_output_format if api_name == "reports" else docebo_config.output_format
+        get_output_format(output_format)
+        self.output_format = output_format
+        self.report_parallel_pages = report_parallel_pages
+        self.report_ready_timeout = report_ready_timeout
+        self.base_url = (base_url or docebo_config.base_url).rstrip("/")
+        self.s3_endpoint_url = s3_endpoint_url
+        self.updated_since = None
+        self.max_watermark = None
         self.api_call_count = 0
 
     def get_access_token(self):
@@ -60,14 +99,14 @@ class DoceboDataLoadOperator(BaseOperator):
             "password": self.password,
         }
 
-        response = requests.post(url=self.token_url, data=files)
+        response = self.session.post(self.token_url, data=files, label="oauth2/token")
         response.raise_for_status()
         token_data = response.json()
         return token_data["access_token"]
 
     def get_report_id(self, api_base_url, headers):
         params = {"count": 500}
-        response = requests.get("https://onetrustlearning.docebosaas.com/analytics/v1/reports", headers=headers, params=params)
+        response = self.session.get(f"{self.base_url}/analytics/v1/reports", headers=headers, params=params, label="reports")
         response.raise_for_status()
         reports_data = response.json()
         id_report = None
@@ -80,121 +119,253 @@ class DoceboDataLoadOperator(BaseOperator):
         return id_report
 
     def start_report_export(self, api_base_url, headers, report_id):
-        api = "https://onetrustlearning.docebosaas.com"
-        response = requests.get(f"{api}/analytics/v1/reports/{report_id}/export/csv", headers=headers)
+        api = api_base_url
+        response = self.session.get(f"{api}/analytics/v1/reports/{report_id}/export/csv", headers=headers, label="reports/export")
         response.raise_for_status()
         export_id = response.json()
         return export_id
 
-    def get_report_data_paginated(self, api_base_url, headers, report_id, export_id, page):
-        all_data = []
-        page_size = 1000
-        next_token = None
-
-        while True:
-            params = {"pageSize": page_size, "page": page}
-            if next_token:
-                params['nextToken'] = next_token
-
-            api = "https://onetrustlearning.docebosaas.com"
-            response = requests.get(
-                f"{api}/analytics/v1/reports/{report_id}/exports/{export_id}/results",
-                headers=headers,
-                params=params
-            )
-            self.api_call_count += 1
-            if response.status_code == 200:
-                data = response.json()
-                all_data.extend(data['data'])
-                self.log.info(f"Fetched {len(data['data'])} records for page {page}")
-
-                next_token = data.get('nextToken')
-                if not next_token:
-                    break
-
-                page += 1
-
-            elif response.status_code == 400:
-                #self.log.info("Received 400 error, retrying in 5 seconds...")
-                time.sleep(5)
-
-            else:
-                response.raise_for_status()
-
-        return all_data, next_token
-
-    def fetch_data(self, page):
-        params = {"page_size": 200, "page": page}
-        thread_name = threading.current_thread().name
-        response = requests.get(self.api_endpoint, headers=self.headers, params=params)
-        self.api_call_count += 1
-        if response.status_code == 200:
-            data = response.json()["data"]
-            return data["items"], data.get("has_more_data", False), page, thread_name
+    def get_report_fetcher(self, api_base_url, headers, report_id, export_id):
+        api = api_base_url
+        return DoceboReportFetcher(
+            self.session,
+            f"{api}/analytics/v1/reports/{report_id}/exports/{export_id}/results",
+            headers,
+            parallel_pages=self.report_parallel_pages,
+            ready_timeout=self.report_ready_timeout,
+            log=self.log,
+        )
+
+    def get_updated_since(self):
+        """Stored high-water mark minus the lookback window, or None when no watermark exists yet."""
+        import pandas as pd
+
+        watermark = Variable.get(self.watermark_variable, default_var=None)
+        if not watermark:
+            self.log.info(f"No watermark in {self.watermark_variable}, extracting the full {self.api_name} set")
+            return None
+        updated_since = pd.to_datetime(watermark, utc=True) - pd.Timedelta(minutes=self.watermark_lookback_minutes)
+        self.log.info(f"Extracting {self.api_name} rows updated since {updated_since}")
+        return updated_since
+
+    def get_incremental_params(self):
+        if self.updated_since is None:
+            return {}
+        filter_param = docebo_config.incremental_config[self.api_name]["filter_param"]
+        return {filter_param: self.updated_since.strftime("%Y-%m-%d %H:%M:%S")}
+
+    def apply_watermark(self, df):
+        """
+        Track the highest watermark seen and drop rows that have not changed since the stored one.
+        Rows without a parseable watermark are kept, since they cannot be shown to be unchanged.
+        """
+        import pandas as pd
+
+        watermark_column = docebo_config.incremental_config[self.api_name]["watermark_column"]
+        if watermark_column not in df.columns:
+            return df
+        updated_at = pd.to_datetime(df[watermark_column], errors='coerce', utc=True)
+        page_max = updated_at.max()
+        if not pd.isna(page_max) and (self.max_watermark is None or page_max > self.max_watermark):
+            self.max_watermark = page_max
+        if self.updated_since is None:
+            return df
+        missing = updated_at.isna()
+        if missing.any():
+            self.log.warning(f"Keeping {int(missing.sum())} {self.api_name} rows without a parseable {watermark_column}")
+        return df[(updated_at > self.updated_since) | missing]
+
+    def get_new_watermark(self):
+        """
+        The watermark for DoceboSnowflakeLoadOperator to save once it has merged this run's delta,
+        so a failed MERGE does not skip these rows next time.
+        """
+        if self.max_watermark is None:
+            self.log.info(f"No {self.api_name} rows carried a watermark, keeping {self.watermark_variable}")
+            return {"watermark_variable": self.watermark_variable, "watermark": None}
+        self.log.info(f"New {self.watermark_variable} watermark {self.max_watermark.isoformat()}")
+        return {"watermark_variable": self.watermark_variable, "watermark": self.max_watermark.isoformat()}
+
+    def get_transform_stage(self, columns):
+        """Filters, projection and casts from ``docebo_config.transform_config`` for this API."""
+        from docebo_plugin.transforms import TransformStage
+
+        extra_columns = []
+        if self.incremental and self.api_name in docebo_config.incremental_config:
+            extra_columns.append(docebo_config.incremental_config[self.api_name]["watermark_column"])
+        return TransformStage.from_config(
+            docebo_config.transform_config.get(self.api_name),
+            columns,
+            # CSV is loaded by position, so dropped columns stay in place as empty ones.
+            keep_positions=get_output_format(self.output_format).file_type == "csv",
+            extra_columns=extra_columns,
+        )
+
+    def transform(self, df):
+        with self.metrics.timer("transform"):
+            return self.transform_stage.apply(df)
+
+    def process_page(self, api_data, encoder, batches):
+        with self.metrics.timer("dataframe_build"):
+            df = self.transform_stage.frame(api_data)
+        if self.incremental:
+            df = self.apply_watermark(df)
+        if encoder is not None:
+            # Streaming writes every page on arrival, so it is transformed here; buffered pages are transformed once in load_data.
+            df = self.transform(df)
+            if not df.empty:
+                encoder.write(df)
         else:
-            self.log.error(f"[{thread_name}] Failed to retrieve data for page {page}: {response.status_code}")
-            return [], False, page, thread_name
+            batches.append(df)
+
+    def get_s3_client(self):
+        import boto3
+
+        return boto3.client(
+            's3',
+            aws_access_key_id=self.aws_access_key_id,
+            aws_secret_access_key=self.aws_secret_access_key,
+            region_name=self.region_name,
+            endpoint_url=self.s3_endpoint_url
+        )
+
+    def open_s3_stream(self, file_name):
+        """Multipart writer for ``file_name`` when streaming is enabled, otherwise a no-op context."""
+        if not self.stream_to_s3:
+            return nullcontext()
+        s3_key = os.path.join(self.destination_folder, file_name)
+        self.log.info(f"Streaming data to s3://{self.s3_bucket}/{s3_key} in {self.s3_part_size_mb} MB parts")
+        return S3MultipartWriter(
+            self.get_s3_client(), self.s3_bucket, s3_key, part_size=self.s3_part_size_mb * MB, metrics=self.metrics
+        )
+
+    def put_s3_object(self, s3_key, body):
+        with self.metrics.timer("s3_upload"):
+            self.get_s3_client().put_object(Bucket=self.s3_bucket, Key=s3_key, Body=body)
+        self.metrics.bytes_uploaded(len(body))
+
+    def get_rate_limiter(self):
+        if not self.rate_limit_per_second:
+            return None
+        self.log.info(
+            f"Rate limiting Docebo calls to {self.rate_limit_per_second}/s shared through {self.rate_limit_file}"
+        )
+        return FileTokenBucket(self.rate_limit_per_second, self.rate_limit_burst, path=self.rate_limit_file)
 
     def execute(self, context):
+        from docebo_plugin.docebo_session import DoceboSession, RetryPolicy
+
+        self.metrics = OperatorMetrics("docebo_dataload", self.api_name)
+        self.rate_limiter = self.get_rate_limiter()
+        self.session = DoceboSession(
+            pool_size=self.max_in_flight,
+            retry_policy=RetryPolicy(max_retries=self.max_retries),
+            rate_limiter=self.rate_limiter,
+            log=self.log,
+            metrics=self.metrics,
+        )
+        try:
+            return self.load_data(context["ts_nodash"])
+        finally:
+            for label, latency in self.session.stats.summary().items():
+                self.log.info(
+                    f"{label}: {latency['count']} requests, {latency['retries']} retries, "
+                    f"p50 {latency['p50']:.3f}s, p95 {latency['p95']:.3f}s, max {latency['max']:.3f}s"
+                )
+            self.session.close()
+
+    def load_data(self, run_id):
+        import pandas as pd
+        from docebo_plugin.async_pager import DoceboAsyncPager
+        from docebo_plugin.batch_builder import RecordBatchBuilder
+
         access_token = self.get_access_token()
         self.headers = {"Authorization": f"Bearer {access_token}"}
 
-        combined_df = pd.DataFrame()
         page = 1
-        cpu_count = multiprocessing.cpu_count()
-        self.log.info(f"Using {cpu_count} workers based on CPU count")
+        new_watermark = None
+
+        columns = parse_columns(docebo_config.table_columns[self.api_name]) if self.api_name in docebo_config.table_columns else ()
+        self.transform_stage = self.get_transform_stage(columns)
 
         if self.api_name in ['user', 'enrollments', 'courses']:
-            has_more_data = True
-
-            while has_more_data:
-                with ThreadPoolExecutor(max_workers=cpu_count) as executor:
-                    futures = []
-                    for i in range(cpu_count):
-                        futures.append(executor.submit(self.fetch_data, page + i))
-
-                    has_more_data = False
-                    for future in as_completed(futures):
-                        api_data, more_data, page_completed, thread_name = future.result()
-                        self.log.info(f"[{thread_name}] Page {page_completed} completed")
-                        if api_data:
-                            df = pd.DataFrame(api_data)
-                            if self.api_name == "user":
-                                filtered_df = df[~df['username'].str.contains('onetrust', case=False)]
-                            elif self.api_name == "enrollments":
-                                filtered_df = df[~df['username'].str.contains('onetrust', case=False)]
-                            elif self.api_name == "courses":
-                                filtered_df = df
-                            combined_df = pd.concat([combined_df, filtered_df], ignore_index=True)
-                        has_more_data = has_more_data or more_data
-                    page += cpu_count
+            file_name = output_file_name(self.api_name, self.output_format)
+            params = {}
+            if self.incremental:
+                file_name = output_file_name(docebo_config.delta_file_stem(self.api_name, run_id), self.output_format)
+                self.updated_since = self.get_updated_since()
+                params = self.get_incremental_params()
+            batches = RecordBatchBuilder()
+            concurrency = None
+            if self.adaptive_concurrency:
+                concurrency = AimdConcurrency(initial=max(1, self.max_in_flight // 2), maximum=self.max_in_flight)
+            pager = DoceboAsyncPager(
+                self.api_endpoint,
+                self.headers,
+                max_in_flight=self.max_in_flight,
+                params=params,
+                retry_policy=self.session.retry_policy,
+                stats=self.session.stats,
+                rate_limiter=self.rate_limiter,
+                concurrency=concurrency,
+                log=self.log,
+                label=self.api_name,
+            )
+            self.log.info(f"Fetching pages with up to {self.max_in_flight} requests in flight")
+
+            with self.open_s3_stream(file_name) as s3_stream:
+                encoder = FrameEncoder(s3_stream, self.output_format, columns) if s3_stream is not None else None
+
+                def on_page(page_completed, api_data):
+                    self.log.info(f"Page {page_completed} completed")
+                    if api_data:
+                        self.process_page(api_data, encoder, batches)
+
+                fetch_started = time.monotonic()
+                try:
+                    pages_requested = pager.run(on_page, start_page=page)
+                    self.metrics.pages(pages_requested, time.monotonic() - fetch_started)
+                finally:
+                    self.api_call_count += pager.api_call_count
+                    if concurrency is not None:
+                        self.log.info(f"Adaptive concurrency settled at {concurrency.limit} requests in flight")
+                if encoder is not None:
+                    encoder.close()
 
             self.log.info(f"Total API calls made: {self.api_call_count}")
 
-            if not combined_df.empty:
+            if s3_stream is not None:
+                self.log.info(f"Streamed {s3_stream.bytes_written} bytes to S3")
+                data_written = s3_stream.bytes_written > 0
+            else:
+                self.log.info(f"Building {len(batches)} rows from {batches.batch_count} pages")
+                with self.metrics.timer("dataframe_concat"):
+                    combined_df = batches.build()
+                combined_df = self.transform(combined_df)
+                data_written = not combined_df.empty
+
+            if s3_stream is None and data_written:
                 self.log.info("Processing and writing data to S3")
-                # current_time = datetime.now().strftime("%Y-%m-%d")
-                file_name = f"{self.api_name}.json"
                 s3_key = os.path.join(self.destination_folder, file_name)
-                s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=self.aws_access_key_id,
-                    aws_secret_access_key=self.aws_secret_access_key,
-                    region_name=self.region_name
-                )
-                with io.StringIO() as json_buffer:
-                    combined_df.to_json(json_buffer, orient='records', lines=True)
-                    s3_client.put_object(
-                        Bucket=self.s3_bucket,
-                        Key=s3_key,
-                        Body=json_buffer.getvalue()
+                with self.metrics.timer("encode"):
+                    body = encode_frame(combined_df, self.output_format, columns)
+                self.put_s3_object(s3_key, body)
+                del combined_df, body
+
+            if self.incremental:
+                if not data_written:
+                    # The load and archival tasks expect a delta file from every run.
+                    self.log.info(f"No {self.api_name} rows changed, writing an empty {file_name}")
+                    self.put_s3_object(
+                        os.path.join(self.destination_folder, file_name),
+                        encode_frame(pd.DataFrame(), self.output_format, columns)
                     )
-                del combined_df
+                new_watermark = self.get_new_watermark()
 
 
         elif self.api_name == "reports":
             self.log.info("Extracting the report ID and export ID")
-            api_base_url = "https://onetrustlearning.docebosaas.com"
+            api_base_url = self.base_url
             report_end_point = self.api_endpoint
             report_id = self.get_report_id(report_end_point, self.headers)
             if report_id:
@@ -202,36 +373,38 @@ class DoceboDataLoadOperator(BaseOperator):
                 export_id = export_url['data']['executionId']
 
                 self.log.info(f"Report ID: {report_id}, Export ID: {export_id}")
-                additional_data_combined = []
-                next_token = None
-                while True:
-                    additional_data, next_token = self.get_report_data_paginated(api_base_url, self.headers, report_id, export_id, page)
-                    additional_data_combined.extend(additional_data)
-                    #self.log.info(f"Processed page {page} for report data")
-
-                    if not next_token:
-                        break
-                    page += 1
-
-                additional_df = pd.DataFrame(additional_data_combined)
-                
-                file_name = f"{self.api_name}.csv"
-                
-                additional_s3_key = os.path.join(self.destination_folder, file_name)
-                s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=self.aws_access_key_id,
-                    aws_secret_access_key=self.aws_secret_access_key,
-                    region_name=self.region_name
-                )
-                with io.StringIO() as additional_buffer:
-                    additional_df.to_csv(additional_buffer, index=False)
-                    s3_client.put_object(
-                        Bucket=self.s3_bucket,
-                        Key=additional_s3_key,
-                        Body=additional_buffer.getvalue()
-                    )
-                del additional_df, additional_data_combined
+                file_name = output_file_name(self.api_name, self.output_format)
+                fetcher = self.get_report_fetcher(api_base_url, self.headers, report_id, export_id)
+
+                # Each page is encoded as soon as it arrives, while the fetcher is already requesting the next one.
+                with self.open_s3_stream(file_name) as s3_stream:
+                    additional_buffer = s3_stream if s3_stream is not None else io.BytesIO()
+                    encoder = FrameEncoder(additional_buffer, self.output_format, columns)
+
+                    def write_report_page(rows):
+                        self.metrics.incr("pages")
+                        if rows:
+                            with self.metrics.timer("dataframe_build"):
+                                df = self.transform_stage.frame(rows)
+                            df = self.transform(df)
+                            if not df.empty:
+                                encoder.write(df)
+
+                    try:
+                        fetcher.run(write_report_page, start_page=page)
+                    finally:
+                        self.api_call_count += fetcher.api_call_count
+
+                    encoder.close()
+                    if additional_buffer.tell() == 0:
+                        additional_buffer.write(encode_frame(pd.DataFrame(), self.output_format, columns))
+
+                if s3_stream is not None:
+                    self.log.info(f"Streamed {s3_stream.bytes_written} bytes to S3")
+                else:
+                    additional_s3_key = os.path.join(self.destination_folder, file_name)
+                    self.put_s3_object(additional_s3_key, additional_buffer.getvalue())
+                    del additional_buffer
 
             else:
                 self.log.error("Failed to find report ID")
@@ -241,3 +414,5 @@ class DoceboDataLoadOperator(BaseOperator):
             self.log.error(f"Unsupported API name: {self.api_name}")
 
         self.log.info(f"Total API calls made: {self.api_call_count}")
+        self.metrics.incr("api_calls", self.api_call_count)
+        return new_watermark
@@ -0,0 +1,197 @@
+from airflow.models import BaseOperator
+from airflow.utils.decorators import apply_defaults
+from airflow.exceptions import AirflowException
+from concurrent.futures import ThreadPoolExecutor
+import os
+from docebo_plugin.s3_multipart import MB
+
+# S3 DeleteObjects accepts at most 1000 keys per request.
+DELETE_BATCH_SIZE = 1000
+
+ARCHIVED_FROM_ETAG = "archived-from-etag"
+
+
+class S3FileArchivalOperator(BaseOperator):
+    """
+    Moves landing files into the archive folder of the same bucket.
+
+    Objects are copied server-side in parallel: ``copy_object`` for small ones,
+    a parallel ``upload_part_copy`` multipart copy for objects larger than
+    ``multipart_threshold_mb``. With ``delete_flag='Y'`` the originals are then
+    removed with ``delete_objects``, up to 1000 keys per call.
+
+    Every archived copy records the ETag of its source, so a retried task skips
+    objects that were already copied, and objects whose source is gone but
+    whose archive copy exists, and only deletes what is left. Takes the
+    ``docebo_config.fa_op_kwargs`` dict as keyword arguments.
+
+    :param files_to_move: File names relative to ``source_folder_path`` (templated).
+    :type files_to_move: list
+    :param delete_flag: ``'Y'`` to delete the originals once they are archived.
+    :type delete_flag: str
+    :param partition_by_date: Archive under ``<destination>/<ds>/`` so each run keeps its own copy.
+    :type partition_by_date: bool
+    :param max_workers: Number of objects copied concurrently.
+    :type max_workers: int
+    """
+
+    template_fields = ('files_to_move',)
+
+    @apply_defaults
+    def __init__(
+        self,
+        aws_access_key_id,
+        aws_secret_access_key,
+        region_name,
+        bucket_name,
+        source_folder_path,
+        destination_base_folder_path,
+        files_to_move,
+        delete_flag='Y',
+        partition_by_date=True,
+        max_workers=16,
+        multipart_threshold_mb=256,
+        part_size_mb=64,
+        s3_endpoint_url=None,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.aws_access_key_id = aws_access_key_id
+        self.aws_secret_access_key = aws_secret_access_key
+        self.region_name = region_name
+        self.bucket_name = bucket_name
+        self.source_folder_path = source_folder_path
+        self.destination_base_folder_path = destination_base_folder_path
+        self.files_to_move = files_to_move
+        self.delete_flag = delete_flag
+        self.partition_by_date = partition_by_date
+        self.max_workers = max_workers
+        self.multipart_threshold = multipart_threshold_mb * MB
+        self.part_size = part_size_mb * MB
+        self.s3_endpoint_url = s3_endpoint_url
+
+    def get_s3_client(self):
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            's3',
+            aws_access_key_id=self.aws_access_key_id,
+            aws_secret_access_key=self.aws_secret_access_key,
+            region_name=self.region_name,
+            endpoint_url=self.s3_endpoint_url,
+            config=Config(max_pool_connections=self.max_workers * 2, retries={'mode': 'adaptive'}),
+        )
+
+    def head(self, s3_client, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as error:
+            if error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def is_archived(self, source, destination):
+        if destination is None:
+            return False
+        if source is None:
+            return True
+        if destination.get('Metadata', {}).get(ARCHIVED_FROM_ETAG) == source['ETag']:
+            return True
+        return destination['ETag'] == source['ETag'] and destination['ContentLength'] == source['ContentLength']
+
+    def copy(self, s3_client, source_key, destination_key, source):
+        copy_args = {
+            'Bucket': self.bucket_name,
+            'Key': destination_key,
+            'Metadata': {**source.get('Metadata', {}), ARCHIVED_FROM_ETAG: source['ETag']},
+        }
+        if source.get('ContentType'):
+            copy_args['ContentType'] = source['ContentType']
+        copy_source = {'Bucket': self.bucket_name, 'Key': source_key}
+
+        if source['ContentLength'] <= self.multipart_threshold:
+            s3_client.copy_object(CopySource=copy_source, MetadataDirective='REPLACE', **copy_args)
+            return
+
+        upload_id = s3_client.create_multipart_upload(**copy_args)['UploadId']
+        try:
+            size = source['ContentLength']
+            ranges = [(start, min(start + self.part_size, size) - 1) for start in range(0, size, self.part_size)]
+
+            def copy_part(numbered_range):
+                part_number, (first, last) = numbered_range
+                response = s3_client.upload_part_copy(
+                    Bucket=self.bucket_name,
+                    Key=destination_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    CopySource=copy_source,
+                    CopySourceRange=f'bytes={first}-{last}',
+                    CopySourceIfMatch=source['ETag'],
+                )
+                return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+
+            with ThreadPoolExecutor(max_workers=min(8, len(ranges))) as part_executor:
+                parts = list(part_executor.map(copy_part, enumerate(ranges, start=1)))
+            s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=destination_key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+            )
+        except BaseException:
+            s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=destination_key, UploadId=upload_id)
+            raise
+
+    def archive(self, s3_client, source_key, destination_key):
+        """Copy one object unless it is already archived. Returns (outcome, bytes copied)."""
+        source = self.head(s3_client, source_key)
+        destination = self.head(s3_client, destination_key)
+        if self.is_archived(source, destination):
+            return ('skipped', 0)
+        if source is None:
+            self.log.warning(f"s3://{self.bucket_name}/{source_key} does not exist, nothing to archive")
+            return ('missing', 0)
+        self.copy(s3_client, source_key, destination_key, source)
+        self.log.info(f"Archived s3://{self.bucket_name}/{source_key} to {destination_key}")
+        return ('copied', source['ContentLength'])
+
+    def delete(self, s3_client, keys):
+        deleted = 0
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            response = s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+            errors = response.get('Errors', [])
+            if errors:
+                raise AirflowException(f"Failed to delete {len(errors)} archived objects: {errors[:10]}")
+            deleted += len(batch)
+        return deleted
+
+    def execute(self, context):
+        destination_folder = self.destination_base_folder_path
+        if self.partition_by_date:
+            destination_folder = os.path.join(destination_folder, context['ds'])
+        moves = [
+            (os.path.join(self.source_folder_path, file_name), os.path.join(destination_folder, file_name))
+            for file_name in self.files_to_move
+        ]
+        s3_client = self.get_s3_client()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = list(executor.map(lambda move: self.archive(s3_client, *move), moves))
+
+        summary = {'copied': 0, 'skipped': 0, 'missing': 0, 'bytes_copied': 0, 'deleted': 0}
+        for outcome, copied_bytes in outcomes:
+            summary[outcome] += 1
+            summary['bytes_copied'] += copied_bytes
+
+        if self.delete_flag == 'Y':
+            archived = [source_key for (source_key, _), (outcome, _) in zip(moves, outcomes) if outcome != 'missing']
+            summary['deleted'] = self.delete(s3_client, archived)
+
+        self.log.info(f"Archival summary: {summary}")
+        return summary
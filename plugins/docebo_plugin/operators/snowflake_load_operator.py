@@ -0,0 +1,73 @@
+from airflow.models import BaseOperator, Variable
+from airflow.utils.decorators import apply_defaults
+from docebo_plugin import docebo_config
+from docebo_plugin.snowflake_loader import SnowflakeLoader, build_table_specs
+
+
+class DoceboSnowflakeLoadOperator(BaseOperator):
+    """
+    Loads the Docebo landing files listed in ``docebo_config.s3_unload_list_dict``
+    into Snowflake, all tables at once, each on its own connection. Full
+    extracts replace the table contents.
+
+    With ``incremental=True`` this run's delta files are merged into the tables
+    on their ``merge_keys`` instead, and only once every MERGE has succeeded are
+    the watermarks returned by the ``watermark_task_ids`` extract tasks saved.
+    The per-table load results (rows, seconds, rows/s) are returned as XCom.
+
+    :param snowflake_conn_id: The Snowflake connection to load through.
+    :type snowflake_conn_id: str
+    :param incremental: Merge the ``*_delta`` files instead of copying the full extracts.
+    :type incremental: bool
+    :param watermark_task_ids: Incremental DoceboDataLoadOperator tasks whose watermarks this load commits.
+    :type watermark_task_ids: list
+    :param max_workers: Number of tables loaded at the same time.
+    :type max_workers: int
+    """
+
+    @apply_defaults
+    def __init__(
+        self,
+        snowflake_conn_id='snowflake_default',
+        incremental=False,
+        watermark_task_ids=None,
+        max_workers=4,
+        create_tables=True,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.snowflake_conn_id = snowflake_conn_id
+        self.incremental = incremental
+        self.watermark_task_ids = watermark_task_ids or []
+        self.max_workers = max_workers
+        self.create_tables = create_tables
+
+    def get_table_specs(self, run_id):
+        s3_unload_list_dict = docebo_config.build_s3_unload_list_dict()
+        if self.incremental:
+            s3_unload_list_dict = docebo_config.build_s3_unload_delta_list_dict(s3_unload_list_dict, run_id)
+        return build_table_specs(s3_unload_list_dict)
+
+    def save_watermarks(self, task_instance):
+        for task_id in self.watermark_task_ids:
+            new_watermark = task_instance.xcom_pull(task_ids=task_id)
+            if not new_watermark or not new_watermark["watermark"]:
+                self.log.info(f"No new watermark from {task_id}")
+                continue
+            Variable.set(new_watermark["watermark_variable"], new_watermark["watermark"])
+            self.log.info(f"Saved watermark {new_watermark['watermark']} to {new_watermark['watermark_variable']}")
+
+    def execute(self, context):
+        from airflow.providers.snowflake.hooks.snowflake import SnowflakeHook
+
+        specs = self.get_table_specs(context["ts_nodash"])
+        hook = SnowflakeHook(snowflake_conn_id=self.snowflake_conn_id)
+        loader = SnowflakeLoader(hook.get_conn, self.max_workers, self.create_tables, log=self.log)
+        results = loader.load_all(specs)
+
+        total_rows = sum(result["rows_loaded"] for result in results)
+        self.log.info(f"Loaded {total_rows} rows into {len(results)} tables")
+        if self.incremental:
+            self.save_watermarks(context["ti"])
+        return results
@@ -0,0 +1,129 @@
+import gzip
+import io
+from collections import namedtuple
+
+from docebo_plugin.schema import arrow_schema, to_arrow_table
+
+OutputFormat = namedtuple("OutputFormat", ["name", "file_type", "compression", "extension"])
+
+OUTPUT_FORMATS = {
+    "json": OutputFormat("json", "json", None, "json"),
+    "json.gz": OutputFormat("json.gz", "json", "gzip", "json.gz"),
+    "csv": OutputFormat("csv", "csv", None, "csv"),
+    "csv.gz": OutputFormat("csv.gz", "csv", "gzip", "csv.gz"),
+    "parquet": OutputFormat("parquet", "parquet", "snappy", "parquet"),
+    "parquet.zstd": OutputFormat("parquet.zstd", "parquet", "zstd", "parquet"),
+}
+
+
+def get_output_format(name):
+    try:
+        return OUTPUT_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported output_format {name!r}, expected one of {sorted(OUTPUT_FORMATS)}") from None
+
+
+def output_file_name(base_name, output_format):
+    return f"{base_name}.{get_output_format(output_format).extension}"
+
+
+def snowflake_file_format(output_format):
+    """COPY INTO options matching the landing files written with ``output_format``."""
+    output_format = get_output_format(output_format)
+    if output_format.file_type == "csv":
+        compression = " COMPRESSION = GZIP" if output_format.compression else ""
+        return (
+            f''' FILE_FORMAT = (type = 'csv' SKIP_HEADER = 1 FIELD_DELIMITER = ',' error_on_column_count_mismatch=false '''
+            f'''field_optionally_enclosed_by = '"'{compression} ) FORCE = TRUE ON_ERROR = 'continue' '''
+        )
+    if output_format.file_type == "json":
+        compression = " COMPRESSION = GZIP" if output_format.compression else ""
+        return f''' FILE_FORMAT = (type = 'json'{compression} ) FORCE = TRUE ON_ERROR = 'continue' MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE '''
+    return ''' FILE_FORMAT = (type = 'parquet' COMPRESSION = AUTO ) FORCE = TRUE ON_ERROR = 'continue' MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE '''
+
+
+class _UnclosableFile:
+    """Keeps ParquetWriter.close() from closing the sink it was handed."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.closed = False
+
+    def write(self, data):
+        return self.fileobj.write(data)
+
+    def tell(self):
+        return self.fileobj.tell()
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def close(self):
+        self.closed = True
+
+
+class FrameEncoder:
+    """
+    Encodes a sequence of DataFrames into one file in the given output format.
+
+    NDJSON and CSV are written as-is (CSV with a single header), optionally
+    through gzip. Parquet is written one row group per frame, typed with the
+    declared Snowflake ``columns``. Nothing is written to ``fileobj`` until the
+    first frame arrives.
+
+    :param fileobj: Binary file object, e.g. ``io.BytesIO`` or an ``S3MultipartWriter``.
+    :param output_format: Key of ``OUTPUT_FORMATS``.
+    :param columns: Parsed column schema (``schema.parse_columns``) used to type parquet output.
+    """
+
+    def __init__(self, fileobj, output_format, columns=()):
+        self.fileobj = fileobj
+        self.output_format = get_output_format(output_format)
+        self.columns = columns
+        self.rows_written = 0
+        self._sink = None
+        self._parquet_writer = None
+        self._header_written = False
+
+    def _open(self, df):
+        if self.output_format.file_type == "parquet":
+            import pyarrow.parquet as pq
+
+            self._schema = arrow_schema(df, self.columns)
+            self._parquet_writer = pq.ParquetWriter(
+                _UnclosableFile(self.fileobj), self._schema, compression=self.output_format.compression
+            )
+        elif self.output_format.compression == "gzip":
+            self._sink = gzip.GzipFile(fileobj=self.fileobj, mode="wb", compresslevel=6)
+        else:
+            self._sink = self.fileobj
+
+    def write(self, df):
+        if self._sink is None and self._parquet_writer is None:
+            self._open(df)
+        if self._parquet_writer is not None:
+            self._parquet_writer.write_table(to_arrow_table(df, self._schema, self.columns))
+        elif self.output_format.file_type == "csv":
+            self._sink.write(df.to_csv(index=False, header=not self._header_written).encode("utf-8"))
+            self._header_written = True
+        else:
+            payload = df.to_json(orient="records", lines=True)
+            if payload and not payload.endswith("\n"):
+                payload += "\n"
+            self._sink.write(payload.encode("utf-8"))
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        elif self._sink is not None and self._sink is not self.fileobj:
+            self._sink.close()
+
+
+def encode_frame(df, output_format, columns=()):
+    """Encode a single DataFrame and return the file contents as bytes."""
+    buffer = io.BytesIO()
+    encoder = FrameEncoder(buffer, output_format, columns)
+    encoder.write(df)
+    encoder.close()
+    return buffer.getvalue()
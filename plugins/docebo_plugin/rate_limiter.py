@@ -0,0 +1,128 @@
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+
+DEFAULT_RATE_LIMIT_FILE = os.path.join("/tmp", "docebo_rate_limit.json")
+
+
+class FileTokenBucket:
+    """
+    Token bucket whose state lives in a local file, so every Docebo task
+    running on the worker (LocalExecutor forks one process per task) draws
+    from the same budget.
+
+    The file holds the current token count and the time of the last refill.
+    Every acquisition takes an exclusive ``flock`` on it, refills according to
+    the elapsed time and takes a token if one is available.
+
+    :param rate: Tokens added per second, i.e. the sustained requests/s across all tasks.
+    :type rate: float
+    :param capacity: Maximum burst size, defaults to ``rate``.
+    :type capacity: float
+    :param path: State file shared by the cooperating processes.
+    :type path: str
+    """
+
+    def __init__(self, rate, capacity=None, path=DEFAULT_RATE_LIMIT_FILE):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.path = path
+
+    def try_acquire(self, tokens=1):
+        """Take ``tokens`` if available. Returns 0 on success, otherwise the seconds to wait before retrying."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                try:
+                    state = json.loads(state_file.read() or "{}")
+                except ValueError:
+                    state = {}
+                available = state.get("tokens", self.capacity)
+                updated_at = state.get("updated_at", now)
+                available = min(self.capacity, available + max(0.0, now - updated_at) * self.rate)
+                if available >= tokens:
+                    available -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - available) / self.rate
+                state_file.seek(0)
+                state_file.truncate()
+                json.dump({"tokens": available, "updated_at": now}, state_file)
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+        return wait
+
+    def acquire(self, tokens=1):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AimdConcurrency:
+    """
+    Additive-increase/multiplicative-decrease limit for the in-flight window.
+
+    The limit grows by ``increase`` once a full window of requests has
+    completed without the latency rising above ``latency_tolerance`` times the
+    smoothed baseline, and is multiplied by ``decrease_factor`` on a throttling
+    response (429/5xx). Only one decrease is applied per window so a burst of
+    throttled responses that were already in flight does not collapse the limit.
+
+    :param initial: Starting limit.
+    :param minimum: Lower bound for the limit.
+    :param maximum: Upper bound for the limit.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=32, increase=1, decrease_factor=0.5, latency_tolerance=1.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.limit = max(minimum, min(maximum, initial))
+        self.baseline_latency = None
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    def on_success(self, latency):
+        with self._lock:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            latency_flat = latency <= self.baseline_latency * self.latency_tolerance
+            self.baseline_latency = 0.9 * self.baseline_latency + 0.1 * latency
+            if self._completed < 0:
+                # Still draining the window that was in flight when we backed off.
+                self._completed += 1
+                return
+            if not latency_flat:
+                return
+            self._completed += 1
+            if self._completed >= self.limit:
+                self._completed = 0
+                self.limit = min(self.maximum, self.limit + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            if self._completed < 0:
+                # Already backed off for the current window.
+                self._completed += 1
+                return
+            self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+            self._completed = -self.limit
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class DoceboReportFetcher:
+    """
+    Pipelined fetcher for Docebo analytics export results.
+
+    ``wait_until_ready`` polls the first results page with exponential backoff
+    until the export has finished (Docebo answers 400 while it is still
+    running) or ``ready_timeout`` expires.
+
+    Pages are then handed to ``on_page(rows)`` in page order. With
+    ``parallel_pages=1`` the ``nextToken`` chain is followed by a background
+    thread that requests and decodes the next page while the caller is still
+    encoding and uploading the previous one. With ``parallel_pages > 1`` pages
+    are requested by number, up to ``parallel_pages`` at a time, until a page
+    comes back empty or without a ``nextToken``.
+
+    :param session: ``DoceboSession`` used for every request.
+    :param results_url: ``.../analytics/v1/reports/{report_id}/exports/{export_id}/results`` URL.
+    :param headers: Request headers, including the bearer token.
+    :param page_size: Rows requested per page.
+    :param parallel_pages: Number of pages fetched concurrently.
+    :param ready_timeout: Seconds to wait for the export to become ready.
+    """
+
+    def __init__(
+        self,
+        session,
+        results_url,
+        headers,
+        page_size=1000,
+        parallel_pages=1,
+        ready_timeout=1800,
+        poll_interval=5,
+        max_poll_interval=60,
+        log=None,
+    ):
+        self.session = session
+        self.results_url = results_url
+        self.headers = headers
+        self.page_size = page_size
+        self.parallel_pages = max(1, parallel_pages)
+        self.ready_timeout = ready_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.log = log
+        self.api_call_count = 0
+        self._count_lock = threading.Lock()
+
+    def _get(self, params):
+        response = self.session.get(self.results_url, headers=self.headers, params=params, label="reports/export/results")
+        with self._count_lock:
+            self.api_call_count += 1
+        return response
+
+    def fetch_page(self, page, next_token=None):
+        params = {"pageSize": self.page_size, "page": page}
+        if next_token:
+            params["nextToken"] = next_token
+        response = self._get(params)
+        response.raise_for_status()
+        payload = response.json()
+        if self.log:
+            self.log.info(f"Fetched {len(payload['data'])} records for page {page}")
+        return payload
+
+    def wait_until_ready(self, page=1):
+        """Poll until the export results are available and return the payload of ``page``."""
+        deadline = time.monotonic() + self.ready_timeout
+        interval = self.poll_interval
+        while True:
+            response = self._get({"pageSize": self.page_size, "page": page})
+            if response.status_code == 200:
+                payload = response.json()
+                if self.log:
+                    self.log.info(f"Fetched {len(payload['data'])} records for page {page}")
+                return payload
+            if response.status_code != 400:
+                response.raise_for_status()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                from airflow.exceptions import AirflowException
+
+                raise AirflowException(f"Report export was not ready after {self.ready_timeout} seconds")
+            wait_seconds = min(interval, remaining)
+            if self.log:
+                self.log.info(f"Report export not ready yet, polling again in {wait_seconds:.0f}s")
+            time.sleep(wait_seconds)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def run(self, on_page, start_page=1):
+        first_payload = self.wait_until_ready(start_page)
+        if self.parallel_pages > 1:
+            self._run_parallel(first_payload, on_page, start_page)
+        else:
+            self._run_pipelined(first_payload, on_page, start_page)
+
+    def _run_pipelined(self, first_payload, on_page, start_page):
+        pages = queue.Queue(maxsize=2)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+
+        def produce():
+            try:
+                payload, page = first_payload, start_page
+                while not stop.is_set():
+                    put(payload["data"])
+                    next_token = payload.get("nextToken")
+                    if not next_token:
+                        break
+                    page += 1
+                    payload = self.fetch_page(page, next_token)
+                put(_DONE)
+            except BaseException as error:
+                put(_Failure(error))
+
+        producer = threading.Thread(target=produce, name="docebo-report-fetch", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                on_page(item)
+        finally:
+            stop.set()
+            producer.join()
+
+    def _run_parallel(self, first_payload, on_page, start_page):
+        on_page(first_payload["data"])
+        if not first_payload.get("nextToken") or not first_payload["data"]:
+            return
+
+        next_page = emit_page = start_page + 1
+        last_page = None
+        in_flight = {}
+        completed = {}
+        with ThreadPoolExecutor(max_workers=self.parallel_pages, thread_name_prefix="docebo-report") as executor:
+            try:
+                while last_page is None or emit_page <= last_page:
+                    while last_page is None and len(in_flight) < self.parallel_pages:
+                        in_flight[next_page] = executor.submit(self.fetch_page, next_page)
+                        next_page += 1
+                    if in_flight:
+                        done, _ = wait(in_flight.values(), return_when=FIRST_COMPLETED)
+                        for page in [page for page, future in in_flight.items() if future in done]:
+                            payload = in_flight.pop(page).result()
+                            completed[page] = payload["data"]
+                            if not payload.get("nextToken") or not payload["data"]:
+                                last_page = page if last_page is None else min(last_page, page)
+                    while emit_page in completed and (last_page is None or emit_page <= last_page):
+                        on_page(completed.pop(emit_page))
+                        emit_page += 1
+            finally:
+                for future in in_flight.values():
+                    future.cancel()
@@ -0,0 +1,151 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MB = 1024 * 1024
+# S3 rejects multipart parts smaller than 5 MiB (except the last one).
+MIN_PART_SIZE = 5 * MB
+
+
+class S3MultipartWriter:
+    """
+    File-like object that streams everything written to it into an S3
+    multipart upload.
+
+    Bytes are collected into fixed-size part buffers. Every full part is
+    handed to a background thread for ``upload_part`` so the caller can keep
+    fetching while the previous part is on the wire. At most
+    ``max_pending_parts`` parts are held in memory at once, which keeps peak
+    memory at roughly ``(max_pending_parts + 1) * part_size`` no matter how
+    much data is written.
+
+    The upload is only created when the first part is flushed, so a writer
+    that never receives data leaves nothing behind in S3.
+
+    :param s3_client: boto3 S3 client.
+    :param bucket: Destination bucket.
+    :param key: Destination key.
+    :param part_size: Size in bytes of every part but the last one.
+    :type part_size: int
+    :param max_pending_parts: Number of parts that may be uploading concurrently.
+    :type max_pending_parts: int
+    :param metrics: Optional ``OperatorMetrics``; every part upload is timed into ``s3_upload_part``.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=8 * MB, max_pending_parts=2, metrics=None):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes, got {part_size}")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.upload_id = None
+        self.bytes_written = 0
+        self.metrics = metrics
+        self._buffer = bytearray()
+        self._futures = []
+        self._part_number = 0
+        self._slots = threading.BoundedSemaphore(max_pending_parts)
+        self._executor = ThreadPoolExecutor(max_workers=max_pending_parts, thread_name_prefix="s3-part")
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def flush(self):
+        # Parts are flushed as soon as they are full; the tail is flushed on close().
+        pass
+
+    def write(self, data):
+        if self._closed:
+            raise ValueError("I/O operation on closed S3MultipartWriter")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            body = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(body)
+        return len(data)
+
+    def _submit_part(self, body):
+        self._raise_failed_parts()
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+            self.upload_id = response["UploadId"]
+        self._part_number += 1
+        # Blocks while max_pending_parts uploads are in flight, bounding memory.
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._upload_part, self._part_number, body))
+
+    def _upload_part(self, part_number, body):
+        try:
+            started = time.monotonic()
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            if self.metrics is not None:
+                self.metrics.timing("s3_upload_part", time.monotonic() - started)
+                self.metrics.bytes_uploaded(len(body))
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            self._slots.release()
+
+    def _raise_failed_parts(self):
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+    def close(self):
+        """Upload the remaining buffer and complete the upload. Returns True if an object was written."""
+        if self._closed:
+            return self.upload_id is not None
+        try:
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+                self._buffer.clear()
+            parts = [future.result() for future in self._futures]
+            if self.upload_id is not None:
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+                )
+        except BaseException:
+            self.abort()
+            raise
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        return self.upload_id is not None
+
+    def abort(self):
+        """Drop buffered data and abort the multipart upload, if one was started."""
+        self._closed = True
+        self._buffer.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self.upload_id is not None:
+            upload_id, self.upload_id = self.upload_id, None
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=upload_id)
@@ -0,0 +1,108 @@
+import json
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+Column = namedtuple("Column", ["name", "sql_type"])
+
+# Commas inside a type such as NUMBER(38, 0) do not separate columns.
+_COLUMN_SEPARATOR = re.compile(r",(?![^(]*\))")
+
+
+@lru_cache(maxsize=None)
+def parse_columns(columns_ddl):
+    """
+    Parse a column block from docebo_config (``user_id INTEGER, username VARCHAR, ...``)
+    into a tuple of ``Column(name, sql_type)`` with upper-cased base types.
+    """
+    columns = []
+    for definition in _COLUMN_SEPARATOR.split(columns_ddl):
+        parts = definition.split(None, 1)
+        if not parts:
+            continue
+        sql_type = parts[1].strip().upper() if len(parts) > 1 else "VARCHAR"
+        columns.append(Column(parts[0], sql_type))
+    return tuple(columns)
+
+
+def base_type(sql_type):
+    return sql_type.split("(", 1)[0].strip()
+
+
+def to_text(value):
+    """Render a JSON value as a VARCHAR: lists/dicts as JSON, scalars as str, nulls as None."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return str(value)
+
+
+_BOOLEAN_VALUES = {
+    True: True, False: False, 1: True, 0: False,
+    "true": True, "false": False, "True": True, "False": False, "1": True, "0": False,
+}
+
+
+def cast_series(series, sql_type):
+    import pandas as pd
+
+    sql_type = base_type(sql_type)
+    if sql_type in ("INTEGER", "INT", "BIGINT", "NUMBER"):
+        numbers = pd.to_numeric(series, errors="coerce")
+        return numbers.where(numbers % 1 == 0).astype("Int64")
+    if sql_type in ("FLOAT", "DOUBLE", "REAL", "DECIMAL"):
+        return pd.to_numeric(series, errors="coerce").astype("float64")
+    if sql_type == "BOOLEAN":
+        return series.map(lambda value: _BOOLEAN_VALUES.get(value) if isinstance(value, (bool, int, str)) else None).astype("boolean")
+    if sql_type in ("TIMESTAMP_NTZ", "TIMESTAMP", "DATETIME"):
+        return pd.to_datetime(series, errors="coerce", utc=True).dt.tz_localize(None).dt.floor("us")
+    if sql_type == "DATE":
+        dates = pd.to_datetime(series, errors="coerce")
+        return dates.dt.date.astype(object).where(dates.notna(), None)
+    return series.map(to_text).astype("string")
+
+
+def arrow_type(sql_type):
+    import pyarrow as pa
+
+    sql_type = base_type(sql_type)
+    if sql_type in ("INTEGER", "INT", "BIGINT", "NUMBER"):
+        return pa.int64()
+    if sql_type in ("FLOAT", "DOUBLE", "REAL", "DECIMAL"):
+        return pa.float64()
+    if sql_type == "BOOLEAN":
+        return pa.bool_()
+    if sql_type in ("TIMESTAMP_NTZ", "TIMESTAMP", "DATETIME"):
+        return pa.timestamp("us")
+    if sql_type == "DATE":
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(df, columns):
+    """Arrow schema with every declared column typed, followed by any undeclared column of ``df`` as string."""
+    import pyarrow as pa
+
+    declared = {column.name for column in columns}
+    fields = [pa.field(column.name, arrow_type(column.sql_type)) for column in columns]
+    fields += [pa.field(name, pa.string()) for name in df.columns if name not in declared]
+    return pa.schema(fields)
+
+
+def to_arrow_table(df, schema, columns):
+    """Cast ``df`` to the declared types and return an Arrow table matching ``schema``."""
+    import pandas as pd
+    import pyarrow as pa
+
+    sql_types = {column.name: column.sql_type for column in columns}
+    typed = {}
+    for name in schema.names:
+        series = df[name] if name in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+        typed[name] = cast_series(series, sql_types.get(name, "VARCHAR"))
+    return pa.Table.from_pandas(pd.DataFrame(typed, index=df.index), schema=schema, preserve_index=False)
@@ -0,0 +1,186 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from docebo_plugin.schema import base_type, parse_columns
+
+_TableSpec = namedtuple(
+    "TableSpec",
+    ["db_name", "schema_name", "table_name", "columns", "stage", "file_path", "file_name", "file_format", "merge_keys",
+     "watermark_column"],
+)
+
+_TEXT_TYPES = ("VARCHAR", "STRING", "TEXT", "CHAR")
+
+
+class TableSpec(_TableSpec):
+    """
+    Typed model of one ``s3_unload_list_dict`` entry: the target table, its
+    parsed columns (``schema.Column``) and the staged file it is loaded from.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_unload_dict(cls, details):
+        stage = f"{details['s3_db_name']}.{details['s3_schema_name']}.{details['s3_stage']}"
+        return cls(
+            db_name=details["db_name"],
+            schema_name=details["schema_name"],
+            table_name=details["table_name"],
+            columns=parse_columns(details["columns"]),
+            stage=stage,
+            file_path=(details.get("s3_file_path") or "").strip("/"),
+            file_name=details["s3_file_name"],
+            file_format=details["s3_file_config"],
+            merge_keys=tuple(details.get("merge_keys") or ()),
+            watermark_column=details.get("watermark_column"),
+        )
+
+    @property
+    def qualified_name(self):
+        return f"{self.db_name}.{self.schema_name}.{self.table_name}"
+
+    @property
+    def stage_location(self):
+        path = "/".join(part for part in (self.file_path, self.file_name) if part)
+        return f"@{self.stage}/{path}"
+
+
+def build_table_specs(s3_unload_list_dict):
+    return [TableSpec.from_unload_dict(details) for details in s3_unload_list_dict]
+
+
+def create_table_sql(spec, table_name=None, temporary=False):
+    columns = ",\n    ".join(f"{column.name} {column.sql_type}" for column in spec.columns)
+    kind = "TEMPORARY TABLE" if temporary else "TABLE"
+    return f"CREATE {kind} IF NOT EXISTS {table_name or spec.qualified_name} (\n    {columns}\n)"
+
+
+def copy_into_sql(spec, table_name=None):
+    return f"COPY INTO {table_name or spec.qualified_name} FROM {spec.stage_location}{spec.file_format}"
+
+
+def staging_table_name(spec):
+    return f"{spec.qualified_name}_LOAD_STAGE"
+
+
+def overwrite_sql(spec, source_table):
+    """Replace the target table's rows with ``source_table`` in one statement (truncate and insert atomically)."""
+    names = ", ".join(column.name for column in spec.columns)
+    return f"INSERT OVERWRITE INTO {spec.qualified_name} ({names}) SELECT {names} FROM {source_table}"
+
+
+def latest_first_order(spec):
+    """
+    ORDER BY picking the row kept per merge key: the newest ``watermark_column``
+    first, then every other column, so ties resolve the same way on every run.
+    """
+    order = []
+    watermark = spec.watermark_column
+    if watermark:
+        sql_type = next((column.sql_type for column in spec.columns if column.name == watermark), None)
+        # Watermarks landed as VARCHAR would otherwise sort as text.
+        expression = f"TRY_TO_TIMESTAMP({watermark})" if sql_type and base_type(sql_type) in _TEXT_TYPES else watermark
+        order.append(f"{expression} DESC NULLS LAST")
+    for column in spec.columns:
+        if column.name not in spec.merge_keys and column.name != watermark and column.name not in order:
+            order.append(column.name)
+    return ", ".join(order or spec.merge_keys)
+
+
+def merge_sql(spec, source_table):
+    """MERGE ``source_table`` into the target table on ``spec.merge_keys``."""
+    keys = spec.merge_keys
+    names = [column.name for column in spec.columns]
+    on = " AND ".join(f"target.{key} = source.{key}" for key in keys)
+    updates = ",\n        ".join(f"target.{name} = source.{name}" for name in names if name not in keys)
+    insert_columns = ", ".join(names)
+    insert_values = ", ".join(f"source.{name}" for name in names)
+    partition = ", ".join(keys)
+    # A delta file can hold the same key more than once; MERGE needs one source row per key, the latest one.
+    source = (
+        f"(SELECT * FROM {source_table} "
+        f"QUALIFY ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY {latest_first_order(spec)}) = 1)"
+    )
+    sql = f"MERGE INTO {spec.qualified_name} AS target\nUSING {source} AS source\nON {on}\n"
+    if updates:
+        sql += f"WHEN MATCHED THEN UPDATE SET\n        {updates}\n"
+    return sql + f"WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values})"
+
+
+def rows_loaded(cursor):
+    """Sum of ``rows_loaded`` in a COPY INTO result (0 when no file was processed)."""
+    names = [column[0].lower() for column in cursor.description or ()]
+    if "rows_loaded" not in names:
+        return 0
+    index = names.index("rows_loaded")
+    return sum(row[index] or 0 for row in cursor.fetchall())
+
+
+class SnowflakeLoader:
+    """
+    Loads staged Docebo files into Snowflake, all tables concurrently.
+
+    Every table load runs on its own connection from ``connection_factory``,
+    as DB-API connections are not safe to share between threads. Each file is
+    first copied into a session-scoped staging table. Full extracts then
+    replace the table's rows with ``INSERT OVERWRITE``, so a daily snapshot
+    does not pile up on the previous ones (the file formats ``FORCE`` the
+    COPY); delta files are merged on their ``merge_keys``. ``load_all``
+    returns one result per table with rows loaded, elapsed seconds and rows/s.
+
+    :param connection_factory: Callable returning a new DB-API connection, e.g. ``SnowflakeHook(...).get_conn``.
+    :param max_workers: Number of tables loaded at the same time.
+    :type max_workers: int
+    :param create_tables: Issue ``CREATE TABLE IF NOT EXISTS`` before loading.
+    :type create_tables: bool
+    """
+
+    def __init__(self, connection_factory, max_workers=4, create_tables=True, log=None):
+        self.connection_factory = connection_factory
+        self.max_workers = max_workers
+        self.create_tables = create_tables
+        self.log = log
+
+    def execute(self, cursor, sql):
+        if self.log:
+            self.log.info(f"Executing: {sql}")
+        cursor.execute(sql)
+        return cursor
+
+    def load_table(self, spec):
+        started = time.monotonic()
+        connection = self.connection_factory()
+        try:
+            cursor = connection.cursor()
+            try:
+                if self.create_tables:
+                    self.execute(cursor, create_table_sql(spec))
+                stage_table = staging_table_name(spec)
+                self.execute(cursor, create_table_sql(spec, stage_table, temporary=True))
+                self.execute(cursor, f"TRUNCATE TABLE {stage_table}")
+                loaded = rows_loaded(self.execute(cursor, copy_into_sql(spec, stage_table)))
+                if spec.merge_keys:
+                    self.execute(cursor, merge_sql(spec, stage_table))
+                else:
+                    self.execute(cursor, overwrite_sql(spec, stage_table))
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+        seconds = time.monotonic() - started
+        result = {
+            "table": spec.qualified_name,
+            "file": spec.stage_location,
+            "rows_loaded": loaded,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(loaded / seconds, 1) if seconds > 0 else None,
+        }
+        if self.log:
+            self.log.info(f"Loaded {loaded} rows into {spec.qualified_name} in {seconds:.1f}s ({result['rows_per_second']} rows/s)")
+        return result
+
+    def load_all(self, specs):
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(specs)))) as executor:
+            return list(executor.map(self.load_table, specs))
@@ -0,0 +1,111 @@
+import pandas as pd
+
+from docebo_plugin.schema import base_type, cast_series
+
+# Filter operators accepted in docebo_config.transform_config; each returns the mask of rows it matches.
+FILTER_OPERATORS = ("contains", "not_contains", "in", "not_in")
+
+
+def _as_text(series, case):
+    text = series.astype("string")
+    return text if case else text.str.lower()
+
+
+def filter_mask(df, column, operator, value, case=False):
+    """Boolean mask of the rows of ``df`` kept by one filter."""
+    if operator not in FILTER_OPERATORS:
+        raise ValueError(f"Unsupported filter operator {operator!r}, expected one of {FILTER_OPERATORS}")
+    if column not in df.columns:
+        # A column the page did not return matches nothing, so only negated filters keep the rows.
+        return pd.Series(operator.startswith("not_"), index=df.index)
+    text = _as_text(df[column], case)
+    if operator.endswith("contains"):
+        matched = text.str.contains(value if case else value.lower(), regex=False, na=False)
+    else:
+        values = [str(item) if case else str(item).lower() for item in value]
+        matched = text.isin(values).fillna(False).astype(bool)
+    return ~matched if operator.startswith("not_") else matched
+
+
+class TransformStage:
+    """
+    Declarative row filter, projection and cast step for Docebo pages.
+
+    ``frame`` builds the page DataFrame from only the columns the stage needs,
+    so payload such as ``avatar`` URLs or ``actions`` lists is never
+    materialized. ``apply`` then filters rows with vectorized, non-regex string
+    matching, projects to the declared Snowflake columns in table order and
+    casts the numeric and boolean ones. Run ``apply`` once on the combined
+    frame, or per page when streaming.
+
+    :param columns: Declared columns (``schema.parse_columns``); empty to keep every column.
+    :type columns: tuple
+    :param filters: Dicts with ``column``, one of ``FILTER_OPERATORS`` as key and an optional ``case``.
+    :type filters: list
+    :param drop_columns: Columns left out of the output even when they are declared.
+    :type drop_columns: list
+    :param cast_types: Base SQL types of the declared columns to cast, e.g. ``("INTEGER", "BOOLEAN")``.
+    :type cast_types: tuple
+    :param keep_positions: Output dropped declared columns as empty ones, for positional formats such as CSV.
+    :type keep_positions: bool
+    :param extra_columns: Columns needed before ``apply`` but not written, e.g. the watermark column.
+    :type extra_columns: list
+    """
+
+    def __init__(self, columns=(), filters=(), drop_columns=(), cast_types=(), keep_positions=False, extra_columns=()):
+        self.columns = tuple(columns)
+        self.filters = [self._parse_filter(spec) for spec in filters]
+        self.drop_columns = set(drop_columns)
+        self.cast_types = {sql_type.upper() for sql_type in cast_types}
+        self.keep_positions = keep_positions
+        self.output_columns = [column.name for column in self.columns if column.name not in self.drop_columns]
+        read_columns = list(self.output_columns)
+        for name in [spec[0] for spec in self.filters] + list(extra_columns):
+            if name not in read_columns:
+                read_columns.append(name)
+        self.read_columns = read_columns if self.columns else None
+
+    @classmethod
+    def from_config(cls, config, columns=(), **kwargs):
+        """Stage for one ``docebo_config.transform_config`` entry; ``None`` passes pages through unchanged."""
+        config = config or {}
+        return cls(
+            columns=columns if config.get("project") else (),
+            filters=config.get("filters", ()),
+            drop_columns=config.get("drop_columns", ()),
+            cast_types=config.get("cast_types", ()),
+            **kwargs,
+        )
+
+    @staticmethod
+    def _parse_filter(spec):
+        operators = [key for key in spec if key in FILTER_OPERATORS]
+        if len(operators) != 1:
+            raise ValueError(f"Filter {spec!r} needs exactly one of {FILTER_OPERATORS}")
+        return spec["column"], operators[0], spec[operators[0]], spec.get("case", False)
+
+    def frame(self, records):
+        """DataFrame of one page, limited to the columns the stage reads."""
+        if self.read_columns is not None:
+            return pd.DataFrame(records, columns=self.read_columns)
+        df = pd.DataFrame(records)
+        dropped = [name for name in df.columns if name in self.drop_columns]
+        return df.drop(columns=dropped) if dropped else df
+
+    def apply(self, df):
+        if self.filters and not df.empty:
+            mask = None
+            for column, operator, value, case in self.filters:
+                matched = filter_mask(df, column, operator, value, case)
+                mask = matched if mask is None else mask & matched
+            df = df[mask.to_numpy(dtype=bool)]
+        if not self.columns:
+            return df
+        names = [column.name for column in self.columns] if self.keep_positions else self.output_columns
+        projected = df.reindex(columns=names)
+        for column in self.columns:
+            if column.name in self.drop_columns:
+                continue
+            if base_type(column.sql_type) in self.cast_types:
+                projected[column.name] = cast_series(projected[column.name], column.sql_type)
+        return projected
@@ -1,11 +1,16 @@
 from airflow.plugins_manager import AirflowPlugin
-from powerbi_plugin.operators.powerbi_dataset_refresh_operator import PowerBIDatasetRefreshOperator
+from shared.lazy_imports import lazy_attributes
+
+__getattr__ = lazy_attributes(__name__, {
+    "PowerBIDatasetRefreshOperator": "powerbi_plugin.operators.powerbi_dataset_refresh_operator",
+    "PowerBIBatchDatasetRefreshOperator": "powerbi_plugin.operators.powerbi_batch_refresh_operator",
+})
 
 
 class PowerBIPlugin(AirflowPlugin):
     name = 'powerbi_plugin'
     hooks = []
-    operators = [PowerBIDatasetRefreshOperator]
+    operators = []
     executors = []
     macros = []
     admin_views = []
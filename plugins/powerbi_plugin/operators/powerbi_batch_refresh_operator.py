@@ -0,0 +1,192 @@
+from airflow.models import BaseOperator
+from airflow.utils.decorators import apply_defaults
+from airflow.exceptions import AirflowException
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
+from powerbi_plugin.polling import AdaptivePollPolicy
+from powerbi_plugin.powerbi_api import PowerBIClient
+from powerbi_plugin.token_provider import get_token_provider
+from shared.instrumentation import OperatorMetrics
+
+
+class PowerBIBatchDatasetRefreshOperator(BaseOperator):
+    """
+    Refreshes many Power BI datasets at once and waits for all of them.
+
+    Refreshes are triggered up to ``max_concurrent_refreshes`` at a time so the
+    capacity refresh limits are respected; a dataset the service rejects with
+    429 is queued again and retried on the next cycle. Each refresh is polled
+    on its own ``AdaptivePollPolicy`` schedule, learned from that dataset's
+    refresh history, with one shared, cached token. The returned (XCom) value maps
+    ``"<workspace_id>/<dataset_id>"`` to the outcome of that refresh. Errors
+    are kept to the dataset they happened on: a dataset whose refresh cannot
+    be triggered, or whose status cannot be read ``max_poll_errors`` times in
+    a row, gets an error result while the other refreshes carry on.
+
+    :param datasets: Iterable of ``(workspace_id, dataset_id)`` pairs.
+    :type datasets: list
+    :param max_concurrent_refreshes: Maximum number of refreshes running at the same time.
+    :type max_concurrent_refreshes: int
+    :param fail_on_error: Raise once all refreshes are done if any of them did not complete.
+    :type fail_on_error: bool
+    :param max_poll_errors: Consecutive failed status polls before a refresh is given up on.
+    :type max_poll_errors: int
+    """
+
+    @apply_defaults
+    def __init__(
+        self,
+        client_id,
+        client_secret,
+        tenant_name,
+        datasets,
+        max_concurrent_refreshes=5,
+        timeout_seconds=3600,
+        check_interval_seconds=300,
+        min_check_interval_seconds=15,
+        history_size=10,
+        fail_on_error=True,
+        max_poll_errors=3,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.tenant_name = tenant_name
+        self.datasets = [tuple(dataset) for dataset in datasets]
+        self.max_concurrent_refreshes = max_concurrent_refreshes
+        self.timeout_seconds = timeout_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.min_check_interval_seconds = min_check_interval_seconds
+        self.history_size = history_size
+        self.fail_on_error = fail_on_error
+        self.max_poll_errors = max_poll_errors
+
+    def get_token_provider(self):
+        return get_token_provider(self.client_id, self.client_secret, self.tenant_name)
+
+    def get_poll_policy(self, client, workspace_id, dataset_id):
+        try:
+            history = client.get_refreshes(workspace_id, dataset_id, self.history_size)
+        except Exception as error:
+            # Like the single-dataset operator: without a history, poll on the backoff schedule.
+            self.log.warning("Could not read refresh history of %s/%s: %s", workspace_id, dataset_id, error)
+            history = {}
+        return AdaptivePollPolicy.from_history(
+            history, min_interval=self.min_check_interval_seconds, max_interval=self.check_interval_seconds
+        )
+
+    def start_refreshes(self, client, pending, running, results, policies):
+        while pending and len(running) < self.max_concurrent_refreshes:
+            workspace_id, dataset_id = pending.popleft()
+            key = f"{workspace_id}/{dataset_id}"
+            if key not in policies:
+                policies[key] = self.get_poll_policy(client, workspace_id, dataset_id)
+            try:
+                response = client.trigger_refresh(workspace_id, dataset_id)
+            except Exception as error:
+                self.log.error("Failed to trigger refresh of %s: %s", key, error)
+                results[key] = {"status": "TriggerFailed", "error": repr(error)}
+                self.metrics.incr("errors")
+                continue
+            if response.status_code == 202:
+                self.log.info("Dataset refresh triggered for %s, expected duration: %s seconds",
+                              key, policies[key].expected_duration)
+                started = time.time()
+                next_poll = started + policies[key].next_interval(0)
+                running[key] = (workspace_id, dataset_id, started, next_poll)
+            elif response.status_code == 429:
+                # Capacity refresh limit reached; try this dataset again on the next cycle.
+                self.log.info("Refresh of %s throttled by Power BI, will retry", key)
+                pending.appendleft((workspace_id, dataset_id))
+                self.metrics.incr("throttled")
+                return
+            else:
+                self.log.error("Failed to trigger refresh of %s. Status code: %s", key, response.status_code)
+                results[key] = {"status": "TriggerFailed", "status_code": response.status_code}
+
+    def poll_refreshes(self, client, executor, running, results, policies, poll_errors):
+        def poll(target):
+            try:
+                return client.get_refresh_status(*target), None
+            except Exception as error:
+                return None, error
+
+        now = time.time()
+        keys = [key for key, (_, _, _, next_poll) in running.items() if next_poll <= now]
+        targets = [running[key][:2] for key in keys]
+        for key, (status, error) in zip(keys, executor.map(poll, targets)):
+            workspace_id, dataset_id, started, _ = running[key]
+            elapsed = time.time() - started
+            if error is not None:
+                poll_errors[key] = poll_errors.get(key, 0) + 1
+                self.metrics.incr("errors")
+                if poll_errors[key] >= self.max_poll_errors:
+                    del running[key]
+                    results[key] = {"status": "PollFailed", "error": repr(error), "elapsed_seconds": round(elapsed, 1)}
+                    self.log.error("Giving up on %s after %s failed status polls: %s", key, poll_errors[key], error)
+                else:
+                    running[key] = (workspace_id, dataset_id, started, time.time() + policies[key].next_interval(elapsed))
+                    self.log.warning("Could not read refresh status of %s, will retry: %s", key, error)
+                continue
+            poll_errors.pop(key, None)
+            if status in ("Completed", "Failed"):
+                del running[key]
+                results[key] = {"status": status, "elapsed_seconds": round(elapsed, 1)}
+                self.metrics.timing("refresh_duration", elapsed)
+                self.metrics.incr(f"status.{status}")
+                self.log.info("Dataset refresh of %s finished with status %s", key, status)
+            else:
+                running[key] = (workspace_id, dataset_id, started, time.time() + policies[key].next_interval(elapsed))
+                self.log.info("Dataset refresh of %s is still running. Status: %s", key, status)
+
+    def next_wait(self, pending, running, deadline):
+        if running:
+            wait = min(next_poll for _, _, _, next_poll in running.values()) - time.time()
+        else:
+            wait = self.check_interval_seconds
+        if pending and len(running) < self.max_concurrent_refreshes:
+            # A throttled dataset is waiting for capacity; retry it at the shortest interval.
+            wait = min(wait, self.min_check_interval_seconds)
+        return max(0, min(wait, deadline - time.time() + 1))
+
+    def execute(self, context):
+        self.metrics = OperatorMetrics("powerbi_batch_refresh")
+        client = PowerBIClient(
+            self.get_token_provider(),
+            pool_size=self.max_concurrent_refreshes,
+            metrics=self.metrics,
+        )
+        pending = deque(self.datasets)
+        running = {}
+        results = {}
+        policies = {}
+        poll_errors = {}
+        deadline = time.time() + self.timeout_seconds
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_refreshes) as executor:
+                while pending or running:
+                    self.start_refreshes(client, pending, running, results, policies)
+                    if not pending and not running:
+                        break
+                    time.sleep(self.next_wait(pending, running, deadline))
+                    self.poll_refreshes(client, executor, running, results, policies, poll_errors)
+                    if time.time() > deadline:
+                        self.log.warning("Timeout waiting for dataset refresh completion.")
+                        break
+        finally:
+            client.close()
+
+        for key in running:
+            results[key] = {"status": "Timeout"}
+        for workspace_id, dataset_id in pending:
+            results[f"{workspace_id}/{dataset_id}"] = {"status": "NotStarted"}
+
+        failed = {key: result for key, result in results.items() if result["status"] != "Completed"}
+        if failed and self.fail_on_error:
+            error_message = f"{len(failed)} of {len(results)} dataset refreshes did not complete: {failed}"
+            self.log.error(error_message)
+            raise AirflowException(error_message)
+        return results
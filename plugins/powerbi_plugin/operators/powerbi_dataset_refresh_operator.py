@@ -1,10 +1,12 @@
 from airflow.models import BaseOperator
 from airflow.utils.decorators import apply_defaults
 from airflow.exceptions import AirflowException
-import requests
-import pandas as pd
-import msal
 import time
+from powerbi_plugin.polling import AdaptivePollPolicy
+from powerbi_plugin.powerbi_api import PowerBIClient
+from powerbi_plugin.token_provider import get_token_provider
+from powerbi_plugin.triggers.powerbi_refresh_trigger import PowerBIRefreshTrigger
+from shared.instrumentation import OperatorMetrics
 
 class PowerBIDatasetRefreshOperator(BaseOperator):
     @apply_defaults
@@ -15,8 +17,12 @@ class PowerBIDatasetRefreshOperator(BaseOperator):
         tenant_name,
         workspace_id,
         dataset_id,
-        timeout_seconds=3600,  # Default timeout is 30 minutes
+        timeout_seconds=3600,  # Default timeout is 60 minutes
         check_interval_seconds=300,  # Default check interval is 5 minutes
+        deferrable=False,  # Wait for completion in the triggerer instead of a worker slot
+        adaptive_polling=True,  # Poll around the ETA learned from past refreshes, check_interval_seconds caps the wait
+        min_check_interval_seconds=15,
+        history_size=10,  # Number of past refreshes used to estimate the duration
         *args,
         **kwargs,
     ):
@@ -28,69 +34,111 @@ class PowerBIDatasetRefreshOperator(BaseOperator):
         self.dataset_id = dataset_id
         self.timeout_seconds = timeout_seconds
         self.check_interval_seconds = check_interval_seconds
+        self.deferrable = deferrable
+        self.adaptive_polling = adaptive_polling
+        self.min_check_interval_seconds = min_check_interval_seconds
+        self.history_size = history_size
 
-    def execute(self, context):
-        authority_url = "https://login.microsoftonline.com/" + self.tenant_name
-        scope = ["https://analysis.windows.net/powerbi/api/.default"]
-        url = (
-            "https://api.powerbi.com/v1.0/myorg/groups/"
-            + self.workspace_id
-            + "/datasets/"
-            + self.dataset_id
-            + "/refreshes?$top=1"
+    def get_poll_policy(self, client):
+        if not self.adaptive_polling:
+            return AdaptivePollPolicy(
+                min_interval=self.check_interval_seconds, max_interval=self.check_interval_seconds, backoff_factor=1
+            )
+        try:
+            history_payload = client.get_refreshes(self.workspace_id, self.dataset_id, self.history_size)
+        except Exception as error:
+            self.log.warning("Could not read refresh history: %s", error)
+            history_payload = {}
+        policy = AdaptivePollPolicy.from_history(
+            history_payload, min_interval=self.min_check_interval_seconds, max_interval=self.check_interval_seconds
         )
+        self.log.info("Expected refresh duration: %s seconds", policy.expected_duration)
+        return policy
 
-        app = msal.ConfidentialClientApplication(
-            self.client_id, authority=authority_url, client_credential=self.client_secret
-        )
-        result = app.acquire_token_for_client(scopes=scope)
+    def execute(self, context):
+        token_provider = get_token_provider(self.client_id, self.client_secret, self.tenant_name)
+        metrics = OperatorMetrics("powerbi_dataset_refresh", dataset_id=self.dataset_id)
+        with metrics.timer("token"):
+            token_provider.get_token()
+        # The client takes a fresh token from the provider on every request and retries a 401 once.
+        client = PowerBIClient(token_provider, pool_size=1, metrics=metrics)
+        try:
+            self.run_refresh(client, metrics)
+        finally:
+            client.close()
 
-        if "access_token" in result:
-            access_token = result["access_token"]
-            header = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}",
-            }
+    def run_refresh(self, client, metrics):
+        # Learn the expected duration from past refreshes before starting a new one
+        poll_policy = self.get_poll_policy(client)
 
-            # Send a POST request to trigger the refresh
-            api_call_trigger = requests.post(url=url, headers=header)
+        # Send a POST request to trigger the refresh
+        with metrics.timer("trigger_refresh"):
+            api_call_trigger = client.trigger_refresh(self.workspace_id, self.dataset_id)
 
-            if api_call_trigger.status_code == 202:
-                self.log.info("Dataset refresh triggered successfully.")
-            else:
-                error_message = f"Failed to trigger dataset refresh. Status code: {api_call_trigger.status_code}"
-                self.log.error(error_message)
-                raise AirflowException(error_message)
+        if api_call_trigger.status_code == 202:
+            self.log.info("Dataset refresh triggered successfully.")
+        else:
+            error_message = f"Failed to trigger dataset refresh. Status code: {api_call_trigger.status_code}"
+            self.log.error(error_message)
+            raise AirflowException(error_message)
 
-            # Periodically check the status until timeout or completion
-            start_time = time.time()
-            while True:
-                time.sleep(self.check_interval_seconds)
-                api_call_status = requests.get(url=url, headers=header)
-                result_status = api_call_status.json()["value"]
+        if self.deferrable:
+            self.defer(
+                trigger=PowerBIRefreshTrigger(
+                    client_id=self.client_id,
+                    client_secret=self.client_secret,
+                    tenant_name=self.tenant_name,
+                    workspace_id=self.workspace_id,
+                    dataset_id=self.dataset_id,
+                    end_time=time.time() + self.timeout_seconds,
+                    check_interval_seconds=self.check_interval_seconds,
+                    min_check_interval_seconds=poll_policy.min_interval,
+                    expected_duration=poll_policy.expected_duration,
+                    started_at=time.time(),
+                ),
+                method_name="execute_complete",
+            )
 
-                df = pd.DataFrame(
-                    result_status, columns=["requestId", "id", "refreshType", "startTime", "endTime", "status"]
-                )
-                df.set_index("id", inplace=True)
+        # Periodically check the status until timeout or completion
+        start_time = time.time()
+        status = None
+        while True:
+            elapsed_time = time.time() - start_time
+            remaining = max(0, self.timeout_seconds - elapsed_time)
+            time.sleep(min(poll_policy.next_interval(elapsed_time), remaining + 1))
+            # Raises on an error response instead of reading it as "still running" until the timeout.
+            with metrics.timer("refreshes"):
+                status = client.get_refresh_status(self.workspace_id, self.dataset_id)
+            metrics.incr("polls")
 
-                if not df.empty:
-                    status = df.loc[df.index[0], "status"]
+            elapsed_time = time.time() - start_time
+            if elapsed_time > self.timeout_seconds:
+                self.log.warning("Timeout waiting for dataset refresh completion.")
+                break
 
-                elapsed_time = time.time() - start_time
-                if elapsed_time > self.timeout_seconds:
-                    self.log.warning("Timeout waiting for dataset refresh completion.")
-                    break
+            if status == "Completed":
+                self.log.info("Dataset refresh is completed.")
+                metrics.timing("refresh_duration", elapsed_time)
+                break
+            elif status == "Failed":
+                metrics.incr("refresh_failed")
+                error_message = "Dataset refresh failed. Please check the error message."
+                self.log.error(error_message)
+                raise AirflowException(error_message)
+            else:
+                self.log.info("Dataset refresh is still running. Status: %s", status)
 
-                if status == "Completed":
-                    self.log.info("Dataset refresh is completed.")
-                    break
-                elif status == "Failed":
-                    error_message = "Dataset refresh failed. Please check the error message."
-                    self.log.error(error_message)
-                    raise AirflowException(error_message)
-                else:
-                    self.log.info("Dataset refresh is still running. Status: %s", status)
+        if status not in ["Completed", "Failed"]:
+            self.log.warning("Dataset refresh status not conclusive after timeout.")
 
-            if status not in ["Completed", "Failed"]:
-                self.log.warning("Dataset refresh status not conclusive after timeout.")
+    def execute_complete(self, context, event):
+        status = event["status"]
+        if status == "success":
+            self.log.info("Dataset refresh is completed.")
+        elif status == "timeout":
+            self.log.warning("Timeout waiting for dataset refresh completion.")
+            self.log.warning("Dataset refresh status not conclusive after timeout.")
+        else:
+            error_message = event.get("message") or "Dataset refresh failed. Please check the error message."
+            self.log.error(error_message)
+            raise AirflowException(error_message)
@@ -0,0 +1,70 @@
+from datetime import datetime
+from statistics import median
+
+
+def parse_timestamp(value):
+    """Parse a Power BI ISO-8601 timestamp such as ``2024-01-31T09:25:43.153Z``."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def refresh_durations(payload):
+    """Durations in seconds of the completed refreshes in a ``GET .../refreshes`` response."""
+    durations = []
+    for refresh in payload.get("value") or []:
+        if refresh.get("status") != "Completed" or not refresh.get("startTime") or not refresh.get("endTime"):
+            continue
+        try:
+            duration = (parse_timestamp(refresh["endTime"]) - parse_timestamp(refresh["startTime"])).total_seconds()
+        except ValueError:
+            continue
+        if duration >= 0:
+            durations.append(duration)
+    return durations
+
+
+class AdaptivePollPolicy:
+    """
+    Decides how long to wait before the next refresh status poll.
+
+    The expected duration is the median of past refreshes. Until shortly
+    before that ETA the policy sleeps straight up to it, polls every
+    ``min_interval`` inside the window around it, and backs off exponentially
+    from ``min_interval`` to ``max_interval`` once the refresh is overdue.
+    Without any history it backs off exponentially from the start.
+
+    :param expected_duration: Expected refresh duration in seconds, or None when unknown.
+    :type expected_duration: float
+    :param min_interval: Shortest wait between polls, in seconds.
+    :type min_interval: float
+    :param max_interval: Longest wait between polls, in seconds.
+    :type max_interval: float
+    :param eta_tolerance: Relative width of the dense polling window around the ETA.
+    :type eta_tolerance: float
+    """
+
+    def __init__(self, expected_duration=None, min_interval=15, max_interval=300, backoff_factor=2.0, eta_tolerance=0.2):
+        self.expected_duration = expected_duration
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff_factor = backoff_factor
+        self.eta_tolerance = eta_tolerance
+        self._backoff = min_interval
+
+    @classmethod
+    def from_history(cls, payload, **kwargs):
+        """Build a policy from a ``GET .../refreshes?$top=N`` response fetched before the refresh was triggered."""
+        durations = refresh_durations(payload)
+        return cls(expected_duration=median(durations) if durations else None, **kwargs)
+
+    def next_interval(self, elapsed):
+        """Seconds to wait before the next poll, ``elapsed`` seconds after the refresh was triggered."""
+        if self.expected_duration is not None:
+            window_start = self.expected_duration * (1 - self.eta_tolerance)
+            window_end = self.expected_duration * (1 + self.eta_tolerance) + self.min_interval
+            if elapsed < window_start:
+                return min(self.max_interval, max(self.min_interval, window_start - elapsed))
+            if elapsed <= window_end:
+                return self.min_interval
+        interval = self._backoff
+        self._backoff = min(self.max_interval, self._backoff * self.backoff_factor)
+        return interval
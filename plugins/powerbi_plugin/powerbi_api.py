@@ -0,0 +1,75 @@
+import os
+import time
+
+# Overridable so the operators can be pointed at another host, e.g. the benchmarks/ stub server.
+AUTHORITY_HOST = os.environ.get("POWERBI_AUTHORITY_HOST", "https://login.microsoftonline.com/")
+POWERBI_API_URL = os.environ.get("POWERBI_API_URL", "https://api.powerbi.com/v1.0/myorg").rstrip("/")
+POWERBI_SCOPE = ["https://analysis.windows.net/powerbi/api/.default"]
+
+
+def refreshes_url(workspace_id, dataset_id, top=1):
+    return f"{POWERBI_API_URL}/groups/{workspace_id}/datasets/{dataset_id}/refreshes?$top={top}"
+
+
+def latest_refresh_status(payload):
+    """Status of the most recent refresh in a ``GET .../refreshes`` response, or None when there is none."""
+    refreshes = payload.get("value") or []
+    if not refreshes:
+        return None
+    return refreshes[0].get("status")
+
+
+class PowerBIClient:
+    """
+    Power BI REST client that shares one app-only token and one HTTP
+    connection pool across every call it makes.
+
+    The token is taken from ``token_provider`` on every request, so it is
+    renewed transparently shortly before it expires during long polls. A 401
+    (token revoked or expired early) is retried once with a new token.
+
+    :param token_provider: ``token_provider.PowerBITokenProvider`` for the application.
+    :param pool_size: Maximum number of pooled connections.
+    :param metrics: Optional ``OperatorMetrics`` every request latency is emitted to.
+    """
+
+    def __init__(self, token_provider, pool_size=10, metrics=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.token_provider = token_provider
+        self.metrics = metrics
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def headers(self):
+        return {"Content-Type": "application/json", "Authorization": f"Bearer {self.token_provider.get_token()}"}
+
+    def request(self, method, url, label):
+        for attempt in range(2):
+            headers = self.headers()
+            started = time.monotonic()
+            response = self.session.request(method, url, headers=headers)
+            if self.metrics is not None:
+                self.metrics.request(label, time.monotonic() - started)
+            if response.status_code != 401 or attempt:
+                return response
+            self.token_provider.invalidate()
+            if self.metrics is not None:
+                self.metrics.retry(label)
+
+    def trigger_refresh(self, workspace_id, dataset_id):
+        """POST a refresh request and return the raw response (202 when accepted)."""
+        return self.request("POST", refreshes_url(workspace_id, dataset_id), "trigger_refresh")
+
+    def get_refreshes(self, workspace_id, dataset_id, top=1):
+        response = self.request("GET", refreshes_url(workspace_id, dataset_id, top), "refreshes")
+        response.raise_for_status()
+        return response.json()
+
+    def get_refresh_status(self, workspace_id, dataset_id):
+        return latest_refresh_status(self.get_refreshes(workspace_id, dataset_id))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,156 @@
+import fcntl
+import os
+from contextlib import contextmanager
+import tempfile
+import threading
+import time
+
+from airflow.exceptions import AirflowException
+from airflow.models.crypto import get_fernet
+
+from powerbi_plugin.powerbi_api import AUTHORITY_HOST, POWERBI_SCOPE
+
+DEFAULT_TOKEN_CACHE_FILE = os.path.join("/tmp", "powerbi_token_cache.bin")
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+class PowerBITokenProvider:
+    """
+    App-only Power BI tokens backed by a shared, encrypted MSAL token cache.
+
+    The serialized ``msal.SerializableTokenCache`` is stored in ``cache_path``,
+    encrypted with the Airflow Fernet key, so every task on the worker
+    (LocalExecutor forks one process per task) reuses the same token instead of
+    going to Azure AD on every run. Within a process the token is kept in
+    memory until ``refresh_margin`` seconds before it expires; after that the
+    file cache is re-read and MSAL asks Azure AD for a new one only when the
+    cached token is close to expiry as well. Call ``get_token`` before every
+    request so long polls always carry a valid token.
+
+    Without a Fernet key the cache is kept in memory only.
+
+    :param refresh_margin: Seconds before expiry at which the token is renewed.
+    :type refresh_margin: int
+    :param cache_path: Encrypted token cache file shared by the cooperating processes.
+    :type cache_path: str
+    """
+
+    def __init__(self, client_id, client_secret, tenant_name, refresh_margin=300, cache_path=DEFAULT_TOKEN_CACHE_FILE):
+        self.client_id = client_id
+        self.tenant_name = tenant_name
+        self.refresh_margin = refresh_margin
+        self.cache_path = cache_path
+        # msal is only needed once a task asks for a token, not when DAGs or plugins are parsed.
+        import msal
+
+        self.cache = msal.SerializableTokenCache()
+        self.app = msal.ConfidentialClientApplication(
+            client_id,
+            authority=AUTHORITY_HOST + tenant_name,
+            client_credential=client_secret,
+            token_cache=self.cache,
+        )
+        self.fernet = get_fernet()
+        self._lock = threading.Lock()
+        self._access_token = None
+        self._expires_at = 0
+
+    @property
+    def persistent(self):
+        return getattr(self.fernet, "is_encrypted", False)
+
+    def _load_cache(self, cache_file):
+        from cryptography.fernet import InvalidToken
+
+        cache_file.seek(0)
+        encrypted = cache_file.read()
+        if not encrypted:
+            return
+        try:
+            self.cache.deserialize(self.fernet.decrypt(encrypted).decode("utf-8"))
+        except (InvalidToken, ValueError):
+            # Written with another Fernet key or truncated; it is rebuilt on the next save.
+            pass
+
+    def _save_cache(self):
+        directory = os.path.dirname(self.cache_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".powerbi_token_cache")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(self.fernet.encrypt(self.cache.serialize().encode("utf-8")))
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _acquire(self):
+        result = self.app.acquire_token_for_client(scopes=POWERBI_SCOPE)
+        if "access_token" not in result:
+            raise AirflowException(f"Failed to acquire Power BI token: {result.get('error_description')}")
+        return result
+
+    @contextmanager
+    def _shared_cache(self):
+        """Hold the cache file lock with the file loaded into ``self.cache``; saves it if it changed."""
+        fd = os.open(self.cache_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.cache_path):
+                    with open(self.cache_path, "rb") as cache_file:
+                        self._load_cache(cache_file)
+                yield
+                if self.cache.has_state_changed:
+                    self._save_cache()
+                    self.cache.has_state_changed = False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _acquire_shared(self):
+        with self._shared_cache():
+            return self._acquire()
+
+    def _remove_access_tokens(self):
+        import msal
+
+        access_token = msal.TokenCache.CredentialType.ACCESS_TOKEN
+        for entry in list(self.cache.find(access_token, query={"client_id": self.client_id})):
+            self.cache.remove_at(entry)
+
+    def get_token(self):
+        """Return a bearer token that stays valid for at least ``refresh_margin`` seconds."""
+        with self._lock:
+            if self._access_token and time.time() < self._expires_at - self.refresh_margin:
+                return self._access_token
+            result = self._acquire_shared() if self.persistent else self._acquire()
+            self._access_token = result["access_token"]
+            # Tokens served from the cache only report their remaining lifetime.
+            self._expires_at = time.time() + int(result.get("expires_in", 0))
+            return self._access_token
+
+    def invalidate(self):
+        """
+        Drop the token, e.g. after the API answered 401. It is removed from the
+        MSAL cache and the shared cache file as well, otherwise MSAL would hand
+        the rejected token back until it expires.
+        """
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0
+            if self.persistent:
+                with self._shared_cache():
+                    self._remove_access_tokens()
+            else:
+                self._remove_access_tokens()
+
+
+def get_token_provider(client_id, client_secret, tenant_name, **kwargs):
+    """Process-wide ``PowerBITokenProvider`` for an application and tenant."""
+    key = (client_id, tenant_name)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = _providers[key] = PowerBITokenProvider(client_id, client_secret, tenant_name, **kwargs)
+        return provider
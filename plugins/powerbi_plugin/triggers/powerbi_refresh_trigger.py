@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+from powerbi_plugin.polling import AdaptivePollPolicy
+from powerbi_plugin.powerbi_api import latest_refresh_status, refreshes_url
+from powerbi_plugin.token_provider import get_token_provider
+
+
+class PowerBIRefreshTrigger(BaseTrigger):
+    """
+    Polls the refreshes endpoint of a Power BI dataset from the triggerer until
+    the latest refresh completes, fails or ``end_time`` passes.
+
+    :param client_id: Azure AD application id.
+    :param client_secret: Azure AD application secret.
+    :param tenant_name: Azure AD tenant.
+    :param workspace_id: Power BI workspace (group) id.
+    :param dataset_id: Power BI dataset id.
+    :param end_time: Epoch seconds after which the trigger reports a timeout.
+    :param check_interval_seconds: Longest wait between status polls, in seconds.
+    :param min_check_interval_seconds: Shortest wait between status polls, in seconds.
+    :param expected_duration: Refresh duration learned from past refreshes, see ``AdaptivePollPolicy``.
+    :param started_at: Epoch seconds at which the refresh was triggered.
+    """
+
+    def __init__(
+        self,
+        client_id,
+        client_secret,
+        tenant_name,
+        workspace_id,
+        dataset_id,
+        end_time,
+        check_interval_seconds=300,
+        min_check_interval_seconds=None,
+        expected_duration=None,
+        started_at=None,
+    ):
+        super().__init__()
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.tenant_name = tenant_name
+        self.workspace_id = workspace_id
+        self.dataset_id = dataset_id
+        self.end_time = end_time
+        self.check_interval_seconds = check_interval_seconds
+        self.min_check_interval_seconds = min_check_interval_seconds
+        self.expected_duration = expected_duration
+        self.started_at = started_at
+
+    def serialize(self):
+        return (
+            "powerbi_plugin.triggers.powerbi_refresh_trigger.PowerBIRefreshTrigger",
+            {
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "tenant_name": self.tenant_name,
+                "workspace_id": self.workspace_id,
+                "dataset_id": self.dataset_id,
+                "end_time": self.end_time,
+                "check_interval_seconds": self.check_interval_seconds,
+                "min_check_interval_seconds": self.min_check_interval_seconds,
+                "expected_duration": self.expected_duration,
+                "started_at": self.started_at,
+            },
+        )
+
+    async def get_access_token(self):
+        # Usually served from memory; msal and the cache file are synchronous, so keep them off the event loop.
+        provider = get_token_provider(self.client_id, self.client_secret, self.tenant_name)
+        return await asyncio.get_running_loop().run_in_executor(None, provider.get_token)
+
+    async def invalidate_access_token(self):
+        provider = get_token_provider(self.client_id, self.client_secret, self.tenant_name)
+        await asyncio.get_running_loop().run_in_executor(None, provider.invalidate)
+
+    async def fetch_status(self, session, url):
+        """
+        Latest refresh status of the dataset. A 401 is retried once with a new
+        token; a second one raises, so a revoked secret or missing permission
+        ends the trigger instead of polling forever.
+        """
+        for attempt in range(2):
+            access_token = await self.get_access_token()
+            headers = {"Content-Type": "application/json", "Authorization": f"Bearer {access_token}"}
+            async with session.get(url, headers=headers) as response:
+                if response.status == 401 and attempt == 0:
+                    # The token was revoked or expired early; drop it and retry with a new one.
+                    await self.invalidate_access_token()
+                    continue
+                response.raise_for_status()
+                return latest_refresh_status(await response.json())
+
+    async def run(self):
+        import aiohttp
+
+        url = refreshes_url(self.workspace_id, self.dataset_id)
+        started_at = self.started_at or time.time()
+        min_interval = self.min_check_interval_seconds
+        poll_policy = AdaptivePollPolicy(
+            expected_duration=self.expected_duration,
+            min_interval=self.check_interval_seconds if min_interval is None else min_interval,
+            max_interval=self.check_interval_seconds,
+        )
+        try:
+            async with aiohttp.ClientSession() as session:
+                while True:
+                    interval = poll_policy.next_interval(time.time() - started_at)
+                    await asyncio.sleep(min(interval, max(0, self.end_time - time.time())))
+                    status = await self.fetch_status(session, url)
+
+                    if status == "Completed":
+                        yield TriggerEvent({"status": "success", "refresh_status": status})
+                        return
+                    if status == "Failed":
+                        yield TriggerEvent({"status": "error", "refresh_status": status,
+                                            "message": "Dataset refresh failed. Please check the error message."})
+                        return
+                    if time.time() >= self.end_time:
+                        yield TriggerEvent({"status": "timeout", "refresh_status": status})
+                        return
+                    self.log.info("Dataset refresh is still running. Status: %s", status)
+        except Exception as error:
+            yield TriggerEvent({"status": "error", "refresh_status": None, "message": str(error)})
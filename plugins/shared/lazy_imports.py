@@ -0,0 +1,31 @@
+import importlib
+import sys
+
+
+def lazy_attributes(module_name, attributes):
+    """
+    ``__getattr__`` for a plugin package that imports its operators on first access.
+
+    ``attributes`` maps an attribute name to the module defining it, or to the
+    module itself when the name is its last component. ``from docebo_plugin
+    import DoceboDataLoadOperator`` keeps working, but loading the plugin no
+    longer imports every operator and its dependencies. This package
+    import is the only way DAGs reach the operators: Airflow 2 ignores the
+    ``operators`` list of an ``AirflowPlugin``, so the plugins leave it empty.
+
+    :param module_name: ``__name__`` of the package the ``__getattr__`` is installed in.
+    :type module_name: str
+    :param attributes: Attribute name -> dotted module path.
+    :type attributes: dict
+    """
+
+    def __getattr__(name):
+        if name not in attributes:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        value = importlib.import_module(attributes[name])
+        if attributes[name].rsplit(".", 1)[-1] != name:
+            value = getattr(value, name)
+        setattr(sys.modules[module_name], name, value)
+        return value
+
+    return __getattr__
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+_MISSING = object()
+
+
+class CachedVariables:
+    """
+    Lazily resolves a fixed set of Airflow Variables and caches them.
+
+    Nothing is read at construction time. The first ``get`` resolves every key
+    at once: ``AIRFLOW_VAR_<KEY>`` environment variables first, then a single
+    metadata-DB query for the rest, the same precedence ``Variable.get`` uses.
+    When a custom secrets backend is configured the keys go through
+    ``Variable.get`` instead so the backend is still consulted. Values are
+    reused for ``ttl`` seconds before the next access reloads them.
+
+    :param keys: Variable keys to resolve together.
+    :param ttl: Seconds a loaded batch stays valid.
+    :type ttl: int
+    """
+
+    def __init__(self, keys, ttl=300):
+        self.keys = tuple(sorted(set(keys)))
+        self.ttl = ttl
+        self._values = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        if key not in self.keys:
+            from airflow.models import Variable
+
+            if default is _MISSING:
+                return Variable.get(key)
+            return Variable.get(key, default_var=default)
+        values = self.values()
+        if key in values:
+            return values[key]
+        if default is not _MISSING:
+            return default
+        raise KeyError(f"Variable {key} does not exist")
+
+    def values(self):
+        with self._lock:
+            if self._values is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._values = self.load()
+                self._loaded_at = time.monotonic()
+            return self._values
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+    def load(self):
+        from airflow.configuration import conf
+        from airflow.models import Variable
+
+        values = {}
+        if conf.get("secrets", "backend", fallback=None):
+            for key in self.keys:
+                value = Variable.get(key, default_var=None)
+                if value is not None:
+                    values[key] = value
+            return values
+
+        missing = []
+        for key in self.keys:
+            value = os.environ.get(f"AIRFLOW_VAR_{key.upper()}")
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+
+        if missing:
+            from airflow.utils.session import create_session
+
+            with create_session() as session:
+                for variable in session.query(Variable).filter(Variable.key.in_(missing)):
+                    values[variable.key] = variable.val
+        return values
@@ -1,12 +1,16 @@
 from airflow.plugins_manager import AirflowPlugin
-from sns_plugin.operators.success_handler_operator import SuccessHandlerOperator
-from sns_plugin.operators.failure_handler_operator import FailureHandlerOperator
+from shared.lazy_imports import lazy_attributes
+
+__getattr__ = lazy_attributes(__name__, {
+    "SuccessHandlerOperator": "sns_plugin.operators.success_handler_operator",
+    "FailureHandlerOperator": "sns_plugin.operators.failure_handler_operator",
+})
 
 
 class SnsPlugin(AirflowPlugin):
     name = 'sns_plugin'
     hooks = []
-    operators = [FailureHandlerOperator, SuccessHandlerOperator]
+    operators = []
     executors = []
     macros = []
     admin_views = []
@@ -0,0 +1,246 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from shared.instrumentation import OperatorMetrics
+from shared.variables import CachedVariables
+
+DEFAULT_DIGEST_FILE = os.path.join("/tmp", "sns_digest_buffer.json")
+
+# SNS rejects subjects longer than 100 characters.
+MAX_SUBJECT_LENGTH = 100
+
+sns_variables = CachedVariables(("Environment", "Airflow_UI"), ttl=300)
+
+_hooks = {}
+_hooks_lock = threading.Lock()
+
+
+def get_sns_hook(aws_conn_id="aws_default"):
+    """Process-wide ``SnsHook`` so the boto3 client and its connections are reused between publishes."""
+    with _hooks_lock:
+        hook = _hooks.get(aws_conn_id)
+        if hook is None:
+            from airflow.providers.amazon.aws.hooks.sns import SnsHook
+
+            hook = _hooks[aws_conn_id] = SnsHook(aws_conn_id=aws_conn_id)
+        return hook
+
+
+def publish(target_arn, message, subject, aws_conn_id="aws_default", metrics=None):
+    metrics = metrics or OperatorMetrics("sns_publish")
+    with metrics.timer("publish"):
+        get_sns_hook(aws_conn_id).publish_to_target(
+            target_arn=target_arn, message=message, subject=subject[:MAX_SUBJECT_LENGTH]
+        )
+    metrics.incr("published")
+
+
+def format_failure(dag_id, task_id, error_info, occurred_at=None):
+    """Subject and markdown body of the notification for one task failure."""
+    ENV = sns_variables.get("Environment")
+    link = sns_variables.get("Airflow_UI")
+
+    timestamp = datetime.utcfromtimestamp(occurred_at or time.time()).strftime('%Y-%m-%d %H:%M:%S')
+
+    message_subject = f'❌Failure Alert! for DAG "{dag_id}"'
+
+    message = (
+        f"**{message_subject}**\n\n"
+        f"**Environment:** {ENV}\n\n"
+        f"**Error message:** {error_info}\n\n"
+        f"**Execution Time:** {timestamp} UTC\n\n"
+        f"**DAG Details:**\n\n"
+        f"  - DAG ID: **{dag_id}**\n\n"
+        f"  - Task ID: **{task_id}**\n\n"
+        f"**Error Logs:** [Airflow UI]({link})"
+    )
+    return message_subject, message
+
+
+def format_success(dag_id, occurred_at=None):
+    """Subject and markdown body of the notification for one successful DAG run."""
+    ENV = sns_variables.get("Environment")
+    link = sns_variables.get("Airflow_UI")
+
+    timestamp = datetime.utcfromtimestamp(occurred_at or time.time()).strftime('%Y-%m-%d %H:%M:%S')
+
+    message_subject = f'✔️Success Alert! for DAG "{dag_id}"'
+
+    message = (
+        f"**{message_subject}**\n\n"
+        f"**Environment:** {ENV}\n\n"
+        f"**Execution Time:** {timestamp} UTC\n\n"
+        f"**DAG Details:**\n\n"
+        f"  - DAG ID: **{dag_id}**\n\n"
+        f"**More Info:** [Airflow UI]({link})"
+    )
+    return message_subject, message
+
+
+_EVENT_FORMATTERS = {"failure": format_failure, "success": format_success}
+
+
+def format_event(event):
+    """Subject and body of a raw event queued with ``notification_queue.dispatch_event``."""
+    fields = dict(event)
+    return _EVENT_FORMATTERS[fields.pop("kind")](**fields)
+
+
+def format_digest(events):
+    """Subject and markdown body of one digest message for the buffered ``events``."""
+    failures = [event for event in events if event["kind"] == "failure"]
+    successes = [event for event in events if event["kind"] != "failure"]
+    subject = f"Airflow digest: {len(failures)} failure(s), {len(successes)} success(es)"
+    if failures:
+        subject = "❌" + subject
+
+    lines = [f"**{subject}**", f"**Environment:** {sns_variables.get('Environment')}"]
+    for title, group in (("Failures", failures), ("Successes", successes)):
+        if not group:
+            continue
+        lines.append(f"**{title}:**")
+        for event in sorted(group, key=lambda event: (event["dag_id"], event["task_id"])):
+            seen = datetime.utcfromtimestamp(event["last_seen"]).strftime("%Y-%m-%d %H:%M:%S")
+            repeats = f" (x{event['count']})" if event["count"] > 1 else ""
+            line = f"  - DAG ID: **{event['dag_id']}**, Task ID: **{event['task_id']}**{repeats}, last at {seen} UTC"
+            if event.get("detail"):
+                line += f"\n    {event['detail']}"
+            lines.append(line)
+    lines.append(f"**More Info:** [Airflow UI]({sns_variables.get('Airflow_UI')})")
+    return subject, "\n\n".join(lines)
+
+
+class NotificationAggregator:
+    """
+    Buffers SNS notifications and publishes them as one digest per window.
+
+    Events are appended to a JSON buffer file shared by every task process on
+    the worker (guarded by ``flock``), deduplicated per kind, ``dag_id`` and
+    ``task_id``: a repeat only bumps its count and keeps the latest detail. The
+    call that finds the window for ``target_arn`` has closed publishes the
+    digest through the process-wide SNS client, so most callbacks return after
+    a local file write. ``flush`` publishes whatever is still buffered, and the
+    background ``NotificationSender`` flushes windows that close without a
+    further event (see ``flush_due_digests``).
+
+    :param target_arn: The ARN of the SNS topic the digest is sent to.
+    :type target_arn: str
+    :param window_seconds: Seconds events are collected before a digest is sent.
+    :type window_seconds: int
+    :param path: Buffer file shared by the cooperating processes.
+    :type path: str
+    """
+
+    def __init__(self, target_arn, window_seconds=300, aws_conn_id="aws_default", path=DEFAULT_DIGEST_FILE):
+        self.target_arn = target_arn
+        self.window_seconds = window_seconds
+        self.aws_conn_id = aws_conn_id
+        self.path = path
+
+    @contextmanager
+    def _buffer(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+") as buffer_file:
+            fcntl.flock(buffer_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.loads(buffer_file.read() or "{}")
+                except ValueError:
+                    state = {}
+                yield state.setdefault(self.target_arn, {"window_started": None, "events": {}})
+                buffer_file.seek(0)
+                buffer_file.truncate()
+                json.dump(state, buffer_file)
+                buffer_file.flush()
+            finally:
+                fcntl.flock(buffer_file, fcntl.LOCK_UN)
+
+    def _take(self, buffer, now, force):
+        if not buffer["events"]:
+            return []
+        if not force and now - buffer["window_started"] < self.window_seconds:
+            return []
+        events = list(buffer["events"].values())
+        buffer["events"] = {}
+        buffer["window_started"] = None
+        return events
+
+    def _merge(self, buffer, event, now):
+        key = f"{event['kind']}:{event['dag_id']}:{event['task_id']}"
+        existing = buffer["events"].get(key)
+        if existing is None:
+            buffer["events"][key] = event
+        else:
+            existing["count"] += event["count"]
+            existing["last_seen"] = max(existing["last_seen"], event["last_seen"])
+            existing["detail"] = event.get("detail") or existing.get("detail")
+        if buffer["window_started"] is None:
+            buffer["window_started"] = now
+
+    def add(self, kind, dag_id, task_id, detail=None):
+        """Buffer one event and publish the digest if the window has closed."""
+        now = time.time()
+        event = {"kind": kind, "dag_id": dag_id, "task_id": task_id, "detail": detail,
+                 "count": 1, "first_seen": now, "last_seen": now}
+        with self._buffer() as buffer:
+            buffer["window_seconds"] = self.window_seconds
+            buffer["aws_conn_id"] = self.aws_conn_id
+            self._merge(buffer, event, now)
+            events = self._take(buffer, now, force=False)
+        if events:
+            self._publish(events)
+        else:
+            from sns_plugin.notification_queue import ensure_sender
+
+            # Make sure the window is flushed even if no further event arrives.
+            ensure_sender()
+        return len(events)
+
+    def flush(self, force=True):
+        """Publish the buffered events; with ``force=False`` only once the window has closed."""
+        with self._buffer() as buffer:
+            events = self._take(buffer, time.time(), force)
+        self._publish(events)
+        return len(events)
+
+    def _publish(self, events):
+        if not events:
+            return
+        try:
+            subject, message = format_digest(events)
+            publish(self.target_arn, message, subject, self.aws_conn_id, OperatorMetrics("sns_digest"))
+        except Exception:
+            # Keep the events for the next digest rather than dropping them.
+            now = time.time()
+            with self._buffer() as buffer:
+                for event in events:
+                    self._merge(buffer, event, now)
+            raise
+
+
+def flush_due_digests(path=DEFAULT_DIGEST_FILE):
+    """Publish the digest of every target whose window has closed. Returns the number of events still buffered."""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as buffer_file:
+        fcntl.flock(buffer_file, fcntl.LOCK_SH)
+        try:
+            state = json.loads(buffer_file.read() or "{}")
+        except ValueError:
+            state = {}
+        finally:
+            fcntl.flock(buffer_file, fcntl.LOCK_UN)
+    buffered = 0
+    for target_arn, buffer in state.items():
+        if not buffer.get("events"):
+            continue
+        aggregator = NotificationAggregator(
+            target_arn, buffer.get("window_seconds", 300), buffer.get("aws_conn_id", "aws_default"), path
+        )
+        buffered += len(buffer["events"]) - aggregator.flush(force=False)
+    return buffered
@@ -0,0 +1,315 @@
+import fcntl
+import json
+import logging
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from itertools import groupby
+
+from shared.instrumentation import OperatorMetrics
+
+DEFAULT_QUEUE_FILE = os.path.join("/tmp", "sns_notification_queue.db")
+
+# SNS PublishBatch accepts at most ten entries per call.
+SNS_BATCH_SIZE = 10
+
+metrics = OperatorMetrics("sns_notification_queue")
+
+log = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """
+    Durable local queue of SNS notifications backed by sqlite.
+
+    Enqueueing is a single insert into a WAL-mode database on local disk, so
+    task callbacks return without waiting for SNS or the metadata DB. Failure
+    and success records hold only the raw event fields; their message is
+    formatted by the sender, which is where Airflow Variables are read. Records
+    survive task and container process restarts until a ``NotificationSender``
+    delivers them. Once ``max_size`` records are waiting, new ones are dropped
+    and counted instead of growing the file without bound.
+
+    :param path: sqlite database shared by the producing tasks and the sender.
+    :type path: str
+    :param max_size: Maximum number of undelivered records.
+    :type max_size: int
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, max_size=10000):
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS notifications ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " target_arn TEXT NOT NULL,"
+                " aws_conn_id TEXT NOT NULL,"
+                " subject TEXT,"
+                " message TEXT NOT NULL,"
+                " event TEXT,"
+                " enqueued_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS notifications_due ON notifications (next_attempt_at, id)")
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, target_arn, message, subject=None, aws_conn_id="aws_default", event=None):
+        """
+        Store one notification. Returns False when the queue is full and the record was dropped.
+
+        :param event: Raw fields of a failure or success (``kind``, ``dag_id``, ...), formatted
+            into the message when it is sent; ``message`` and ``subject`` are ignored then.
+        :type event: dict
+        """
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            (depth,) = connection.execute("SELECT COUNT(*) FROM notifications").fetchone()
+            if depth >= self.max_size:
+                connection.execute("ROLLBACK")
+                metrics.incr("dropped")
+                log.warning("Notification queue %s is full, dropping notification for %s", self.path, target_arn)
+                return False
+            connection.execute(
+                "INSERT INTO notifications"
+                " (target_arn, aws_conn_id, subject, message, event, enqueued_at, next_attempt_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (target_arn, aws_conn_id, subject, message or "", event and json.dumps(event), now, now),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        metrics.incr("enqueued")
+        return True
+
+    def due(self, limit):
+        """Up to ``limit`` records whose next attempt is due, oldest first."""
+        rows = self._connection().execute(
+            "SELECT id, target_arn, aws_conn_id, subject, message, event, enqueued_at, attempts FROM notifications"
+            " WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit),
+        )
+        keys = ("id", "target_arn", "aws_conn_id", "subject", "message", "event", "enqueued_at", "attempts")
+        records = [dict(zip(keys, row)) for row in rows]
+        for record in records:
+            record["event"] = json.loads(record["event"]) if record["event"] else None
+        return records
+
+    def ack(self, ids):
+        self._connection().executemany("DELETE FROM notifications WHERE id = ?", [(id_,) for id_ in ids])
+
+    def reschedule(self, id_, attempts, delay):
+        self._connection().execute(
+            "UPDATE notifications SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+            (attempts, time.time() + delay, id_),
+        )
+
+    def depth(self):
+        return self._connection().execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class NotificationSender:
+    """
+    Drains a ``NotificationQueue`` in batches.
+
+    Due records are grouped per topic and connection and published with SNS
+    ``PublishBatch``, ten at a time, through the process-wide SNS client.
+    Raw failure and success records are formatted with ``format_event`` just before. A
+    record that fails is retried with exponential backoff and jitter; after
+    ``max_attempts`` it is dropped. Due notification digests (see
+    ``NotificationAggregator``) are flushed on the same loop.
+
+    Emits ``operator.sns_notification_queue.*`` StatsD metrics: ``sent``,
+    ``retried`` and ``dropped`` counters, a ``depth`` gauge, a ``lag`` timer
+    (enqueue to delivery) and a ``batch_publish`` timer.
+
+    :param batch_size: Maximum number of records taken from the queue per cycle.
+    :type batch_size: int
+    :param max_attempts: Attempts before a record is dropped.
+    :type max_attempts: int
+    """
+
+    def __init__(self, queue, batch_size=100, max_attempts=5, backoff_base=2.0, backoff_max=300.0, poll_interval=1.0):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+
+    def _retry(self, record, error):
+        attempts = record["attempts"] + 1
+        if attempts >= self.max_attempts:
+            log.error("Dropping notification %s for %s after %s attempts: %s",
+                      record["id"], record["target_arn"], attempts, error)
+            self.queue.ack([record["id"]])
+            metrics.incr("dropped")
+            return
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempts)))
+        self.queue.reschedule(record["id"], attempts, delay)
+        metrics.incr("retried")
+
+    def _publish_batch(self, target_arn, aws_conn_id, records):
+        from sns_plugin.notification_aggregator import MAX_SUBJECT_LENGTH, format_event, get_sns_hook
+
+        entries = []
+        for record in records:
+            subject, message = record["subject"], record["message"]
+            if record["event"]:
+                subject, message = format_event(record["event"])
+            entry = {"Id": str(record["id"]), "Message": message}
+            if subject:
+                entry["Subject"] = subject[:MAX_SUBJECT_LENGTH]
+            entries.append(entry)
+        client = get_sns_hook(aws_conn_id).get_conn()
+        with metrics.timer("batch_publish"):
+            response = client.publish_batch(TopicArn=target_arn, PublishBatchRequestEntries=entries)
+        return {int(failure["Id"]): failure.get("Message") for failure in response.get("Failed", [])}
+
+    def drain_once(self):
+        """Send every due record once. Returns the number of records delivered."""
+        records = self.queue.due(self.batch_size)
+        delivered = 0
+        records.sort(key=lambda record: (record["target_arn"], record["aws_conn_id"], record["id"]))
+        for (target_arn, aws_conn_id), group in groupby(records, key=lambda record: (record["target_arn"], record["aws_conn_id"])):
+            group = list(group)
+            for start in range(0, len(group), SNS_BATCH_SIZE):
+                chunk = group[start:start + SNS_BATCH_SIZE]
+                try:
+                    failed = self._publish_batch(target_arn, aws_conn_id, chunk)
+                except Exception as error:
+                    failed = {record["id"]: repr(error) for record in chunk}
+                sent = [record for record in chunk if record["id"] not in failed]
+                self.queue.ack([record["id"] for record in sent])
+                now = time.time()
+                for record in sent:
+                    metrics.timing("lag", now - record["enqueued_at"])
+                for record in chunk:
+                    if record["id"] in failed:
+                        self._retry(record, failed[record["id"]])
+                if sent:
+                    metrics.incr("sent", len(sent))
+                delivered += len(sent)
+        metrics.gauge("depth", self.queue.depth())
+        return delivered
+
+    def flush_digests(self):
+        """Publish due digests. Returns the number of digest events still waiting for their window."""
+        from sns_plugin.notification_aggregator import flush_due_digests
+
+        try:
+            return flush_due_digests()
+        except Exception:
+            log.exception("Failed to flush notification digests")
+            return 1
+
+    def run(self, stop_event=None, idle_timeout=None):
+        """Drain until ``stop_event`` is set, or until the queue has been empty for ``idle_timeout`` seconds."""
+        idle_since = time.monotonic()
+        while stop_event is None or not stop_event.is_set():
+            buffered_digests = self.flush_digests()
+            if self.drain_once() or self.queue.depth() or buffered_digests:
+                idle_since = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                return
+            time.sleep(self.poll_interval)
+
+
+def _sender_lock_path(path):
+    return path + ".sender.lock"
+
+
+def ensure_sender(path=DEFAULT_QUEUE_FILE):
+    """
+    Start a detached sender process for the queue at ``path`` unless one is already running.
+
+    The sender holds an exclusive ``flock`` on a lock file for as long as it
+    runs, so a failed non-blocking lock here means one is alive. A spawned
+    sender that loses the race to another one exits straight away.
+    """
+    fd = os.open(_sender_lock_path(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+    plugins_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [plugins_folder, env.get("PYTHONPATH")]))
+    subprocess.Popen(
+        [sys.executable, "-m", "sns_plugin.notification_queue", path],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return True
+
+
+def dispatch(target_arn, message, subject=None, aws_conn_id="aws_default", path=DEFAULT_QUEUE_FILE):
+    """Queue a notification for asynchronous delivery and make sure a sender is draining the queue."""
+    queued = NotificationQueue(path).enqueue(target_arn, message, subject, aws_conn_id)
+    ensure_sender(path)
+    return queued
+
+
+def dispatch_event(target_arn, kind, aws_conn_id="aws_default", path=DEFAULT_QUEUE_FILE, **fields):
+    """
+    Queue a ``kind`` ("failure" or "success") notification. Only the raw fields
+    are stored, so the callback does no metadata DB read; the sender formats
+    the message with ``notification_aggregator.format_event``.
+    """
+    event = dict(fields, kind=kind, occurred_at=time.time())
+    queued = NotificationQueue(path).enqueue(target_arn, None, aws_conn_id=aws_conn_id, event=event)
+    ensure_sender(path)
+    return queued
+
+
+def dispatch_failure(target_arn, dag_id, task_id, error_info, aws_conn_id="aws_default", path=DEFAULT_QUEUE_FILE):
+    return dispatch_event(target_arn, "failure", aws_conn_id, path, dag_id=dag_id, task_id=task_id, error_info=error_info)
+
+
+def dispatch_success(target_arn, dag_id, aws_conn_id="aws_default", path=DEFAULT_QUEUE_FILE):
+    return dispatch_event(target_arn, "success", aws_conn_id, path, dag_id=dag_id)
+
+
+def main(path=DEFAULT_QUEUE_FILE, idle_timeout=300):
+    fd = os.open(_sender_lock_path(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return
+    queue = NotificationQueue(path)
+    try:
+        NotificationSender(queue).run(idle_timeout=idle_timeout)
+    finally:
+        queue.close()
+        os.close(fd)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -1,7 +1,8 @@
-from airflow.models import BaseOperator, Variable
-from datetime import datetime
-from airflow.providers.amazon.aws.operators.sns import SnsPublishOperator
+from airflow.models import BaseOperator
 from airflow.utils.decorators import apply_defaults
+from sns_plugin.notification_aggregator import NotificationAggregator, format_failure, publish
+from sns_plugin.notification_queue import dispatch_failure
+from shared.instrumentation import OperatorMetrics
 
 class FailureHandlerOperator(BaseOperator):
     """
@@ -9,58 +10,69 @@ class FailureHandlerOperator(BaseOperator):
 
     :param target_arn: The ARN of the SNS topic to send the notification to.
     :type target_arn: str
+    :param digest_window_seconds: Buffer failures and send one digest per window instead of one message each.
+    :type digest_window_seconds: int
+    :param aws_conn_id: The AWS connection used to publish.
+    :type aws_conn_id: str
+    :param async_dispatch: Queue the notification locally and let the background sender publish it.
+    :type async_dispatch: bool
     """
 
     @apply_defaults
     def __init__(
         self,
         target_arn,
+        digest_window_seconds=None,
+        aws_conn_id='aws_default',
+        async_dispatch=False,
         *args,
         **kwargs
     ):
         super().__init__(*args, **kwargs)
         self.target_arn = target_arn
+        self.digest_window_seconds = digest_window_seconds
+        self.aws_conn_id = aws_conn_id
+        self.async_dispatch = async_dispatch
 
     def execute(self, context):
         task_instance = context['task_instance']
         dag_id = task_instance.dag_id
         task_id = task_instance.task_id
-        ENV = Variable.get("Environment")
-        link = Variable.get("Airflow_UI")
+        error_info = task_instance.xcom_pull(key='error_info')
 
+        metrics = OperatorMetrics('sns_failure_handler', dag_id=dag_id)
 
-        failure_emoji = "❌"
+        if self.digest_window_seconds:
+            aggregator = NotificationAggregator(self.target_arn, self.digest_window_seconds, self.aws_conn_id)
+            aggregator.add('failure', dag_id, task_id, error_info)
+            metrics.incr('digest_buffered')
+            return
 
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        message_subject = f'❌Failure Alert! for DAG "{dag_id}"'
-
-        message = (
-            f"**{message_subject}**\n\n"
-            f"**Environment:** {ENV}\n\n"
-            f"**Error message:** {context['task_instance'].xcom_pull(key='error_info')}\n\n"
-            f"**Execution Time:** {timestamp} UTC\n\n"
-            f"**DAG Details:**\n\n"
-            f"  - DAG ID: **{dag_id}**\n\n"
-            f"  - Task ID: **{task_id}**\n\n"
-            f"**Error Logs:** [Airflow UI]({link})"
-
-        )
-
-        sns_operator = SnsPublishOperator(
-            task_id='send_sns_notification',
-            target_arn=self.target_arn,
-            message=message,
-            subject=message_subject,
-            aws_conn_id='aws_default',
-            dag=self.dag,
-        )
+        if self.async_dispatch:
+            dispatch_failure(self.target_arn, dag_id, task_id, error_info, self.aws_conn_id)
+            metrics.incr('queued')
+        else:
+            message_subject, message = FailureHandlerOperator.format_message(dag_id, task_id, error_info)
+            publish(self.target_arn, message, message_subject, self.aws_conn_id, metrics)
 
-        sns_operator.execute(context)
+    @staticmethod
+    def format_message(dag_id, task_id, error_info):
+        return format_failure(dag_id, task_id, error_info)
 
     def store_error(context):
         if 'exception' in context:
             context['task_instance'].xcom_push(key='error_info', value=str({str(context['task'].task_id) : str(context['exception'])}))
-            print({str(context['task'].task_id) : str(context['exception'])})
-        else:
-            print("No exception found in context")
+
+    @staticmethod
+    def queue_failure(target_arn, aws_conn_id='aws_default'):
+        """
+        Build an ``on_failure_callback`` that queues the failure notification
+        for the background sender instead of going through XCom and a handler task.
+        Only the raw failure is queued; the sender formats the message.
+        """
+        def callback(context):
+            task_instance = context['task_instance']
+            error_info = str({str(context['task'].task_id): str(context.get('exception'))})
+            dispatch_failure(target_arn, task_instance.dag_id, task_instance.task_id, error_info, aws_conn_id)
+
+        return callback
@@ -1,8 +1,8 @@
 from airflow.models import BaseOperator
 from airflow.utils.decorators import apply_defaults
-from airflow.models import Variable
-from datetime import datetime
-from airflow.providers.amazon.aws.operators.sns import SnsPublishOperator
+from sns_plugin.notification_aggregator import NotificationAggregator, format_success, publish
+from sns_plugin.notification_queue import dispatch_success
+from shared.instrumentation import OperatorMetrics
 
 class SuccessHandlerOperator(BaseOperator):
     """
@@ -10,47 +10,46 @@ class SuccessHandlerOperator(BaseOperator):
 
     :param target_arn: The ARN of the SNS topic to send the notification to.
     :type target_arn: str
+    :param digest_window_seconds: Buffer notifications and send one digest per window instead of one message each.
+    :type digest_window_seconds: int
+    :param aws_conn_id: The AWS connection used to publish.
+    :type aws_conn_id: str
+    :param async_dispatch: Queue the notification locally and let the background sender publish it.
+    :type async_dispatch: bool
     """
 
     @apply_defaults
     def __init__(
         self,
         target_arn,
+        digest_window_seconds=None,
+        aws_conn_id='aws_default',
+        async_dispatch=False,
         *args,
         **kwargs
     ):
         super().__init__(*args, **kwargs)
         self.target_arn = target_arn
+        self.digest_window_seconds = digest_window_seconds
+        self.aws_conn_id = aws_conn_id
+        self.async_dispatch = async_dispatch
 
     def execute(self, context):
         task_instance = context['task_instance']
         dag_id = task_instance.dag_id
-        ENV = Variable.get("Environment")
-        link= Variable.get("Airflow_UI")
 
-        success_emoji="✔️"
-
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        message_subject = f'✔️Success Alert! for DAG "{dag_id}"'
-        
-        message = (
-            f"**{message_subject}**\n\n"
-            f"**Environment:** {ENV}\n\n"
-            f"**Execution Time:** {timestamp} UTC\n\n"
-            f"**DAG Details:**\n\n"
-            f"  - DAG ID: **{dag_id}**\n\n"
-            f"**More Info:** [Airflow UI]({link})"
-
-        )
-
-        sns_operator = SnsPublishOperator(
-            task_id='send_sns_notification',
-            target_arn=self.target_arn,
-            message=message,
-            subject=message_subject,
-            aws_conn_id='aws_default',
-            dag=self.dag,
-        )
-
-        sns_operator.execute(context)
+        metrics = OperatorMetrics('sns_success_handler', dag_id=dag_id)
+
+        if self.digest_window_seconds:
+            aggregator = NotificationAggregator(self.target_arn, self.digest_window_seconds, self.aws_conn_id)
+            aggregator.add('success', dag_id, task_instance.task_id)
+            metrics.incr('digest_buffered')
+            return
+
+        if self.async_dispatch:
+            # Queued raw; the background sender formats the message, so no Variables are read here.
+            dispatch_success(self.target_arn, dag_id, self.aws_conn_id)
+            metrics.incr('queued')
+        else:
+            message_subject, message = format_success(dag_id)
+            publish(self.target_arn, message, message_subject, self.aws_conn_id, metrics)
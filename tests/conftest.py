@@ -0,0 +1,7 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The plugins folder and the container scripts are put on sys.path by Airflow and the image, not installed.
+sys.path[:0] = [os.path.join(REPO_ROOT, "plugins"), os.path.join(REPO_ROOT, "docker", "script")]
@@ -0,0 +1,84 @@
+import pytest
+
+# sns_plugin/__init__.py registers an AirflowPlugin.
+pytest.importorskip("airflow")
+
+from sns_plugin import notification_aggregator, notification_queue  # noqa: E402
+from sns_plugin.notification_queue import NotificationQueue, NotificationSender  # noqa: E402
+
+TOPIC = "arn:aws:sns:us-east-1:123456789012:alerts"
+
+
+class RecordingSnsClient:
+    def __init__(self):
+        self.batches = []
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self.batches.append((TopicArn, PublishBatchRequestEntries))
+        return {"Successful": [{"Id": entry["Id"]} for entry in PublishBatchRequestEntries], "Failed": []}
+
+
+class RecordingSnsHook:
+    def __init__(self, client):
+        self.client = client
+
+    def get_conn(self):
+        return self.client
+
+
+@pytest.fixture
+def queue_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(notification_queue, "ensure_sender", lambda path: False)
+    return str(tmp_path / "queue.db")
+
+
+def test_failure_is_queued_without_reading_variables(queue_path, monkeypatch):
+    def variables_read(key):
+        raise AssertionError(f"Variable {key} read in the failure callback")
+
+    monkeypatch.setattr(notification_aggregator.sns_variables, "get", variables_read)
+
+    assert notification_queue.dispatch_failure(TOPIC, "etl", "load", "boom", path=queue_path)
+
+    [record] = NotificationQueue(queue_path).due(10)
+    assert record["message"] == ""
+    assert record["event"]["kind"] == "failure"
+    assert record["event"]["dag_id"] == "etl"
+    assert record["event"]["task_id"] == "load"
+    assert record["event"]["error_info"] == "boom"
+
+
+def test_success_is_queued_without_reading_variables(queue_path, monkeypatch):
+    def variables_read(key):
+        raise AssertionError(f"Variable {key} read in the success path")
+
+    monkeypatch.setattr(notification_aggregator.sns_variables, "get", variables_read)
+
+    assert notification_queue.dispatch_success(TOPIC, "etl", path=queue_path)
+
+    [record] = NotificationQueue(queue_path).due(10)
+    assert record["event"]["kind"] == "success"
+    assert record["event"]["dag_id"] == "etl"
+
+
+def test_sender_formats_events_when_publishing(queue_path, monkeypatch):
+    client = RecordingSnsClient()
+    monkeypatch.setattr(notification_aggregator, "get_sns_hook", lambda aws_conn_id: RecordingSnsHook(client))
+    monkeypatch.setattr(notification_aggregator.sns_variables, "get", lambda key: f"<{key}>")
+    notification_queue.dispatch_failure(TOPIC, "etl", "load", "boom", path=queue_path)
+    notification_queue.dispatch_success(TOPIC, "report", path=queue_path)
+    queue = NotificationQueue(queue_path)
+
+    assert NotificationSender(queue).drain_once() == 2
+
+    [(topic, [failure, success])] = client.batches
+    assert topic == TOPIC
+    assert failure["Subject"] == '❌Failure Alert! for DAG "etl"'
+    assert "**Environment:** <Environment>" in failure["Message"]
+    assert "**Error message:** boom" in failure["Message"]
+    assert "  - Task ID: **load**" in failure["Message"]
+    assert success["Subject"] == '✔️Success Alert! for DAG "report"'
+    assert "  - DAG ID: **report**" in success["Message"]
+    assert "**More Info:** [Airflow UI](<Airflow_UI>)" in success["Message"]
+    assert queue.depth() == 0
+
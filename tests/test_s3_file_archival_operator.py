@@ -0,0 +1,203 @@
+import hashlib
+import threading
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("airflow")
+pytest.importorskip("botocore")
+
+from airflow.exceptions import AirflowException  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+from docebo_plugin.operators.s3_file_archival_operator import S3FileArchivalOperator  # noqa: E402
+
+BUCKET = "docebo-bucket"
+CONTEXT = {"ds": "2024-01-02"}
+
+
+def etag(body):
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class InMemoryS3:
+    """The part of the boto3 S3 client ``S3FileArchivalOperator`` uses, keeping objects in memory."""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = Counter()
+        self.delete_batches = []
+        self.failing_deletes = set()
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, body, **metadata):
+        self.objects[key] = {"Body": body, "ETag": etag(body), "Metadata": metadata, "ContentType": "text/csv"}
+
+    def head_object(self, Bucket, Key):
+        self.calls["head_object"] += 1
+        item = self.objects.get(Key)
+        if item is None:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ETag": item["ETag"], "ContentLength": len(item["Body"]), "Metadata": dict(item["Metadata"]),
+                "ContentType": item["ContentType"]}
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective, Metadata, ContentType=None):
+        with self._lock:
+            self.calls["copy_object"] += 1
+            source = self.objects[CopySource["Key"]]
+            self.objects[Key] = {"Body": source["Body"], "ETag": source["ETag"], "Metadata": dict(Metadata),
+                                 "ContentType": ContentType}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata, ContentType=None):
+        with self._lock:
+            self.calls["create_multipart_upload"] += 1
+            upload_id = f"upload-{self.calls['create_multipart_upload']}"
+            self._uploads[upload_id] = {"Metadata": dict(Metadata), "ContentType": ContentType, "parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceRange, CopySourceIfMatch):
+        source = self.objects[CopySource["Key"]]
+        assert CopySourceIfMatch == source["ETag"]
+        first, last = (int(value) for value in CopySourceRange[len("bytes="):].split("-"))
+        body = source["Body"][first:last + 1]
+        with self._lock:
+            self.calls["upload_part_copy"] += 1
+            self._uploads[UploadId]["parts"][PartNumber] = body
+        return {"CopyPartResult": {"ETag": etag(body)}}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        with self._lock:
+            self.calls["complete_multipart_upload"] += 1
+            upload = self._uploads.pop(UploadId)
+            body = b"".join(upload["parts"][part["PartNumber"]] for part in MultipartUpload["Parts"])
+            # Multipart ETags are not the MD5 of the object, so resume has to rely on the recorded source ETag.
+            self.objects[Key] = {"Body": body, "ETag": f'"{hashlib.md5(body).hexdigest()}-{len(upload["parts"])}"',
+                                 "Metadata": upload["Metadata"], "ContentType": upload["ContentType"]}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls["abort_multipart_upload"] += 1
+        self._uploads.pop(UploadId, None)
+
+    def delete_objects(self, Bucket, Delete):
+        self.calls["delete_objects"] += 1
+        keys = [item["Key"] for item in Delete["Objects"]]
+        self.delete_batches.append(keys)
+        errors = []
+        for key in keys:
+            if key in self.failing_deletes:
+                errors.append({"Key": key, "Code": "AccessDenied", "Message": "Access Denied"})
+            else:
+                self.objects.pop(key, None)
+        return {"Errors": errors} if errors else {}
+
+
+class InMemoryS3FileArchivalOperator(S3FileArchivalOperator):
+    def get_s3_client(self):
+        return self.s3
+
+
+def make_operator(s3, files_to_move, **kwargs):
+    operator = InMemoryS3FileArchivalOperator(
+        task_id="archive",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+        bucket_name=BUCKET,
+        source_folder_path="landing",
+        destination_base_folder_path="archive",
+        files_to_move=files_to_move,
+        **kwargs,
+    )
+    operator.s3 = s3
+    return operator
+
+
+def test_small_object_is_copied_once_and_the_original_deleted():
+    s3 = InMemoryS3()
+    s3.put("landing/user.csv", b"id\n1\n")
+
+    summary = make_operator(s3, ["user.csv"]).execute(CONTEXT)
+
+    archived = s3.objects["archive/2024-01-02/user.csv"]
+    assert archived["Body"] == b"id\n1\n"
+    assert archived["Metadata"]["archived-from-etag"] == etag(b"id\n1\n")
+    assert "landing/user.csv" not in s3.objects
+    assert s3.calls["copy_object"] == 1
+    assert s3.calls["create_multipart_upload"] == 0
+    assert summary == {"copied": 1, "skipped": 0, "missing": 0, "bytes_copied": 5, "deleted": 1}
+
+
+def test_large_object_is_copied_in_parts():
+    s3 = InMemoryS3()
+    body = bytes(range(256)) * 40
+    s3.put("landing/enrollments.csv", body)
+    operator = make_operator(s3, ["enrollments.csv"], delete_flag="N")
+    operator.multipart_threshold = 4096
+    operator.part_size = 4096
+
+    operator.execute(CONTEXT)
+
+    assert s3.objects["archive/2024-01-02/enrollments.csv"]["Body"] == body
+    assert s3.calls["copy_object"] == 0
+    assert s3.calls["upload_part_copy"] == 3
+    assert s3.calls["complete_multipart_upload"] == 1
+    assert s3.calls["abort_multipart_upload"] == 0
+
+
+def test_retry_skips_objects_already_archived():
+    s3 = InMemoryS3()
+    s3.put("landing/user.csv", b"user")
+    s3.put("landing/courses.csv", b"courses" * 2000)
+    operator = make_operator(s3, ["user.csv", "courses.csv"], delete_flag="N")
+    operator.multipart_threshold = 4096
+    operator.part_size = 4096
+    operator.execute(CONTEXT)
+    copies = s3.calls["copy_object"] + s3.calls["create_multipart_upload"]
+
+    # The retried run also finds one original already deleted by the first attempt.
+    del s3.objects["landing/user.csv"]
+    summary = make_operator(s3, ["user.csv", "courses.csv"]).execute(CONTEXT)
+
+    assert s3.calls["copy_object"] + s3.calls["create_multipart_upload"] == copies
+    assert summary["skipped"] == 2
+    assert summary["copied"] == 0
+    assert "landing/courses.csv" not in s3.objects
+
+
+def test_changed_source_is_archived_again():
+    s3 = InMemoryS3()
+    s3.put("landing/user.csv", b"old")
+    make_operator(s3, ["user.csv"], delete_flag="N").execute(CONTEXT)
+    s3.put("landing/user.csv", b"new")
+
+    summary = make_operator(s3, ["user.csv"], delete_flag="N").execute(CONTEXT)
+
+    assert summary["copied"] == 1
+    assert s3.objects["archive/2024-01-02/user.csv"]["Body"] == b"new"
+
+
+def test_originals_are_deleted_in_batches_of_1000():
+    s3 = InMemoryS3()
+    files = [f"file{index}.csv" for index in range(2500)]
+    for name in files:
+        s3.put(f"landing/{name}", name.encode())
+
+    summary = make_operator(s3, files, max_workers=32).execute(CONTEXT)
+
+    assert [len(batch) for batch in s3.delete_batches] == [1000, 1000, 500]
+    assert summary["deleted"] == 2500
+    assert not any(key.startswith("landing/") for key in s3.objects)
+
+
+def test_partial_delete_errors_fail_the_task():
+    s3 = InMemoryS3()
+    for name in ("user.csv", "courses.csv"):
+        s3.put(f"landing/{name}", name.encode())
+    s3.failing_deletes.add("landing/courses.csv")
+
+    with pytest.raises(AirflowException, match="Failed to delete 1 archived objects"):
+        make_operator(s3, ["user.csv", "courses.csv"]).execute(CONTEXT)
+
+    assert "landing/user.csv" not in s3.objects
+    assert "archive/2024-01-02/courses.csv" in s3.objects
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+import zipfile
+from datetime import datetime, timezone
+
+import pytest
+
+import s3_sync
+
+BUCKET = "mwaa-bucket"
+
+
+class InMemoryS3:
+    """The part of the boto3 S3 client ``S3Sync`` uses, keeping objects in memory."""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+
+    def put(self, key, body):
+        self.objects[key] = body
+
+    def _etag(self, key):
+        return f'"{hashlib.md5(self.objects[key]).hexdigest()}"'
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": self._etag(Key)}
+
+    def download_file(self, Bucket, Key, Filename):
+        self.downloads.append(Key)
+        with open(Filename, "wb") as f:
+            f.write(self.objects[Key])
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        contents = [
+            {"Key": key, "ETag": self._etag(key), "Size": len(body), "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+            for key, body in sorted(self.objects.items())
+            if key.startswith(Prefix)
+        ]
+        yield {"Contents": contents}
+
+
+def plugins_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name, body in members.items():
+            zip_file.writestr(name, body)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def s3():
+    client = InMemoryS3()
+    client.put("plugins.zip", plugins_zip({"a_plugin/__init__.py": "a = 1\n", "b_plugin/__init__.py": "b = 1\n"}))
+    client.put("dags/first_dag.py", b"first = 1\n")
+    client.put("dags/nested/second_dag.py", b"second = 1\n")
+    client.put("requirements.txt", b"requests\n")
+    return client
+
+
+SOURCES = {
+    "plugins": f"s3://{BUCKET}/plugins.zip",
+    "dags": f"s3://{BUCKET}/dags",
+    "requirements": f"s3://{BUCKET}/requirements.txt",
+}
+
+
+def run_sync(s3, airflow_home):
+    sync = s3_sync.S3Sync(
+        airflow_home=str(airflow_home),
+        manifest_path=str(airflow_home / "manifest.json"),
+        s3_client=s3,
+    )
+    return {result.stage: result for result in sync.run(SOURCES)}
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_first_run_fetches_everything(s3, tmp_path):
+    results = run_sync(s3, tmp_path)
+
+    assert not any(result.error for result in results.values())
+    assert read(tmp_path / "plugins" / "a_plugin" / "__init__.py") == "a = 1\n"
+    assert read(tmp_path / "dags" / "nested" / "second_dag.py") == "second = 1\n"
+    assert read(tmp_path / "requirements" / "requirements.txt") == "requests\n"
+    assert results["plugins"].files == 2
+    assert results["dags"].files == 2
+
+
+def test_unchanged_sources_are_skipped(s3, tmp_path):
+    run_sync(s3, tmp_path)
+    s3.downloads.clear()
+
+    results = run_sync(s3, tmp_path)
+
+    assert all(result.skipped for result in results.values())
+    assert s3.downloads == []
+
+
+def test_only_changes_are_applied(s3, tmp_path):
+    run_sync(s3, tmp_path)
+    s3.put("plugins.zip", plugins_zip({"a_plugin/__init__.py": "a = 2\n"}))
+    s3.put("dags/first_dag.py", b"first = 2\n")
+    del s3.objects["dags/nested/second_dag.py"]
+    s3.downloads.clear()
+
+    results = run_sync(s3, tmp_path)
+
+    assert results["plugins"].files == 1
+    assert results["plugins"].deleted == 1
+    assert read(tmp_path / "plugins" / "a_plugin" / "__init__.py") == "a = 2\n"
+    assert not os.path.exists(tmp_path / "plugins" / "b_plugin" / "__init__.py")
+    assert results["dags"].files == 1
+    assert results["dags"].deleted == 1
+    assert not os.path.exists(tmp_path / "dags" / "nested" / "second_dag.py")
+    assert results["requirements"].skipped
+    assert sorted(s3.downloads) == ["dags/first_dag.py", "plugins.zip"]
+
+
+def test_main_without_stages_runs_configured_ones(monkeypatch, capsys):
+    for name in ("S3_PLUGINS_PATH", "S3_DAGS_PATH", "S3_REQUIREMENTS_PATH"):
+        monkeypatch.setenv(name, "")
+
+    assert s3_sync.main([]) == 0
+    assert "nothing to do" in capsys.readouterr().out
+
+
+def test_main_rejects_unknown_stage():
+    with pytest.raises(SystemExit) as raised:
+        s3_sync.main(["dag"])
+    assert raised.value.code == 2
+
+
+def test_empty_endpoint_url_uses_the_default_endpoint(tmp_path):
+    sync = s3_sync.S3Sync(airflow_home=str(tmp_path), manifest_path=str(tmp_path / "manifest.json"), endpoint_url="")
+
+    assert sync.s3.meta.endpoint_url.startswith("https://")
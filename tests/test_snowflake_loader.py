@@ -0,0 +1,193 @@
+import threading
+
+import pytest
+
+# docebo_plugin/__init__.py registers an AirflowPlugin.
+pytest.importorskip("airflow")
+
+from docebo_plugin.snowflake_loader import SnowflakeLoader, TableSpec, merge_sql  # noqa: E402
+
+COLUMNS = """
+    user_id INTEGER,
+    course_id INTEGER,
+    status VARCHAR,
+    enrollment_date_last_updated VARCHAR
+"""
+COLUMN_DDL = "    user_id INTEGER,\n    course_id INTEGER,\n    status VARCHAR,\n    enrollment_date_last_updated VARCHAR\n)"
+STAGE_TABLE = "LANDING_DB.DOCEBO.ENROLLMENTS_LOAD_STAGE"
+
+
+def unload_dict(**overrides):
+    details = {
+        "s3_stage": "DOCEBO_STAGE",
+        "s3_file_path": "/landing/",
+        "s3_file_name": "enrollments.csv",
+        "db_name": "LANDING_DB",
+        "schema_name": "DOCEBO",
+        "table_name": "ENROLLMENTS",
+        "s3_db_name": "LANDING_DB",
+        "s3_schema_name": "DOCEBO",
+        "columns": COLUMNS,
+        "s3_file_config": " FILE_FORMAT = (TYPE = CSV)",
+    }
+    details.update(overrides)
+    return details
+
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.result = []
+
+    def execute(self, sql):
+        self.connection.database.record(self.connection, sql)
+        self.description = None
+        if sql.startswith("COPY INTO"):
+            self.description = [("file",), ("rows_loaded",)]
+            self.result = [("enrollments.csv", self.connection.database.file_rows)]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, database):
+        self.database = database
+        self.temporary_tables = {}
+        self.closed = False
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingDatabase:
+    """
+    Fake Snowflake that records every statement instead of running it, and
+    keeps the row count of each table so tests can see what repeated loads
+    leave behind. Temporary tables live on the connection that created them.
+    """
+
+    def __init__(self, file_rows=3):
+        self.file_rows = file_rows
+        self.statements = []
+        self.tables = {}
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        connection = RecordingConnection(self)
+        with self.lock:
+            self.connections.append(connection)
+        return connection
+
+    def _tables(self, connection, name):
+        return connection.temporary_tables if name in connection.temporary_tables else self.tables
+
+    def record(self, connection, sql):
+        words = sql.split()
+        with self.lock:
+            self.statements.append(sql)
+            if sql.startswith("CREATE TEMPORARY TABLE"):
+                connection.temporary_tables.setdefault(words[6], 0)
+            elif sql.startswith("CREATE TABLE"):
+                self.tables.setdefault(words[5], 0)
+            elif sql.startswith("TRUNCATE TABLE"):
+                self._tables(connection, words[2])[words[2]] = 0
+            elif sql.startswith("COPY INTO"):
+                self._tables(connection, words[2])[words[2]] += self.file_rows
+            elif sql.startswith("INSERT OVERWRITE INTO"):
+                self.tables[words[3]] = self._tables(connection, words[-1])[words[-1]]
+
+
+def test_full_load_replaces_the_table_through_a_staging_table():
+    database = RecordingDatabase()
+    spec = TableSpec.from_unload_dict(unload_dict())
+
+    [result] = SnowflakeLoader(database.connect).load_all([spec])
+
+    names = "user_id, course_id, status, enrollment_date_last_updated"
+    assert database.statements == [
+        f"CREATE TABLE IF NOT EXISTS LANDING_DB.DOCEBO.ENROLLMENTS (\n{COLUMN_DDL}",
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGE_TABLE} (\n{COLUMN_DDL}",
+        f"TRUNCATE TABLE {STAGE_TABLE}",
+        f"COPY INTO {STAGE_TABLE} FROM @LANDING_DB.DOCEBO.DOCEBO_STAGE/landing/enrollments.csv FILE_FORMAT = (TYPE = CSV)",
+        f"INSERT OVERWRITE INTO LANDING_DB.DOCEBO.ENROLLMENTS ({names}) SELECT {names} FROM {STAGE_TABLE}",
+    ]
+    assert result["rows_loaded"] == 3
+    assert all(connection.closed for connection in database.connections)
+
+
+def test_repeated_full_loads_do_not_duplicate_rows():
+    database = RecordingDatabase(file_rows=3)
+    loader = SnowflakeLoader(database.connect)
+    spec = TableSpec.from_unload_dict(unload_dict())
+
+    loader.load_all([spec])
+    loader.load_all([spec])
+
+    assert database.tables["LANDING_DB.DOCEBO.ENROLLMENTS"] == 3
+
+
+def test_every_table_loads_on_its_own_connection():
+    database = RecordingDatabase()
+    specs = [TableSpec.from_unload_dict(unload_dict(table_name=name)) for name in ("USERS", "COURSES", "ENROLLMENTS")]
+
+    results = SnowflakeLoader(database.connect, max_workers=3).load_all(specs)
+
+    assert [result["table"] for result in results] == [spec.qualified_name for spec in specs]
+    assert len(database.connections) == 3
+    assert all(connection.closed for connection in database.connections)
+
+
+def test_delta_load_merges_through_a_staging_table():
+    database = RecordingDatabase()
+    spec = TableSpec.from_unload_dict(unload_dict(
+        s3_file_name="enrollments_delta.csv",
+        merge_keys=["user_id", "course_id"],
+        watermark_column="enrollment_date_last_updated",
+    ))
+
+    SnowflakeLoader(database.connect, create_tables=False).load_all([spec])
+
+    statements = database.statements
+    assert len(statements) == 4
+    assert statements[0].startswith(f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGE_TABLE} (")
+    assert statements[1] == f"TRUNCATE TABLE {STAGE_TABLE}"
+    assert statements[2].startswith(f"COPY INTO {STAGE_TABLE} FROM ")
+    assert statements[3] == merge_sql(spec, STAGE_TABLE)
+
+
+def test_merge_keeps_the_latest_row_per_key():
+    spec = TableSpec.from_unload_dict(unload_dict(
+        merge_keys=["user_id", "course_id"],
+        watermark_column="enrollment_date_last_updated",
+    ))
+
+    assert merge_sql(spec, "STAGE") == (
+        "MERGE INTO LANDING_DB.DOCEBO.ENROLLMENTS AS target\n"
+        "USING (SELECT * FROM STAGE QUALIFY ROW_NUMBER() OVER (PARTITION BY user_id, course_id "
+        "ORDER BY TRY_TO_TIMESTAMP(enrollment_date_last_updated) DESC NULLS LAST, status) = 1) AS source\n"
+        "ON target.user_id = source.user_id AND target.course_id = source.course_id\n"
+        "WHEN MATCHED THEN UPDATE SET\n"
+        "        target.status = source.status,\n"
+        "        target.enrollment_date_last_updated = source.enrollment_date_last_updated\n"
+        "WHEN NOT MATCHED THEN INSERT (user_id, course_id, status, enrollment_date_last_updated) "
+        "VALUES (source.user_id, source.course_id, source.status, source.enrollment_date_last_updated)"
+    )
+
+
+def test_timestamp_watermark_is_ordered_as_is():
+    spec = TableSpec.from_unload_dict(unload_dict(
+        columns="id INTEGER, name VARCHAR, last_update TIMESTAMP_NTZ",
+        merge_keys=["id"],
+        watermark_column="last_update",
+    ))
+
+    assert "PARTITION BY id ORDER BY last_update DESC NULLS LAST, name) = 1" in merge_sql(spec, "STAGE")